@@ -7,6 +7,8 @@
 
     var hackathon_name = oh.comm.getCurrentHackathon();
     var def_expid = 0;
+    // times the status of a queued or starting experiment has been polled, the server backs off by it
+    var poll_attempt = 0;
 
     function pageload() {
         var temp_name = $.getUrlParam('t');
@@ -95,7 +97,7 @@
     }
 
     function getExperiment(expr_id) {
-        oh.api.user.experiment.get({query: {id: expr_id}}, function (data) {
+        oh.api.user.experiment.get({query: {id: expr_id, attempt: poll_attempt}}, function (data) {
             loadExperiment(data);
         });
     }
@@ -139,10 +141,13 @@
             
             $('.hackathon-nav a.vm-box:eq(0)').trigger('click');
             heartbeat(data.expr_id);
-        } else if (data.status == 1) {
+        } else if (data.status == 0 || data.status == 1) {
+            // queued or starting, poll again after the seconds suggested by server
+            var poll_after = data.poll_after || 5;
+            poll_attempt += 1;
             setTimeout(function(){
                            getExperiment(data.expr_id)
-                       }, 5000);
+                       }, poll_after * 1000);
         } else {
             showErrorMsg(data);
         }
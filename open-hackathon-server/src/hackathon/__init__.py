@@ -22,6 +22,7 @@ from hackathon.hackathon_response import *
 from hackathon.hackathon_exception import *
 from hackathon.log import log
 from hackathon.context import Context
+from hackathon.constants import SCHEDULER_EXECUTOR
 
 __all__ = [
     "app",
@@ -160,6 +161,10 @@ def init_components():
     factory.provide("health_check_hosted_docker", get_class("hackathon.health.health_check.HostedDockerHealthCheck"))
     factory.provide("health_check_guacamole", get_class("hackathon.health.health_check.GuacamoleHealthCheck"))
     factory.provide("health_check_mongodb", get_class("hackathon.health.health_check.MongoDBHealthCheck"))
+    factory.provide("health_check_expr_pool", get_class("hackathon.health.health_check.ExprPoolHealthCheck"))
+    factory.provide("health_check_scheduler", get_class("hackathon.health.health_check.SchedulerHealthCheck"))
+    factory.provide("health_check_scheduler_jobs",
+                    get_class("hackathon.health.health_check.SchedulerJobsHealthCheck"))
 
     # docker
     factory.provide("hosted_docker_proxy", get_class("hackathon.docker.hosted_docker.HostedDockerFormation"))
@@ -252,8 +257,25 @@ def __init_schedule_jobs():
                           method="scheduler_recycle_expr",
                           id="scheduler_recycle_expr",
                           next_run_time=next_run_time,
+                          executor=SCHEDULER_EXECUTOR.HOUSEKEEPING,
                           minutes=10)
 
+        # schedule job to sync status of docker experiments with their containers
+        sche.add_interval(feature="expr_manager",
+                          method="reconcile_expr_status",
+                          id="reconcile_expr_status",
+                          next_run_time=next_run_time,
+                          executor=SCHEDULER_EXECUTOR.HOUSEKEEPING,
+                          seconds=util.safe_get_config("docker.reconcile_interval_seconds", 60))
+
+        # schedule job to probe the health of docker hosts
+        sche.add_interval(feature="hosted_docker_proxy",
+                          method="probe_hosts",
+                          id="probe_docker_hosts",
+                          next_run_time=util.get_now(),
+                          executor=SCHEDULER_EXECUTOR.HOUSEKEEPING,
+                          seconds=util.safe_get_config("docker.probe_interval_seconds", 30))
+
         # schedule job to pre-allocate environment
         hackathon_manager.schedule_pre_allocate_expr_job()
 
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+"""
+
+import abc
+
+from hackathon import Component
+
+__all__ = ["CacheBackend"]
+
+
+class CacheBackend(Component, metaclass=abc.ABCMeta):
+    """Base for the storage behind CacheManagerExt
+
+    Values are grouped by namespace, a (namespace, key) pair identifies a cached value.
+    """
+
+    @abc.abstractmethod
+    def get(self, namespace, key, createfunc, expire):
+        """Get cached value, call createfunc and cache its return if value doesn't exist or expired
+
+        :type namespace: str|unicode
+        :param namespace: namespace of the key
+
+        :type key: str|unicode
+        :param key: the unique key in namespace
+
+        :type createfunc: function
+        :param createfunc: function without parameters to create the value
+
+        :type expire: int
+        :param expire: seconds before the created value expires. Never expires if None or 0
+
+        :return the cached or created value
+        """
+        return
+
+    @abc.abstractmethod
+    def remove(self, namespace, key):
+        """Remove a cached value. Nothing happens if the value doesn't exist
+
+        :type namespace: str|unicode
+        :param namespace: namespace of the key
+
+        :type key: str|unicode
+        :param key: the unique key in namespace
+        """
+        return
+
+    @abc.abstractmethod
+    def clear(self, namespace=None):
+        """Remove all cached values of a namespace
+
+        :type namespace: str|unicode
+        :param namespace: the namespace to clear. All namespaces will be cleared if None
+        """
+        return
+
+    @abc.abstractmethod
+    def stats(self):
+        """Statistics of the backend such as hits, misses and evictions
+
+        :rtype dict
+        :return statistics of the backend which must contain key 'type'
+        """
+        return
@@ -3,18 +3,37 @@
 This file is covered by the LICENSING file in the root of this project.
 """
 
-from beaker.cache import CacheManager
-from beaker.util import parse_cache_config_options
-
 from hackathon import Component
-
+from hackathon.util import safe_get_config
+from hackathon.constants import HEALTH, HEALTH_STATUS, CACHE_NAMESPACE
+from hackathon.hackathon_exception import ConfigurationException
 
 __all__ = ["CacheManagerExt"]
 
 
 class CacheManagerExt(Component):
-    """To cache resource"""
-    def get_cache(self, key, createfunc):
+    """To cache resource
+
+    The storage of cached values is pluggable, configure it through "cache.type" in config.py:
+        - "memory": process-wide LRU cache, the default one
+        - "file": beaker file cache under /tmp/cache
+        - "redis": shared by all workers through redis, see RedisCacheBackend
+
+    Expiry can be configured per namespace:
+    "cache": {
+        "type": "memory",
+        "max_size": 10000,
+        "expire": 3600,
+        "namespaces": {
+            "hackathon_stat": {"expire": 60}
+        },
+        "redis": {
+            "host": "localhost",
+            "port": 6379
+        }
+    }
+    """
+    def get_cache(self, key, createfunc, namespace=CACHE_NAMESPACE.DEFAULT):
         """Get cached data of the returns of createfunc depending on the key.
         If key and createfunc exist in cache, returns the cached data,
         otherwise caches the returns of createfunc and returns data.
@@ -26,6 +45,9 @@ class CacheManagerExt(Component):
         :param createfunc: only the name of function, have no parameters,
             its return type can be any basic object, like String, int, tuple, list, dict, etc.
 
+        :type namespace: String
+        :param namespace: namespace of the key, expiry of values can be configured per namespace
+
         :rtype: String
         :return: the value mapped to the key
 
@@ -33,53 +55,79 @@ class CacheManagerExt(Component):
             CacheManager.get_cache(key="abc", createfunc=func)
 
         """
-        results = self.tmpl_cache.get(key=key, createfunc=createfunc)
-        return results
+        return self.backend.get(namespace, key, createfunc, self.__get_expire(namespace))
 
-    def invalidate(self, key):
+    def invalidate(self, key, namespace=CACHE_NAMESPACE.DEFAULT):
         """remove the key-value pair in the cache
 
         :type key: String
         :param key: key name, present the unique key each time caching
 
+        :type namespace: String
+        :param namespace: namespace of the key
+
         :rtype: bool
         :return: True if remove the key-value pair correctly, otherwise False
 
         """
         try:
-            self.tmpl_cache.remove_value(key=key)
+            self.backend.remove(namespace, key)
             return True
         except Exception as e:
             self.log.error(e)
             return False
 
-    def clear(self):
+    def clear(self, namespace=None):
         """clear all the cache
 
+        :type namespace: String
+        :param namespace: clear only the given namespace if not None
+
         :rtype: bool
         :return: True if clear the cache correctly, otherwise False
         """
         try:
-            self.tmpl_cache.clear()
+            self.backend.clear(namespace)
             return True
         except Exception as e:
             self.log.error(e)
             return False
 
+    def report_health(self):
+        """Report the statistics of cache backend such as hits, misses and evictions"""
+        try:
+            health = self.backend.stats()
+            health[HEALTH.STATUS] = HEALTH_STATUS.OK
+            return health
+        except Exception as e:
+            self.log.error(e)
+            return {
+                HEALTH.STATUS: HEALTH_STATUS.ERROR,
+                HEALTH.DESCRIPTION: str(e)
+            }
+
     def __init__(self):
-        """initialize the class CacheManager
-        More configuration refer to http://beaker.readthedocs.org/en/latest/caching.html#about
-        """
-        # store the basic configuration
-        self.cache_opts = {
-            'cache.type': 'memory',
-            # can be "memory" or "file"
-            'cache.data_dir': '/tmp/cache/data',
-            'cache.lock_dir': '/tmp/cache/lock'
-        }
-        # create CacheManager instance with cache_opts
-        self.cache = CacheManager(**parse_cache_config_options(self.cache_opts))
-        # In addition to the defaults supplied to the CacheManager instance,
-        # any of the Cache options can be changed on a per-namespace basis,
-        # by setting a type, and expire option.
-        self.tmpl_cache = self.cache.get_cache('mytemplate', type='file', expire=3600)
+        """initialize the class CacheManager with the backend configured in config.py"""
+        cache_type = safe_get_config("cache.type", "memory")
+        if cache_type == "memory":
+            from hackathon.cache.memory_cache import MemoryCacheBackend
+            self.backend = MemoryCacheBackend(max_size=safe_get_config("cache.max_size", 10000))
+        elif cache_type == "file":
+            from hackathon.cache.file_cache import FileCacheBackend
+            self.backend = FileCacheBackend()
+        elif cache_type == "redis":
+            from hackathon.cache.redis_cache import RedisCacheBackend
+            self.backend = RedisCacheBackend(host=safe_get_config("cache.redis.host", "localhost"),
+                                             port=safe_get_config("cache.redis.port", 6379),
+                                             db=safe_get_config("cache.redis.db", 0),
+                                             password=safe_get_config("cache.redis.password", None),
+                                             local_expire=safe_get_config("cache.redis.local_expire", 5))
+        else:
+            self.log.warn("unsupported cache type: %s" % cache_type)
+            raise ConfigurationException("cache.type")
+
+        self.log.debug("cache backend initialized: %s" % cache_type)
+
+    @staticmethod
+    def __get_expire(namespace):
+        return safe_get_config("cache.namespaces.%s.expire" % namespace, safe_get_config("cache.expire", 3600))
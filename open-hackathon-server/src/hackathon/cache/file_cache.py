@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+"""
+
+import threading
+
+from beaker.cache import CacheManager
+from beaker.util import parse_cache_config_options
+
+from hackathon.cache.cache_backend import CacheBackend
+
+__all__ = ["FileCacheBackend"]
+
+
+class FileCacheBackend(CacheBackend):
+    """Cache backend that saves values on local disk through beaker
+
+    More configuration refer to http://beaker.readthedocs.org/en/latest/caching.html#about
+    """
+
+    def get(self, namespace, key, createfunc, expire):
+        return self.__get_namespace(namespace, expire).get(key=key, createfunc=createfunc)
+
+    def remove(self, namespace, key):
+        self.__get_namespace(namespace).remove_value(key=key)
+
+    def clear(self, namespace=None):
+        """Clear a namespace, or all namespaces that are used in current process if namespace is None"""
+        names = [namespace] if namespace else list(self.namespaces.keys())
+        for name in names:
+            self.__get_namespace(name).clear()
+
+    def stats(self):
+        return {
+            "type": "file",
+            "namespaces": list(self.namespaces.keys())
+        }
+
+    def __init__(self, data_dir="/tmp/cache/data", lock_dir="/tmp/cache/lock"):
+        cache_opts = {
+            'cache.type': 'file',
+            'cache.data_dir': data_dir,
+            'cache.lock_dir': lock_dir
+        }
+        self.cache = CacheManager(**parse_cache_config_options(cache_opts))
+        self.namespaces = {}
+        self.lock = threading.Lock()
+
+    def __get_namespace(self, namespace, expire=None):
+        with self.lock:
+            if namespace not in self.namespaces:
+                self.namespaces[namespace] = self.cache.get_cache(namespace, type='file', expire=expire)
+            return self.namespaces[namespace]
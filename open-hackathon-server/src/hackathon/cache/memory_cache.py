@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from hackathon.cache.cache_backend import CacheBackend
+
+__all__ = ["MemoryCacheBackend"]
+
+
+class _Flight(object):
+    """A running createfunc that other threads missing the same key wait for"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.data = None
+        self.error = None
+        self.invalidated = False
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Process-wide and thread-safe cache backend
+
+    Values are kept in a LRU list of bounded size, the least recently used value is evicted once the list is full.
+    Concurrent misses of the same key are coalesced so that createfunc runs only once(single-flight), the other
+    threads wait for its return.
+
+    Values are kept pickled and every get returns a new copy, same as the redis and file backends. So that a caller
+    changing the returned value doesn't change the cached one seen by others.
+    """
+
+    def get(self, namespace, key, createfunc, expire):
+        cache_key = (namespace, key)
+        with self.lock:
+            found, data = self.__lookup(cache_key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+                flight = self.flights.get(cache_key)
+                leader = flight is None
+                if leader:
+                    flight = self.flights[cache_key] = _Flight()
+                else:
+                    self.coalesced += 1
+
+        # unpickle out of the lock
+        if found:
+            return pickle.loads(data)
+        if leader:
+            return self.__fly(cache_key, flight, createfunc, expire)
+
+        flight.event.wait()
+        if flight.error:
+            raise flight.error
+        return pickle.loads(flight.data)
+
+    def remove(self, namespace, key):
+        cache_key = (namespace, key)
+        with self.lock:
+            self.entries.pop(cache_key, None)
+            if cache_key in self.flights:
+                self.flights[cache_key].invalidated = True
+
+    def clear(self, namespace=None):
+        with self.lock:
+            if namespace is None:
+                self.entries.clear()
+                flights = list(self.flights.values())
+            else:
+                for cache_key in [k for k in self.entries if k[0] == namespace]:
+                    del self.entries[cache_key]
+                flights = [f for k, f in self.flights.items() if k[0] == namespace]
+
+            for flight in flights:
+                flight.invalidated = True
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "type": "memory",
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(float(self.hits) / requests, 4) if requests else 0
+            }
+
+    def __init__(self, max_size=10000):
+        """Create a memory cache backend
+
+        :type max_size: int
+        :param max_size: max count of the cached values
+        """
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.flights = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __fly(self, cache_key, flight, createfunc, expire):
+        try:
+            value = createfunc()
+            flight.data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[cache_key]
+                # skip storing if the key is removed while createfunc is running
+                if not flight.error and not flight.invalidated:
+                    self.__store(cache_key, flight.data, expire)
+            flight.event.set()
+
+        return value
+
+    def __lookup(self, cache_key):
+        entry = self.entries.get(cache_key)
+        if entry is None:
+            return False, None
+
+        data, expire_at = entry
+        if expire_at and expire_at <= time.monotonic():
+            del self.entries[cache_key]
+            self.expirations += 1
+            return False, None
+
+        self.entries.move_to_end(cache_key)
+        return True, data
+
+    def __store(self, cache_key, data, expire):
+        expire_at = time.monotonic() + expire if expire else None
+        self.entries[cache_key] = (data, expire_at)
+        self.entries.move_to_end(cache_key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+"""
+
+import json
+import pickle
+import threading
+import time
+import uuid
+
+import redis
+
+from hackathon.cache.cache_backend import CacheBackend
+from hackathon.cache.memory_cache import MemoryCacheBackend
+
+__all__ = ["RedisCacheBackend"]
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache backend shared by all workers through a server that speaks the Redis protocol
+
+    Values are pickled and saved in redis with expiry. Each worker keeps a small in-process copy of the values
+    for at most 'local_expire' seconds, removing or clearing values publishes a message to the other workers so that
+    their local copies are dropped as well.
+
+    Missing a key in all workers at the same time runs createfunc only once: the worker which takes the lock
+    key creates the value while the others poll for it. A waiter which outlasts lock_timeout runs createfunc for
+    itself and returns the value without writing it, the value of the lock holder is the one cached. The lock is
+    released only by its holder, a lock expired and taken by another worker is left alone.
+    """
+
+    def get(self, namespace, key, createfunc, expire):
+        def get_remote():
+            return self.__get_remote(namespace, key, createfunc, expire)
+
+        local_expire = min(expire, self.local_expire) if expire else self.local_expire
+        return self.local.get(namespace, key, get_remote, local_expire)
+
+    def remove(self, namespace, key):
+        self.local.remove(namespace, key)
+        self.client.delete(self.__get_redis_key(namespace, key))
+        self.__publish({"op": "remove", "namespace": namespace, "key": key})
+
+    def clear(self, namespace=None):
+        self.local.clear(namespace)
+        pattern = self.prefix + (namespace + ":*" if namespace else "*")
+        keys = list(self.client.scan_iter(match=pattern, count=500))
+        if keys:
+            self.client.delete(*keys)
+        self.__publish({"op": "clear", "namespace": namespace})
+
+    def stats(self):
+        stats = self.local.stats()
+        with self.lock:
+            stats.update({
+                "type": "redis",
+                "remote_hits": self.remote_hits,
+                "remote_misses": self.remote_misses,
+                "remote_errors": self.remote_errors,
+                "invalidations_received": self.invalidations_received
+            })
+        stats["remote_keys"] = self.client.dbsize()
+        return stats
+
+    def close(self):
+        """Stop listening to invalidation messages"""
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+
+    def __init__(self, client=None, host="localhost", port=6379, db=0, password=None, prefix="ohp:cache:",
+                 local_expire=5, local_max_size=1000, lock_timeout=30):
+        """Create a redis cache backend
+
+        :type client: redis.StrictRedis
+        :param client: the redis client. Created from host, port, db and password if None
+
+        :type prefix: str|unicode
+        :param prefix: prefix of all keys in redis, the invalidation channel is '<prefix>invalidate'
+
+        :type local_expire: int
+        :param local_expire: max seconds to keep a value in process
+
+        :type lock_timeout: int
+        :param lock_timeout: max seconds to wait for the value being created by another worker
+        """
+        self.client = client or redis.StrictRedis(host=host, port=port, db=db, password=password)
+        self.prefix = prefix
+        self.channel = prefix + "invalidate"
+        self.local_expire = local_expire
+        self.lock_timeout = lock_timeout
+        self.local = MemoryCacheBackend(max_size=local_max_size)
+        self.worker_id = uuid.uuid1().hex
+
+        self.lock = threading.Lock()
+        self.remote_hits = 0
+        self.remote_misses = 0
+        self.remote_errors = 0
+        self.invalidations_received = 0
+
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: self.__on_invalidate})
+        self.listener = pubsub.run_in_thread(sleep_time=0.1, daemon=True)
+
+    def __get_redis_key(self, namespace, key):
+        return "%s%s:%s" % (self.prefix, namespace, key)
+
+    def __get_remote(self, namespace, key, createfunc, expire):
+        redis_key = self.__get_redis_key(namespace, key)
+        try:
+            value = self.__load(redis_key)
+            if value is not None:
+                return value[0]
+
+            lock_key = redis_key + ":lock"
+            token = uuid.uuid4().hex
+            if self.client.set(lock_key, token, nx=True, ex=self.lock_timeout):
+                try:
+                    return self.__create(redis_key, createfunc, expire)
+                finally:
+                    self.__release_lock(lock_key, token)
+
+            # another worker is creating the value
+            deadline = time.time() + self.lock_timeout
+            while time.time() < deadline and self.client.exists(lock_key):
+                time.sleep(0.05)
+                value = self.__load(redis_key)
+                if value is not None:
+                    return value[0]
+            # the lock may be released right after it's checked
+            value = self.__load(redis_key)
+            if value is not None:
+                return value[0]
+        except redis.RedisError as e:
+            # serve without cache rather than fail the request
+            self.log.error(e)
+            with self.lock:
+                self.remote_errors += 1
+
+        # redis is unreachable, or the lock holder is too slow or failed. Serve without writing so that a value
+        # created after the lock is taken can't be overwritten by an older one
+        return createfunc()
+
+    def __load(self, redis_key):
+        """Load value from redis
+
+        :return a tuple of the value if exists else None. So that None can be cached as well
+        """
+        data = self.client.get(redis_key)
+        with self.lock:
+            if data is None:
+                self.remote_misses += 1
+                return None
+            self.remote_hits += 1
+        return pickle.loads(data),
+
+    def __create(self, redis_key, createfunc, expire):
+        value = createfunc()
+        try:
+            self.client.set(redis_key, pickle.dumps(value), px=int(expire * 1000) if expire else None)
+        except redis.RedisError as e:
+            # the value is created already, serve it uncached rather than create it again
+            self.log.error(e)
+            with self.lock:
+                self.remote_errors += 1
+        return value
+
+    def __release_lock(self, lock_key, token):
+        """Delete the lock key if it's still held by token
+
+        The lock expires in lock_timeout seconds, after which another worker may take it. A transaction watching the
+        key compares and deletes it atomically.
+        """
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(lock_key)
+                if pipe.get(lock_key) == token.encode():
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    pipe.execute()
+                else:
+                    pipe.unwatch()
+        except redis.WatchError:
+            # changed by another worker meanwhile, it's not ours any more
+            pass
+        except redis.RedisError as e:
+            # expires in lock_timeout anyway
+            self.log.error(e)
+
+    def __publish(self, message):
+        message["worker"] = self.worker_id
+        self.client.publish(self.channel, json.dumps(message))
+
+    def __on_invalidate(self, message):
+        try:
+            data = json.loads(message["data"])
+            if data.get("worker") == self.worker_id:
+                return
+
+            with self.lock:
+                self.invalidations_received += 1
+            if data["op"] == "remove":
+                self.local.remove(data["namespace"], data["key"])
+            elif data["op"] == "clear":
+                self.local.clear(data["namespace"])
+        except Exception as e:
+            self.log.error(e)
@@ -95,7 +95,90 @@ Config = {
         "database": MONGODB_DB,
         "collection": "jobs",
         "host": MONGODB_HOST,
-        "port": MONGODB_PORT
+        "port": MONGODB_PORT,
+        # only the process holding the lease runs interval jobs, or all jobs if the job store is shared(mysql or
+        # mongodb). The lease is renewed every lease_renew_seconds and taken over by another process in lease_seconds
+        # if the holder dies
+        "leader_election": True,
+        "lease_collection": "scheduler_lease",
+        "lease_seconds": 15,
+        "lease_renew_seconds": 5,
+        # max threads of the executors of jobs, see SCHEDULER_EXECUTOR in constants.py
+        "executors": {
+            "default": 10,
+            "provision": 8,
+            "image": 2,
+            "housekeeping": 4
+        }
+    },
+    "cache": {
+        # "memory": in-process LRU cache; "file": beaker file cache under /tmp/cache;
+        # "redis": shared by all workers through redis
+        "type": "memory",
+        "max_size": 10000,
+        "expire": 3600,
+        "namespaces": {
+            "hackathon_stat": {"expire": 60},
+            "hackathon_config": {"expire": 3600},
+            "user_token": {"expire": 300},
+            "user_session": {"expire": 300},
+            "user_permission": {"expire": 300},
+            "pagination_total": {"expire": 60},
+            "docker_container_state": {"expire": 10},
+            "template_content": {"expire": 3600}
+        },
+        "redis": {
+            "host": "localhost",
+            "port": 6379,
+            "db": 0,
+            "password": None,
+            # seconds to keep a value in worker process
+            "local_expire": 5
+        }
+    },
+    "k8s": {
+        # max seconds to wait for the deployments of an experiment to be available
+        "ready_timeout": 1800,
+        # max seconds of a single watch request to the k8s api server
+        "watch_timeout": 30,
+        # max concurrent requests to create k8s resources, shared by all experiments
+        "provision_concurrency": 8
+    },
+    "docker": {
+        # keep-alive connections to the docker remote api per host
+        "pool_size": 10,
+        # seconds to connect to and to wait for the response of docker remote api
+        "connect_timeout": 3,
+        "read_timeout": 20,
+        "pull_timeout": 600,
+        # retries of idempotent requests, the backoff is backoff_factor * 2 ^ (retry - 1) seconds
+        "retries": 3,
+        "backoff_factor": 0.2,
+        # interval of the job reconciling status of docker experiments with the containers. Besides the running ones,
+        # it checks the experiments stopped in the recent reconcile_stopped_minutes, in case they are restarted
+        "reconcile_interval_seconds": 60,
+        "reconcile_stopped_minutes": 60,
+        # all hosts are pinged concurrently by an interval job, the health of a host is taken as unknown if it's not
+        # probed in probe_stale_seconds. probe_window is the count of recent results kept per host
+        "probe_interval_seconds": 30,
+        "probe_concurrency": 16,
+        "probe_timeout": 5,
+        "probe_stale_seconds": 90,
+        "probe_window": 10,
+        # order to choose host for new container, least_loaded or bin_packing
+        "placement_strategy": "least_loaded"
+    },
+    "experiment": {
+        # retries of claiming an experiment if MongoDB is unreachable for a moment, e.g. failover
+        "claim_retries": 3,
+        # backoff before the first retry, doubled for each retry
+        "claim_backoff_seconds": 0.05,
+        # seconds the client waits before polling the status of a starting experiment again, doubled by every
+        # attempt of client up to poll_max_interval
+        "poll_interval": 1,
+        "poll_max_interval": 16,
+        # max experiments started in parallel by the pre-allocate jobs of all hackathons
+        "pre_allocate_concurrency": 8
     },
     "storage": {
         "type": "local",
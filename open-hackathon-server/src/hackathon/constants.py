@@ -45,6 +45,46 @@ class HEALTH:
     VERSION = "version"
 
 
+class SCHEDULER_EXECUTOR:
+    """Thread pools of scheduler jobs, the size of pools can be configured in config.py
+
+    Attributes:
+        DEFAULT: short jobs
+        PROVISION: starting and stopping experiments, which may wait for the resources for a long while
+        IMAGE: pulling docker images
+        HOUSEKEEPING: periodical sweeps such as recycling and pre-allocating experiments
+    """
+    DEFAULT = "default"
+    PROVISION = "provision"
+    IMAGE = "image"
+    HOUSEKEEPING = "housekeeping"
+
+
+class CACHE_NAMESPACE:
+    """Namespaces of cached values, expiry of values can be configured per namespace in config.py
+
+    Attributes:
+        DEFAULT: namespace of values cached without namespace specified
+        HACKATHON_STAT: statistics of hackathon such as register count
+        HACKATHON_CONFIG: basic configs of hackathon
+        USER_TOKEN: login token mapped to user id and expiry
+        USER_SESSION: snapshot of user
+        USER_PERMISSION: roles of user across all hackathons
+        PAGINATION_TOTAL: count of documents matched by cursor paginated queries
+        DOCKER_CONTAINER_STATE: running state of all containers on a docker host
+        TEMPLATE_CONTENT: parsed content of template, keyed by id and update time of template
+    """
+    DEFAULT = "default"
+    HACKATHON_STAT = "hackathon_stat"
+    HACKATHON_CONFIG = "hackathon_config"
+    USER_TOKEN = "user_token"
+    USER_SESSION = "user_session"
+    USER_PERMISSION = "user_permission"
+    PAGINATION_TOTAL = "pagination_total"
+    DOCKER_CONTAINER_STATE = "docker_container_state"
+    TEMPLATE_CONTENT = "template_content"
+
+
 class HACKATHON_STAT:
     """Statistics types of a hackathon
 
@@ -274,6 +314,18 @@ class DHS_QUERY_STATE:
     FAILED = 2
 
 
+class DOCKER_PLACEMENT_STRATEGY:
+    """order to choose docker host server for new container
+
+    Attributes:
+        LEAST_LOADED: the host with the fewest containers first, containers are spread over hosts
+        BIN_PACKING: the host with the most containers first, hosts are filled up one by one so the idle ones can be
+            released
+    """
+    LEAST_LOADED = "least_loaded"
+    BIN_PACKING = "bin_packing"
+
+
 class ServiceDeploymentSlot:
     """
     the slot of service deployment
@@ -411,3 +463,10 @@ class K8S_DEPLOYMENT_STATUS:
     AVAILABLE = 1
     PAUSE = 2
     ERROR = 3
+
+
+class K8S_LABEL:
+    """Labels stamped on all k8s resources of an experiment"""
+    HACKATHON = "hacking.kaiyuanshe.cn/hackathon"
+    EXPERIMENT = "hacking.kaiyuanshe.cn/experiment"
+    VIRTUAL_ENVIRONMENT = "hacking.kaiyuanshe.cn/virtual_environment"
@@ -7,25 +7,93 @@ import sys
 
 sys.path.append("..")
 
+import time
 from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import timedelta
+from pymongo import UpdateOne
 
 from hackathon import RequiredFeature, Component, Context
 from hackathon.hmongo.models import DockerContainer, DockerHostServer
-from hackathon.constants import HEALTH, HEALTH_STATUS, HACKATHON_CONFIG, CLOUD_PROVIDER
+from hackathon.constants import HEALTH, HEALTH_STATUS, HACKATHON_CONFIG, CLOUD_PROVIDER, CACHE_NAMESPACE, \
+    SCHEDULER_EXECUTOR
 
-import collections
+import collections.abc
 def flatten(x):
     result = []
     for el in x:
-        if isinstance(x, collections.Iterable) and not isinstance(el, str):
+        if isinstance(x, collections.abc.Iterable) and not isinstance(el, str):
             result.extend(flatten(el))
         else:
             result.append(el)
     return result
 
+class DockerHostSession(object):
+    """Pooled keep-alive connections to the docker remote api of one host, with latency and error counters
+
+    Idempotent requests(GET, DELETE...) are retried with backoff on connection errors and 502/503/504, POST is never
+    retried since creating or starting a container twice is not safe. Requests sent with retry=False(e.g. ping) are
+    not retried at all, so that a dead host fails them within the timeout.
+    """
+
+    def __init__(self, url, pool_size=10, retries=3, backoff_factor=0.2):
+        self.url = url
+        self.session = requests.Session()
+        # a timed out request is not retried, the docker daemon is probably too busy to respond
+        retry = Retry(total=retries, read=0, backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.no_retry_session = requests.Session()
+        no_retry_adapter = HTTPAdapter(max_retries=0)
+        # the same pooled connections, only the retries differ
+        no_retry_adapter.poolmanager = adapter.poolmanager
+        self.no_retry_session.mount("http://", no_retry_adapter)
+        self.no_retry_session.mount("https://", no_retry_adapter)
+
+        self.lock = Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+
+    def request(self, method, path, timeout, retry=True, **kwargs):
+        start = time.time()
+        session = self.session if retry else self.no_retry_session
+        try:
+            resp = session.request(method, self.url + path, timeout=timeout, **kwargs)
+            self.__count(start, resp.status_code >= 500)
+            return resp
+        except Exception:
+            self.__count(start, True)
+            raise
+
+    def get_stats(self):
+        """
+        :rtype: dict
+        :return counters of requests: {"requests", "errors", "avg_latency_ms", "last_latency_ms"}
+        """
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "avg_latency_ms": round(self.total_latency * 1000 / self.requests, 2) if self.requests else None,
+                "last_latency_ms": round(self.last_latency * 1000, 2) if self.last_latency is not None else None}
+
+    def __count(self, start, failed):
+        latency = time.time() - start
+        with self.lock:
+            self.requests += 1
+            self.errors += 1 if failed else 0
+            self.total_latency += latency
+            self.last_latency = latency
+
+
 class HostedDockerFormation(Component):
     hackathon_template_manager = RequiredFeature("hackathon_template_manager")
     hackathon_manager = RequiredFeature("hackathon_manager")
@@ -39,39 +107,52 @@ class HostedDockerFormation(Component):
 
     def __init__(self):
         self.lock = Lock()
+        self.sessions = {}
 
     def report_health(self):
         """Report health of DockerHostServers
 
+        The health recorded by the latest probe(see probe_hosts) is reported, no request is sent to the hosts. A host
+        which is not probed recently is taken as down. Disabled hosts are not probed, so they are not reported either.
+
         :rtype: dict
         :return health status item of docker. OK when all servers running, Warning if some of them working,
             Error if no server running
         """
         try:
             # TODO skip hackathons that are offline or ended
-            hosts = self.db.find_all_objects(DockerHostServer)
+            hosts = DockerHostServer.objects(disabled=False)
             alive = 0
+            probes = {}
             for host in hosts:
-                if self.ping(host):
+                fresh = self.__is_health_fresh(host)
+                if fresh and host.health.alive:
                     alive += 1
+                probes[self.__get_vm_url(host)] = {
+                    "alive": host.health.alive if fresh else None,
+                    "latency_ms": host.health.latency if host.health else None,
+                    "last_seen": host.health.last_seen if host.health else None}
             if alive == len(hosts):
-                return {
+                health = {
                     HEALTH.STATUS: HEALTH_STATUS.OK
                 }
             elif alive > 0:
-                return {
+                health = {
                     HEALTH.STATUS: HEALTH_STATUS.WARNING,
                     HEALTH.DESCRIPTION: 'at least one docker host servers are down'
                 }
             else:
-                return {
+                health = {
                     HEALTH.STATUS: HEALTH_STATUS.ERROR,
                     HEALTH.DESCRIPTION: 'all docker host servers are down'
                 }
+            health["hosts"] = self.get_host_stats()
+            health["probes"] = self.util.make_serializable(probes)
+            return health
         except Exception as e:
             return {
                 HEALTH.STATUS: HEALTH_STATUS.ERROR,
-                HEALTH.DESCRIPTION: e.message
+                HEALTH.DESCRIPTION: str(e)
             }
 
     def create_container(self, docker_host, container_config, container_name):
@@ -82,8 +163,8 @@ class HostedDockerFormation(Component):
         :param container_name:
         :return:
         """
-        containers_url = '%s/containers/create?name=%s' % (self.__get_vm_url(docker_host), container_name)
-        req = requests.post(containers_url, data=json.dumps(container_config), headers=self.application_json)
+        req = self.__request(docker_host, "POST", '/containers/create?name=%s' % container_name,
+                             data=json.dumps(container_config), headers=self.application_json)
         self.log.debug(req.content)
         # todo check the http code first
         container = json.loads(req.content)
@@ -98,8 +179,8 @@ class HostedDockerFormation(Component):
         :param container_id:
         :return:
         """
-        url = '%s/containers/%s/start' % (self.__get_vm_url(docker_host), container_id)
-        req = requests.post(url, headers=self.application_json)
+        req = self.__request(docker_host, "POST", '/containers/%s/start' % container_id,
+                             headers=self.application_json)
         self.log.debug(req.content)
 
     def stop_container(self, host_server, container_name):
@@ -109,23 +190,26 @@ class HostedDockerFormation(Component):
         :param docker_host:
         :return:
         """
-        containers_url = '%s/containers/%s?force=1' % (self.__get_vm_url(host_server), container_name)
-        req = requests.delete(containers_url)
-        return req
+        return self.__request(host_server, "DELETE", '/containers/%s?force=1' % container_name)
 
     def pull_image(self, context):
-        # todo fix pull_image?
-        docker_host_id, image_name, tag = context.docker_host, context.image_name, context.tag
-        docker_host = self.db.find_first_object_by(DockerHostServer, id=docker_host_id)
+        """Pull image to docker host, see HackathonTemplateManager.pull_images_for_hackathon
+
+        :type context: Context
+        :param context: the context of schedule job, including docker_host(id), image and tag
+        """
+        docker_host_id, image_name, tag = context.docker_host, context.image, context.tag
+        docker_host = DockerHostServer.objects(id=docker_host_id).first()
         if not docker_host:
             return
-        pull_image_url = self.__get_vm_url(docker_host) + "/images/create?fromImage=" + image_name + '&tag=' + tag
-        self.log.debug(" send request to pull image:" + pull_image_url)
-        return requests.post(pull_image_url)
+        pull_image_path = "/images/create?fromImage=" + image_name + '&tag=' + tag
+        self.log.debug(" send request to pull image:" + pull_image_path)
+        # pulling an image takes minutes
+        return self.__request(docker_host, "POST", pull_image_path,
+                              timeout=self.util.safe_get_config("docker.pull_timeout", 600))
 
     def get_pulled_images(self, docker_host):
-        get_images_url = self.__get_vm_url(docker_host) + "/images/json?all=0"
-        current_images_info = json.loads(requests.get(get_images_url).content)  # [{},{},{}]
+        current_images_info = json.loads(self.__request(docker_host, "GET", "/images/json?all=0").content)  # [{},{},{}]
         current_images_tags = [x['RepoTags'] for x in current_images_info]  # [[],[],[]]
         return flatten(current_images_tags)  # [ imange:tag, image:tag ]
 
@@ -154,24 +238,80 @@ class HostedDockerFormation(Component):
         else:
             return False
 
-    def ping(self, docker_host, timeout=20):
+    def ping(self, docker_host, timeout=None):
         """Ping docker host to check running status
 
         :type docker_host : DockerHostServer
         :param docker_host: the hots that you want to check docker service running status
 
+        :type timeout: int
+        :param timeout: seconds to wait for the response, docker.read_timeout in config by default
+
         :type: bool
         :return: True: running status is OK, else return False
 
         """
         try:
-            ping_url = '%s/_ping' % self.__get_vm_url(docker_host)
-            req = requests.get(ping_url, timeout=timeout)
-            return req.status_code == 200 and req.content == 'OK'
+            req = self.__request(docker_host, "GET", '/_ping', timeout=timeout, retry=False)
+            return req.status_code == 200 and req.text == 'OK'
         except Exception as e:
             self.log.error(e)
             return False
 
+    def probe_hosts(self, hosts=None):
+        """Ping docker hosts concurrently and record the results in the health of hosts
+
+        It runs as an interval job so that report_health and DockerHostManager.get_available_docker_host read the
+        recorded health rather than waiting for dead hosts. Only the health is updated, the state of host is managed
+        by admins and the provisioning of hosts.
+
+        :type hosts: list
+        :param hosts: the hosts to probe, all enabled hosts by default
+
+        :rtype: int
+        :return count of alive hosts
+        """
+        if hosts is None:
+            hosts = list(DockerHostServer.objects(disabled=False))
+        if not hosts:
+            return 0
+
+        workers = min(len(hosts), self.util.safe_get_config("docker.probe_concurrency", 16))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(self.__probe_host, hosts))
+
+        window = self.util.safe_get_config("docker.probe_window", 10)
+        now = self.util.get_now()
+        updates = []
+        for host, (alive, latency) in zip(hosts, results):
+            changes = {"health.alive": alive, "health.latency": latency, "health.checked_time": now}
+            if alive:
+                changes["health.last_seen"] = now
+            updates.append(UpdateOne({"_id": host.id}, {
+                "$set": changes,
+                "$push": {"health.history": {"$each": [alive], "$slice": -window}}}))
+
+        DockerHostServer._get_collection().bulk_write(updates, ordered=False)
+        alive_count = len([r for r in results if r[0]])
+        self.log.debug("probed %d docker hosts, %d alive" % (len(hosts), alive_count))
+        return alive_count
+
+    def is_host_alive(self, docker_host):
+        """Whether docker host is alive according to the latest probe
+
+        The host is probed right now only if it's not probed recently, e.g. it was just added or the probe job is not
+        running.
+
+        :type docker_host: DockerHostServer
+        :param docker_host: the host to check
+
+        :rtype: bool
+        :return True if the docker remote api of host responds
+        """
+        if self.__is_health_fresh(docker_host):
+            return docker_host.health.alive
+        return self.probe_hosts([docker_host]) > 0
+
     def get_containers_detail_by_ve(self, virtual_environment):
         """Get all containers' detail from "Database" filtered by related virtual_environment
 
@@ -184,24 +324,87 @@ class HostedDockerFormation(Component):
             return self.util.make_serializable(container.to_mongo().to_dict())
         return {}
 
-    def list_containers(self, docker_host, timeout=20):
+    def list_containers(self, docker_host, timeout=None):
         """
         return: json(as list form) through "Docker restful API"
         """
-        containers_url = '%s/containers/json' % self.__get_vm_url(docker_host)
-        req = requests.get(containers_url, timeout=timeout)
+        req = self.__request(docker_host, "GET", '/containers/json', timeout=timeout)
         self.log.debug(req.content)
         return self.util.convert(json.loads(req.content))
 
+    def get_container_states(self, docker_host):
+        """Get running state of all containers on docker host by one request
+
+        The states are cached for a short while(see cache namespace docker_container_state), so that listing and
+        reconciling experiments don't inspect containers one by one.
+
+        :type docker_host: DockerHostServer
+        :param docker_host: the host of containers
+
+        :rtype: dict
+        :return {container id: True if running or restarting}. None if the host is unreachable
+        """
+        try:
+            return self.cache.get_cache(self.__get_vm_url(docker_host),
+                                        lambda: self.__list_container_states(docker_host),
+                                        namespace=CACHE_NAMESPACE.DOCKER_CONTAINER_STATE)
+        except Exception as e:
+            self.log.error("list containers of %s error: %s" % (docker_host.public_dns, e))
+            return None
+
     def get_container_by_name(self, container_name, docker_host):
         containers = self.list_containers(docker_host)
         return next((c for c in containers if container_name in c["Names"] or '/' + container_name in c["Names"]), None)
 
+    def get_host_stats(self):
+        """Latency and error counters of requests to docker hosts since the server started
+
+        :rtype: dict
+        :return {url of docker host: counters}, see DockerHostSession.get_stats
+        """
+        with self.lock:
+            sessions = list(self.sessions.values())
+        return dict((s.url, s.get_stats()) for s in sessions)
+
     # --------------------------------------------- helper function ---------------------------------------------#
 
     def __get_vm_url(self, docker_host):
         return 'http://%s:%d' % (docker_host.public_dns, docker_host.public_docker_api_port)
 
+    def __is_health_fresh(self, docker_host):
+        health = docker_host.health
+        if not health or not health.checked_time:
+            return False
+        stale_seconds = self.util.safe_get_config("docker.probe_stale_seconds", 90)
+        return health.checked_time > self.util.get_now() - timedelta(seconds=stale_seconds)
+
+    def __probe_host(self, docker_host):
+        start = time.time()
+        alive = self.ping(docker_host, timeout=self.util.safe_get_config("docker.probe_timeout", 5))
+        latency = round((time.time() - start) * 1000, 2) if alive else None
+        return alive, latency
+
+    def __get_session(self, docker_host):
+        url = self.__get_vm_url(docker_host)
+        with self.lock:
+            if url not in self.sessions:
+                self.sessions[url] = DockerHostSession(url,
+                                                       pool_size=self.util.safe_get_config("docker.pool_size", 10),
+                                                       retries=self.util.safe_get_config("docker.retries", 3),
+                                                       backoff_factor=self.util.safe_get_config(
+                                                           "docker.backoff_factor", 0.2))
+            return self.sessions[url]
+
+    def __request(self, docker_host, method, path, timeout=None, **kwargs):
+        """Send request to the docker remote api of host through the pooled session of host
+
+        :type timeout: int
+        :param timeout: seconds to wait for the response, docker.read_timeout in config by default
+        """
+        timeout = (self.util.safe_get_config("docker.connect_timeout", 3),
+                   timeout or self.util.safe_get_config("docker.read_timeout", 20))
+        return self.__get_session(docker_host).request(method, path, timeout, **kwargs)
+
     def __get_schedule_job_id(self, hackathon):
         return "pull_images_for_hackathon_%s" % hackathon.id
 
@@ -225,8 +428,22 @@ class HostedDockerFormation(Component):
                                             id=job_id,
                                             context=context,
                                             next_run_time=next_run_time,
+                                            executor=SCHEDULER_EXECUTOR.IMAGE,
                                             minutes=60)
 
+    def __list_container_states(self, docker_host):
+        req = self.__request(docker_host, "GET", '/containers/json?all=1')
+        req.raise_for_status()
+        states = {}
+        for c in json.loads(req.content):
+            state = c.get("State")
+            if isinstance(state, str):
+                states[c["Id"]] = state in ("running", "restarting")
+            else:
+                # remote api before 1.23 has no State in list
+                states[c["Id"]] = (c.get("Status") or "").startswith(("Up", "Restarting"))
+        return states
+
     def __get_container_info_by_container_id(self, docker_host, container_id):
         """get a container info by container_id from a docker host
 
@@ -238,8 +455,7 @@ class HostedDockerFormation(Component):
         :return dic object of the container info if not None
         """
         try:
-            get_container_url = self.__get_vm_url(docker_host) + "/containers/%s/json?all=0" % container_id
-            req = requests.get(get_container_url)
+            req = self.__request(docker_host, "GET", "/containers/%s/json?all=0" % container_id)
             if 300 > req.status_code >= 200:
                 container_info = json.loads(req.content)
                 return container_info
@@ -13,12 +13,23 @@ import string
 import pexpect
 from os.path import abspath, dirname, realpath
 
-from hackathon.hmongo.models import Experiment, VirtualEnvironment
-from hackathon.constants import VE_PROVIDER, VEStatus, VERemoteProvider, EStatus
+from hackathon import RequiredFeature
+from hackathon.hmongo.models import Experiment, VirtualEnvironment, DockerContainer
+from hackathon.constants import VE_PROVIDER, VEStatus, VERemoteProvider, EStatus, DHS_QUERY_STATE
 from hackathon.expr.expr_starter import ExprStarter
 
 
 class DockerExprStarter(ExprStarter):
+    """Start experiment on docker hosts
+
+    A container slot is reserved on a docker host before _internal_start_virtual_environment is called, the host is
+    saved as host_server of the docker container and its id is passed as docker_host_server_id in context. The slot
+    is released if the start fails, or by _on_virtual_environment_stopped which the subclasses call once the
+    container is removed. docker_container.slot_reserved records whether the slot is still held, so that it's
+    released once only.
+    """
+    docker_host_manager = RequiredFeature("docker_host_manager")
+
     def _internal_rollback(self, context):
         # currently rollback share the same process as stop
         self._internal_stop_expr(context)
@@ -56,6 +67,11 @@ class DockerExprStarter(ExprStarter):
             context.virtual_environment_name = ve.name
             self._stop_virtual_environment(ve, expr, context)
 
+    def _on_virtual_environment_stopped(self, context):
+        self.docker_host_manager.release_virtual_environment_slot(context.experiment_id,
+                                                                  context.virtual_environment_name)
+        super(DockerExprStarter, self)._on_virtual_environment_stopped(context)
+
     def __start_virtual_environment(self, context, docker_template_unit):
         origin_name = docker_template_unit.get_name()
         prefix = str(context.experiment_id)[0:9]
@@ -64,22 +80,50 @@ class DockerExprStarter(ExprStarter):
         docker_template_unit.set_name(new_name)
         self.log.debug("starting to start container: %s" % new_name)
 
-        # db document for VirtualEnvironment
-        ve = VirtualEnvironment(provider=VE_PROVIDER.DOCKER,
-                                name=new_name,
-                                image=docker_template_unit.get_image_with_tag(),
-                                status=VEStatus.INIT,
-                                remote_provider=VERemoteProvider.Guacamole)
+        placement = self.docker_host_manager.get_available_docker_host(context.hackathon_id)
+        if placement.state != DHS_QUERY_STATE.SUCCESS:
+            raise Exception("no docker host available for container %s" % new_name)
+        host_server = placement.docker_host_server
+
         # create a new context for current ve only
         context = context.copy()
-        experiment = Experiment.objects(id=context.experiment_id).no_dereference().only("virtual_environments").first()
-        experiment.virtual_environments.append(ve)
-        experiment.save()
-
-        # start container remotely , use hosted docker
-        context.virtual_environment_name = ve.name
+        context.virtual_environment_name = new_name
         context.unit = docker_template_unit
-        self._internal_start_virtual_environment(context)
+        context.docker_host_server_id = host_server.id
+        saved = False
+        try:
+            # db document for VirtualEnvironment, which holds the slot from now on
+            ve = VirtualEnvironment(provider=VE_PROVIDER.DOCKER,
+                                    name=new_name,
+                                    image=docker_template_unit.get_image_with_tag(),
+                                    status=VEStatus.INIT,
+                                    remote_provider=VERemoteProvider.Guacamole,
+                                    docker_container=DockerContainer(name=new_name,
+                                                                     image=docker_template_unit.get_image_with_tag(),
+                                                                     host_server=host_server,
+                                                                     slot_reserved=True))
+            experiment = Experiment.objects(id=context.experiment_id).no_dereference() \
+                .only("virtual_environments").first()
+            experiment.virtual_environments.append(ve)
+            experiment.save()
+            saved = True
+
+            # start container remotely , use hosted docker
+            self._internal_start_virtual_environment(context)
+        except Exception:
+            # no container created, give the slot back
+            if saved:
+                self.docker_host_manager.release_virtual_environment_slot(context.experiment_id, new_name)
+                self.__set_virtual_environment_failed(context)
+            else:
+                self.docker_host_manager.release_container_slot(host_server.id)
+            raise
+
+    @staticmethod
+    def __set_virtual_environment_failed(context):
+        expr = Experiment.objects(id=context.experiment_id).no_dereference().only("virtual_environments").first()
+        expr.virtual_environments.get(name=context.virtual_environment_name).status = VEStatus.FAILED
+        expr.save()
 
     def _enable_guacd_file_transfer(self, context):
         """
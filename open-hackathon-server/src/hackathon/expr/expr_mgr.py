@@ -4,28 +4,42 @@ This file is covered by the LICENSING file in the root of this project.
 """
 
 import sys
+import time
+import random
+import threading
 
 sys.path.append("..")
 from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 from werkzeug.exceptions import PreconditionFailed, NotFound
-from mongoengine import Q
+from mongoengine import Q, OperationError
+from pymongo import UpdateOne
+from pymongo.errors import AutoReconnect
 
 from hackathon import Component, RequiredFeature, Context
 from hackathon.constants import EStatus, VERemoteProvider, VE_PROVIDER, VEStatus, ReservedUser, \
-    HACK_NOTICE_EVENT, HACK_NOTICE_CATEGORY, CLOUD_PROVIDER, HACKATHON_CONFIG
-from hackathon.hmongo.models import Experiment, User, Hackathon, UserHackathon, Template
+    HACK_NOTICE_EVENT, HACK_NOTICE_CATEGORY, CLOUD_PROVIDER, HACKATHON_CONFIG, HEALTH, HEALTH_STATUS, SCHEDULER_EXECUTOR
+from hackathon.hmongo.models import Experiment, User, Hackathon, UserHackathon, Template, DockerHostServer
 from hackathon.hackathon_response import not_found, ok
 
 __all__ = ["ExprManager"]
 
 
 class ExprManager(Component):
+    # requests of pre-allocated experiments, see report_pool_health
+    __pool_stat = {"hit": 0, "miss": 0}
+    __pool_stat_lock = threading.Lock()
+    # shared by the pre-allocate jobs of all hackathons to bound the experiments starting in parallel
+    __pre_alloc_pool = None
+    __pre_alloc_pool_lock = threading.Lock()
+
     user_manager = RequiredFeature("user_manager")
     hackathon_manager = RequiredFeature("hackathon_manager")
     admin_manager = RequiredFeature("admin_manager")
     template_library = RequiredFeature("template_library")
     hosted_docker_proxy = RequiredFeature("hosted_docker_proxy")
+    docker_host_manager = RequiredFeature("docker_host_manager")
 
     def start_expr(self, user, template_name, hackathon_name=None):
         """
@@ -40,14 +54,97 @@ class ExprManager(Component):
         hackathon = self.__verify_hackathon(hackathon_name)
         template = self.__verify_template(hackathon, template_name)
 
-        if user:
-            expr = self.__check_expr_status(user, hackathon, template)
-            if expr:
-                return self.__report_expr_status(expr)
+        if user and hackathon:
+            return self.__add_poll_hint(self.__report_expr_status(self.claim_expr(user, hackathon, template)), 0)
 
         # new expr
         return self.__start_new_expr(hackathon, template, user)
 
+    def claim_expr(self, user, hackathon, template):
+        """Get an experiment of template for user
+
+        The starting or running experiment of user is returned if any. Otherwise a pre-allocated experiment is
+        claimed in one atomic update, or a new experiment is queued to start if the pool is empty. The call never
+        waits for the experiment to start, and an experiment is never handed to two users.
+
+        :type user: User
+        :param user: the user who requests the experiment
+
+        :type hackathon: Hackathon
+        :param hackathon: the hackathon of experiment
+
+        :type template: Template
+        :param template: the template of experiment
+
+        :rtype: Experiment
+        :return the experiment of user, status of which may be INIT, STARTING or RUNNING
+        """
+        criterion = Q(status__in=[EStatus.INIT, EStatus.STARTING, EStatus.RUNNING], hackathon=hackathon.id,
+                      user=user.id)
+        if self.admin_manager.is_hackathon_admin(hackathon.id, user.id):
+            criterion &= Q(template=template.id)
+
+        expr = Experiment.objects(criterion).first()
+        if expr:
+            # user has a running/starting experiment. The start job of a queued one may be lost, e.g. the server
+            # restarted before the job was saved, queue it again. The pending job is replaced if it still exists
+            if expr.status == EStatus.INIT:
+                self.__queue_expr_start(expr)
+            return expr
+
+        expr = self.__retry_on_transient_error(
+            lambda: Experiment.objects(status=EStatus.RUNNING, hackathon=hackathon.id, template=template.id,
+                                       user=None).modify(user=user.id, update_time=self.util.get_now(), new=True))
+        if hackathon.config.get(HACKATHON_CONFIG.PRE_ALLOCATE_ENABLED, False):
+            with ExprManager.__pool_stat_lock:
+                ExprManager.__pool_stat["hit" if expr else "miss"] += 1
+        if expr:
+            return expr
+
+        # the pool is empty, queue a new one. Upsert so that an experiment queued since the query above is reused.
+        # It narrows but doesn't close the race of concurrent requests of the user: there is no unique index of
+        # (user, hackathon, template) since stopped experiments are kept, two of them may be queued in rare cases
+        now = self.util.get_now()
+        expr = self.__retry_on_transient_error(
+            lambda: Experiment.objects(criterion).modify(upsert=True, new=True,
+                                                         set_on_insert__status=EStatus.INIT,
+                                                         set_on_insert__template=template.id,
+                                                         set_on_insert__virtual_environments=[],
+                                                         set_on_insert__create_time=now,
+                                                         set_on_insert__update_time=now))
+        if expr.status == EStatus.INIT:
+            self.__queue_expr_start(expr)
+        return expr
+
+    def start_queued_expr(self, context):
+        """Start the experiment queued by claim_expr or start_expr
+
+        :type context: Context
+        :param context: the context of schedule job, including experiment_id
+        """
+        # take the experiment atomically, it may be queued more than once by claim_expr
+        expr = Experiment.objects(id=context.experiment_id, status=EStatus.INIT).modify(status=EStatus.STARTING,
+                                                                                        new=True)
+        if not expr:
+            return False
+
+        try:
+            starter = self.get_starter(expr.hackathon, expr.template)
+            if not starter:
+                raise PreconditionFailed("either template not supported or hackathon resource not configured")
+
+            return starter.start_expr(Context(
+                template=expr.template,
+                user=expr.user,
+                hackathon=expr.hackathon,
+                experiment_id=expr.id,
+                pre_alloc_enabled=False)) is not None
+        except Exception as e:
+            self.log.error("start queued experiment %s failed: %s" % (expr.id, e))
+            expr.status = EStatus.FAILED
+            expr.save()
+            return False
+
     def restart_stopped_expr(self, experiment_id):
         experiment = Experiment.objects(id=experiment_id).first()
         for ve in experiment.virtual_environments:
@@ -58,7 +155,7 @@ class ExprManager(Component):
             elif ve.provider == VE_PROVIDER.AZURE:
                 raise NotImplementedError()
 
-        self.__check_expr_real_status(experiment)
+        self.reconcile_expr_status([experiment])
         return experiment.dic()
 
     def heart_beat(self, expr_id):
@@ -71,28 +168,64 @@ class ExprManager(Component):
         return ok()
 
     def stop_expr(self, expr_id):
-        """
+        """Stop experiment asynchronously, the resources are released by a schedule job
+
         :param expr_id: experiment id
         :return:
         """
         self.log.debug("begin to stop %s" % str(expr_id))
-        expr = Experiment.objects(id=expr_id).first()
+        expr = Experiment.objects(id=expr_id).only("id").first()
         if expr is not None:
-            starter = self.get_starter(expr.hackathon, expr.template)
-            if starter:
-                starter.stop_expr(Context(experiment_id=expr.id, experiment=expr))
-            self.log.debug("experiment %s ended success" % expr_id)
+            self.scheduler.add_once("expr_manager", "stop_queued_expr", context=Context(experiment_id=str(expr.id)),
+                                    id="stop_expr_" + str(expr.id), executor=SCHEDULER_EXECUTOR.PROVISION, seconds=0)
             return ok('OK')
         else:
             return ok()
 
-    def get_expr_status_and_confirm_starting(self, expr_id):
+    def stop_queued_expr(self, context):
+        """Stop the experiment queued by stop_expr
+
+        :type context: Context
+        :param context: the context of schedule job, including experiment_id
+        """
+        expr = Experiment.objects(id=context.experiment_id).first()
+        if expr is None:
+            return False
+
+        starter = self.get_starter(expr.hackathon, expr.template)
+        if starter:
+            starter.stop_expr(Context(experiment_id=expr.id, experiment=expr))
+        self.log.debug("experiment %s ended success" % expr.id)
+        return True
+
+    def get_expr_status_and_confirm_starting(self, expr_id, attempt=0):
+        """Report status of experiment
+
+        The response is never held by server, since a waiting request ties up a worker. While the experiment is
+        queued(INIT) or starting, "poll_after" tells the client how many seconds to wait before it polls again, which
+        backs off exponentially with the attempts of client.
+
+        :type attempt: int
+        :param attempt: how many times the client has polled the status of experiment
+        """
         expr = Experiment.objects(id=expr_id).first()
-        if expr:
-            return self.__report_expr_status(expr, isToConfirmExprStarting=True)
-        else:
+        if not expr:
             return not_found('Experiment Not found')
 
+        return self.__add_poll_hint(self.__report_expr_status(expr, isToConfirmExprStarting=True), attempt)
+
+    def get_poll_interval(self, attempt):
+        """Seconds that client waits before polling the status of a starting experiment again
+
+        :type attempt: int
+        :param attempt: how many times the client has polled
+
+        :rtype: float
+        """
+        interval = self.util.safe_get_config("experiment.poll_interval", 1)
+        max_interval = self.util.safe_get_config("experiment.poll_max_interval", 16)
+        return min(max_interval, interval * 2 ** min(max(attempt, 0), 16))
+
     def check_expr_status(self, experiment):
         # update experiment status
         virtual_environment_list = experiment.virtual_environments
@@ -114,15 +247,21 @@ class ExprManager(Component):
         users = User.objects(name=user_name).all() if user_name else []
 
         if user_name and status:
-            experiments_pagi = Experiment.objects(hackathon=hackathon, status=status, user__in=users).paginate(page,
-                                                                                                               per_page)
+            experiments = Experiment.objects(hackathon=hackathon, status=status, user__in=users)
         elif user_name and not status:
-            experiments_pagi = Experiment.objects(hackathon=hackathon, user__in=users).paginate(page, per_page)
+            experiments = Experiment.objects(hackathon=hackathon, user__in=users)
         elif not user_name and status:
-            experiments_pagi = Experiment.objects(hackathon=hackathon, status=status).paginate(page, per_page)
+            experiments = Experiment.objects(hackathon=hackathon, status=status)
+        else:
+            experiments = Experiment.objects(hackathon=hackathon)
+
+        if "cursor" in context:
+            # paginate by cursor rather than page number
+            experiments_pagi = experiments.cursor_paginate("id", context.cursor, per_page, with_total=True)
         else:
-            experiments_pagi = Experiment.objects(hackathon=hackathon).paginate(page, per_page)
+            experiments_pagi = experiments.paginate(page, per_page)
 
+        self.reconcile_expr_status(experiments_pagi.items)
         return self.util.paginate(experiments_pagi, self.__get_expr_with_detail)
 
     def scheduler_recycle_expr(self):
@@ -147,39 +286,151 @@ class ExprManager(Component):
             except Exception as e:
                 self.log.error(e)
 
+    def reconcile_expr_status(self, experiments=None):
+        """Sync status of docker experiments with the state of their containers
+
+        Containers of each docker host are listed by one request(cached for a few seconds) rather than inspected one
+        by one, and only the changed experiments are written back in one bulk write.
+
+        :type experiments: list
+        :param experiments: the experiments to reconcile, which are updated in place. If None, which is how the
+            background job runs, the running docker experiments and those stopped within
+            docker.reconcile_stopped_minutes are loaded, with only the fields needed here
+
+        :rtype: int
+        :return count of experiments changed
+        """
+        if experiments is None:
+            stopped_since = self.util.get_now() - timedelta(
+                minutes=self.util.safe_get_config("docker.reconcile_stopped_minutes", 60))
+            experiments = Experiment.objects(
+                Q(status=EStatus.RUNNING) | Q(status=EStatus.STOPPED, update_time__gte=stopped_since),
+                virtual_environments__provider=VE_PROVIDER.DOCKER).only("status", "virtual_environments")
+        experiments = [e for e in experiments if any(ve.provider == VE_PROVIDER.DOCKER and ve.docker_container
+                                                     for ve in e.virtual_environments)]
+        if not experiments:
+            return 0
+
+        # read the raw reference of host rather than dereference it per container
+        host_ids = set(self.__get_docker_host_id(ve) for e in experiments for ve in e.virtual_environments
+                       if ve.provider == VE_PROVIDER.DOCKER and ve.docker_container)
+        hosts = DockerHostServer.objects(id__in=[h for h in host_ids if h])
+        states = dict((h.id, self.hosted_docker_proxy.get_container_states(h)) for h in hosts)
+
+        now = self.util.get_now()
+        updates = []
+        # containers died free their slots of docker host, and the ones back take their slots again
+        slots = []
+        for expr in experiments:
+            changes = {}
+            for i, ve in enumerate(expr.virtual_environments):
+                if ve.provider != VE_PROVIDER.DOCKER or not ve.docker_container:
+                    continue
+                host_states = states.get(self.__get_docker_host_id(ve))
+                if host_states is None:
+                    # host is unreachable, keep the status as it's unknown
+                    continue
+                running = host_states.get(ve.docker_container.container_id, False)
+                if not running and ve.status == VEStatus.RUNNING:
+                    ve.status = VEStatus.STOPPED
+                    slots.append((self.docker_host_manager.release_virtual_environment_slot, expr.id, ve.name))
+                elif running and ve.status == VEStatus.STOPPED:
+                    ve.status = VEStatus.RUNNING
+                    slots.append((self.docker_host_manager.hold_virtual_environment_slot, expr.id, ve.name))
+                else:
+                    continue
+                changes["virtual_environments.%d.status" % i] = ve.status
+
+            if all(ve.status == VEStatus.STOPPED for ve in expr.virtual_environments):
+                expr.status = EStatus.STOPPED
+            if all(ve.status == VEStatus.RUNNING for ve in expr.virtual_environments):
+                expr.status = EStatus.RUNNING
+            if changes:
+                expr.update_time = now
+                changes.update(status=expr.status, update_time=now)
+                updates.append(UpdateOne({"_id": expr.id}, {"$set": changes}))
+
+        if updates:
+            Experiment._get_collection().bulk_write(updates, ordered=False)
+        for flip, expr_id, ve_name in slots:
+            flip(expr_id, ve_name)
+        self.log.debug("reconciled %d experiments, %d changed" % (len(experiments), len(updates)))
+        return len(updates)
+
+    def recycle_ended_hackathon_exprs(self, hackathon):
+        """Tear down the active k8s experiments of an ended hackathon
+
+        It's an explicit command of admin(see manager.py) rather than part of the recycle job. Experiments of the
+        hackathon are torn down together by the hackathon label rather than one by one.
+
+        :type hackathon: Hackathon
+        :param hackathon: the hackathon which has ended
+
+        :rtype: int
+        :return count of experiments torn down
+        """
+        if not hackathon.event_end_time or hackathon.event_end_time > self.util.get_now():
+            raise PreconditionFailed("hackathon %s has not ended yet" % hackathon.name)
+        if hackathon.config.get("cloud_provider") != CLOUD_PROVIDER.KUBERNETES:
+            return 0
+        return RequiredFeature("k8s_service").stop_hackathon_exprs(hackathon)
+
     def pre_allocate_expr(self, context):
-        # TODO: too complex, not check
-        hackathon_id = context.hackathon_id
-        self.log.debug("executing pre_allocate_expr for hackathon %s " % hackathon_id)
-        hackathon = Hackathon.objects(id=hackathon_id).first()
-        hackathon_templates = hackathon.templates
-        for template in hackathon_templates:
-            try:
-                template = template
-                pre_num = int(hackathon.config.get(HACKATHON_CONFIG.PRE_ALLOCATE_NUMBER, 1))
-                query = Q(status=EStatus.STARTING) | Q(status=EStatus.RUNNING)
-                curr_num = Experiment.objects(user=None, hackathon=hackathon, template=template).filter(query).count()
-                self.log.debug("pre_alloc_exprs: pre_num is %d, curr_num is %d, remain_num is %d " %
-                               (pre_num, curr_num, pre_num - curr_num))
-
-                # TODO Should support VE_PROVIDER.K8S only in future after k8s Template is supported
-                # if template.provider == VE_PROVIDER.K8S:
-                if curr_num < pre_num:
-                    start_num = Experiment.objects(user=None, template=template, status=EStatus.STARTING).count()
-                    allowed_currency = int(hackathon.config.get(HACKATHON_CONFIG.PRE_ALLOCATE_CONCURRENT, 1))
-                    if start_num >= allowed_currency:
-                        self.log.debug(
-                            "there are already %d Experiments starting, will check later ... " % allowed_currency)
-                        return
-                    else:
-                        remain_num = min(allowed_currency, pre_num) - start_num
-                        self.log.debug(
-                            "no starting template: %s , remain num is %d ... " % (template.name, remain_num))
-                        self.start_pre_alloc_exprs(None, template.name, hackathon.name, remain_num)
-                        break
-            except Exception as e:
-                self.log.error(e)
-                self.log.error("check default experiment failed")
+        """Top up the warm pool of pre-allocated experiments of hackathon
+
+        Running or starting experiments which are not assigned to any user make up the pool of each template. The
+        deficits of all templates are computed by one aggregation and shared round robin by the starting slots, so
+        that no more than PRE_ALLOCATE_CONCURRENT experiments of the hackathon are starting at the same time. The
+        experiments are started in parallel by a pool shared by all hackathons.
+
+        :type context: Context
+        :param context: the context of schedule job, including hackathon_id
+
+        :rtype: int
+        :return count of experiments started
+        """
+        hackathon = Hackathon.objects(id=context.hackathon_id).first()
+        if not hackathon or not hackathon.templates:
+            return 0
+
+        pre_num = int(hackathon.config.get(HACKATHON_CONFIG.PRE_ALLOCATE_NUMBER, 1))
+        allowed_concurrency = int(hackathon.config.get(HACKATHON_CONFIG.PRE_ALLOCATE_CONCURRENT, 1))
+        pooled = self.__get_pooled_expr_count(hackathon)
+        slots = allowed_concurrency - sum(c for (_, status), c in pooled.items() if status == EStatus.STARTING)
+        deficits = [[t, pre_num - pooled.get((t.id, EStatus.RUNNING), 0) - pooled.get((t.id, EStatus.STARTING), 0)]
+                    for t in hackathon.templates]
+        self.log.debug("pre_allocate_expr for hackathon %s: slots %d, deficits %s" %
+                       (hackathon.name, slots, [(t.name, d) for t, d in deficits]))
+
+        templates = []
+        while slots > 0 and any(d > 0 for _, d in deficits):
+            for deficit in deficits:
+                if deficit[1] > 0 and slots > 0:
+                    templates.append(deficit[0])
+                    deficit[1] -= 1
+                    slots -= 1
+
+        if not templates:
+            return 0
+        pool = self.__get_pre_alloc_pool()
+        started = list(pool.map(lambda t: self.__start_pooled_expr(hackathon, t), templates))
+        return started.count(True)
+
+    def report_pool_health(self):
+        """Report the hit rate of the warm pool since the server started
+
+        A hit means a user is assigned a pre-allocated experiment rather than waiting for a new one. Only requests
+        of hackathons with pre-allocation enabled are counted.
+
+        :rtype: dict
+        """
+        with ExprManager.__pool_stat_lock:
+            hit, miss = ExprManager.__pool_stat["hit"], ExprManager.__pool_stat["miss"]
+        return {
+            HEALTH.STATUS: HEALTH_STATUS.OK,
+            "hit": hit,
+            "miss": miss,
+            "hit_rate": round(float(hit) / (hit + miss), 4) if hit + miss else None}
 
     def assign_expr_to_admin(self, expr):
         """assign expr to admin to trun expr into pre_allocate_expr
@@ -235,44 +486,33 @@ class ExprManager(Component):
         if not starter:
             raise PreconditionFailed("either template not supported or hackathon resource not configured")
 
-        context = starter.start_expr(Context(
-            template=template,
-            user=user,
-            hackathon=hackathon,
-            pre_alloc_enabled=False))
-
-        return self.__report_expr_status(context.experiment)
-
-    def start_pre_alloc_exprs(self, user, template_name, hackathon_name=None, pre_alloc_num=0):
-        self.log.debug("start_pre_alloc_exprs: %d " % pre_alloc_num)
-        if pre_alloc_num == 0:
-            return
-
-        hackathon = self.__verify_hackathon(hackathon_name)
-        template = self.__verify_template(hackathon, template_name)
-
-        starter = self.get_starter(hackathon, template)
-        if not starter:
-            raise PreconditionFailed("either template not supported or hackathon resource not configured")
+        expr = Experiment(status=EStatus.INIT,
+                          template=template,
+                          user=user,
+                          virtual_environments=[],
+                          hackathon=hackathon)
+        expr.save()
+        self.__queue_expr_start(expr)
+        return self.__report_expr_status(expr)
 
-        while pre_alloc_num > 0:
-            context = starter.start_expr(Context(
-                template=template,
-                user=user,
-                hackathon=hackathon,
-                pre_alloc_enabled=True))
+    def __queue_expr_start(self, expr):
+        """Start experiment in a schedule job, so that the request returns immediately
 
-            if context == None:
-                self.log.debug("pre_alloc_num left: %d " % pre_alloc_num)
-                break
-            else:
-                self.__report_expr_status(context.experiment)
-                pre_alloc_num -= 1
+        Jobs are persisted by the job store of scheduler, they survive restart of server.
+        """
+        self.scheduler.add_once("expr_manager", "start_queued_expr", context=Context(experiment_id=str(expr.id)),
+                                id="start_expr_" + str(expr.id), executor=SCHEDULER_EXECUTOR.PROVISION, seconds=0)
 
     def on_expr_started(self, experiment):
         hackathon = experiment.hackathon
         user = experiment.user
 
+    def __add_poll_hint(self, ret, attempt):
+        # the reported status may differ from the one in db, e.g. STARTING if guacamole isn't ready
+        if isinstance(ret, dict) and ret.get("status") in (EStatus.INIT, EStatus.STARTING):
+            ret["poll_after"] = self.get_poll_interval(attempt)
+        return ret
+
     def __report_expr_status(self, expr, isToConfirmExprStarting=False):
         # todo check whether need to restart Window-expr if it shutdown
         ret = {
@@ -363,30 +603,54 @@ class ExprManager(Component):
 
         return template
 
-    def __check_expr_status(self, user, hackathon, template):
-        """
-        check experiment status, if there are pre-allocate experiments, the experiment will be assigned directly
-        :param user:
-        :param hackathon:
-        :param template:
-        :return:
+    def __retry_on_transient_error(self, func):
+        """Call func, retry with exponential backoff if MongoDB is unreachable for a moment, e.g. failover"""
+        retries = self.util.safe_get_config("experiment.claim_retries", 3)
+        backoff = self.util.safe_get_config("experiment.claim_backoff_seconds", 0.05)
+        for attempt in range(retries + 1):
+            try:
+                return func()
+            except (AutoReconnect, OperationError) as e:
+                if attempt >= retries:
+                    raise
+                self.log.debug("retry claiming experiment after error: %s" % e)
+                time.sleep(backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def __get_pooled_expr_count(self, hackathon):
+        """Count the pre-allocated experiments of hackathon
+
+        :rtype: dict
+        :return {(template_id, status): count}
         """
-        criterion = Q(status__in=[EStatus.RUNNING, EStatus.STARTING], hackathon=hackathon, user=user)
-        is_admin = self.admin_manager.is_hackathon_admin(hackathon.id, user.id)
-        if is_admin:
-            criterion &= Q(template=template)
+        counts = Experiment.objects(hackathon=hackathon.id, status__in=[EStatus.STARTING, EStatus.RUNNING],
+                                    user=None).aggregate([
+            {"$group": {"_id": {"template": "$template", "status": "$status"}, "count": {"$sum": 1}}}])
+        return dict(((c["_id"]["template"], c["_id"]["status"]), c["count"]) for c in counts)
+
+    def __get_pre_alloc_pool(self):
+        with ExprManager.__pre_alloc_pool_lock:
+            if ExprManager.__pre_alloc_pool is None:
+                ExprManager.__pre_alloc_pool = ThreadPoolExecutor(
+                    max_workers=self.util.safe_get_config("experiment.pre_allocate_concurrency", 8),
+                    thread_name_prefix="pre-allocate")
+            return ExprManager.__pre_alloc_pool
+
+    def __start_pooled_expr(self, hackathon, template):
+        try:
+            starter = self.get_starter(hackathon, template)
+            if not starter:
+                self.log.debug("pre_allocate_expr: template %s not supported" % template.name)
+                return False
 
-        expr = Experiment.objects(criterion).first()
-        if expr:
-            # user has a running/starting experiment
-            return expr
-
-        # try to assign pre-configured expr to user
-        expr = Experiment.objects(status=EStatus.RUNNING, hackathon=hackathon, template=template, user=None).first()
-        if expr:
-            expr.user = user
-            expr.save()
-            return expr
+            context = starter.start_expr(Context(
+                template=template,
+                user=None,
+                hackathon=hackathon,
+                pre_alloc_enabled=True))
+            return context is not None
+        except Exception as e:
+            self.log.error("pre_allocate_expr of template %s failed: %s" % (template.name, e))
+            return False
 
     def roll_back(self, expr_id):
         """
@@ -407,30 +671,15 @@ class ExprManager(Component):
         return starter.rollback(Context(experiment=expr))
 
     def __get_expr_with_detail(self, experiment):
-        self.__check_expr_real_status(experiment)
         info = experiment.dic()
         # replace OjbectId with user info
         info['user'] = self.user_manager.user_display_info(experiment.user)
         return info
 
-    def __check_expr_real_status(self, experiment):
-        # todo: it is only support for hosted_docker right now. Please support Window-expr in future
-        for ve in experiment.virtual_environments:
-            if ve.provider == VE_PROVIDER.DOCKER:
-                if not self.hosted_docker_proxy.is_container_running(ve.docker_container):
-                    if ve.status == VEStatus.RUNNING:
-                        ve.status = VEStatus.STOPPED
-                else:
-                    if ve.status == VEStatus.STOPPED:
-                        ve.status = VEStatus.RUNNING
-            elif ve.provider == VE_PROVIDER.AZURE:
-                raise NotImplementedError()
-        if all(ve.status == VEStatus.STOPPED for ve in experiment.virtual_environments):
-            experiment.status = EStatus.STOPPED
-        if all(ve.status == VEStatus.RUNNING for ve in experiment.virtual_environments):
-            experiment.status = EStatus.RUNNING
-        experiment.update_time = self.util.get_now()
-        experiment.save()
+    @staticmethod
+    def __get_docker_host_id(ve):
+        ref = ve.docker_container._data.get("host_server")
+        return getattr(ref, "id", ref)
 
     def __recycle_expr(self, expr):
         """recycle expr
@@ -26,12 +26,16 @@ class ExprStarter(Component):
         :param context: the execution context.
 
         """
-        expr = Experiment(status=EStatus.INIT,
-                          template=context.template,
-                          user=context.user,
-                          virtual_environments=[],
-                          hackathon=context.hackathon)
-        expr.save()
+        if context.get("experiment_id"):
+            # experiment queued by ExprManager.claim_expr
+            expr = Experiment.objects.get(id=context.experiment_id)
+        else:
+            expr = Experiment(status=EStatus.INIT,
+                              template=context.template,
+                              user=context.user,
+                              virtual_environments=[],
+                              hackathon=context.hackathon)
+            expr.save()
 
         template_content = self.template_library.load_template(context.template)
         expr.status = EStatus.STARTING
@@ -99,7 +103,7 @@ class ExprStarter(Component):
 
         if all(ve.status == VEStatus.STOPPED for ve in expr.virtual_environments):
             expr.status = EStatus.STOPPED
-            expr.save()
+        expr.save()
 
     def _on_virtual_environment_unexpected_error(self, context):
         self.log.warn("experiment unexpected error: " + context.experiment_id)
@@ -6,18 +6,25 @@ import yaml
 import time
 import string
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from hackathon import Context
 from hackathon.expr.expr_starter import ExprStarter
 from hackathon.hmongo.models import K8sEnvironment
 from hackathon.hmongo.models import Hackathon, VirtualEnvironment, Experiment
 from hackathon.constants import (VE_PROVIDER, VERemoteProvider, VEStatus, EStatus)
 from hackathon.hackathon_response import internal_server_error
-from hackathon.constants import K8S_DEPLOYMENT_STATUS
+from hackathon.constants import K8S_LABEL, SCHEDULER_EXECUTOR
 from hackathon.template.template_constants import K8S_UNIT
 from hackathon.hk8s.k8s_service_adapter import K8SServiceAdapter
 
 
 class K8SExprStarter(ExprStarter):
+    # shared by all experiments to bound the concurrent requests to k8s api servers
+    __provision_pool = None
+    __provision_pool_lock = threading.Lock()
+
     def _internal_start_expr(self, context):
         hackathon = Hackathon.objects.get(id=context.hackathon_id)
         experiment = Experiment.objects.get(id=context.experiment_id)
@@ -32,15 +39,15 @@ class K8SExprStarter(ExprStarter):
         if user:
             _virtual_envs = experiment.virtual_environments
             _env_name += str("-" + user.name).lower()
-        _env_name = "{}-{}".format(_env_name, "".join(random.sample(string.lowercase, 6)))
+        _env_name = "{}-{}".format(_env_name, "".join(random.sample(string.ascii_lowercase, 6)))
 
         try:
             if not _virtual_envs:
                 # Get None VirtualEnvironment, create new one:
                 labels = {
-                    "hacking.kaiyuanshe.cn/hackathon": str(hackathon.id),
-                    "hacking.kaiyuanshe.cn/experiment": str(experiment.id),
-                    "hacking.kaiyuanshe.cn/virtual_environment": _env_name,
+                    K8S_LABEL.HACKATHON: str(hackathon.id),
+                    K8S_LABEL.EXPERIMENT: str(experiment.id),
+                    K8S_LABEL.VIRTUAL_ENVIRONMENT: _env_name,
                 }
                 k8s_env = self.__create_useful_k8s_resource(_env_name, template_content, labels)
 
@@ -79,62 +86,79 @@ class K8SExprStarter(ExprStarter):
         self.__schedule_stop(context)
 
     def __schedule_start(self, ctx):
-        self.scheduler.add_once("k8s_service", "schedule_start_k8s_service", context=ctx,
-                                id="schedule_setup_" + str(ctx.experiment_id), seconds=0)
+        # only the id is saved into job store, the job loads experiment and template by itself
+        self.scheduler.add_once("k8s_service", "schedule_start_k8s_service",
+                                context=Context(experiment_id=str(ctx.experiment_id)),
+                                id="schedule_setup_" + str(ctx.experiment_id), executor=SCHEDULER_EXECUTOR.PROVISION,
+                                seconds=0)
 
     def __schedule_stop(self, ctx):
-        self.scheduler.add_once("k8s_service", "schedule_stop_k8s_service", context=ctx,
-                                id="schedule_stop_" + str(ctx.experiment_id), seconds=0)
+        self.scheduler.add_once("k8s_service", "schedule_stop_k8s_service",
+                                context=Context(experiment_id=str(ctx.experiment_id)),
+                                id="schedule_stop_" + str(ctx.experiment_id), executor=SCHEDULER_EXECUTOR.PROVISION,
+                                seconds=0)
 
     def schedule_start_k8s_service(self, context):
         experiment = Experiment.objects.get(id=context.experiment_id)
         virtual_env = experiment.virtual_environments[0]
         k8s_resource = virtual_env.k8s_resource
-        adapter = self.__get_adapter_from_ctx(K8SServiceAdapter, context)
+        adapter = self.__get_adapter_from_cluster(experiment.template.k8s_cluster)
 
         try:
-            for pvc in k8s_resource.persistent_volume_claims:
-                adapter.create_k8s_pvc(pvc)
-
-            for i, s in enumerate(k8s_resource.services):
-                svc_name = adapter.create_k8s_service(s)
-                # overwrite service config and get the public port from K8s
-                k8s_resource.services[i] = yaml.dump(adapter.get_service_by_name(svc_name))
-
-            for d in k8s_resource.deployments:
-                adapter.create_k8s_deployment(d)
-
-            for s in k8s_resource.stateful_sets:
-                adapter.create_k8s_statefulset(s)
+            experiment.provision_timings = self.__provision(adapter, k8s_resource)
+            experiment.save()
 
-            self.__wait_for_k8s_ready(adapter, k8s_resource.deployments, k8s_resource.stateful_sets)
-            self.__config_endpoint(experiment, k8s_resource.services)
+            self.__wait_for_k8s_ready(adapter, experiment, k8s_resource.deployments, k8s_resource.services)
         except Exception as e:
             self.log.error("k8s_service_start_failed: {}".format(e))
 
     def schedule_stop_k8s_service(self, context):
         experiment = Experiment.objects.get(id=context.experiment_id)
-        virtual_envs = experiment.virtual_environments
-        adapter = self.__get_adapter_from_ctx(K8SServiceAdapter, context)
         try:
-            for virtual_env in virtual_envs:
-                for d in virtual_env.deployments:
-                    adapter.delete_k8s_deployment(d['metadata']['name'])
-
-                for pvc in virtual_env.persistent_volume_claims:
-                    adapter.delete_k8s_pvc(pvc['metadata']['name'])
-
-                for s in virtual_env.stateful_sets:
-                    adapter.delete_k8s_statefulset(s['metadata']['name'])
-
-                for s in virtual_env.services:
-                    adapter.delete_k8s_service(s['metadata']['name'])
-
+            adapter = self.__get_adapter_from_cluster(experiment.template.k8s_cluster)
+            # all resources of experiment are labeled by TemplateRender
+            adapter.delete_by_labels({K8S_LABEL.EXPERIMENT: str(experiment.id)})
             self.log.debug("k8s_service_stop: {}".format(context))
         except Exception as e:
             self.log.error("k8s_service_stop_failed: {}".format(e))
         experiment.delete()
 
+    def stop_hackathon_exprs(self, hackathon):
+        """Tear down the active k8s experiments of hackathon
+
+        Resources are deleted by the hackathon label, one collection request per kind of resource and cluster no
+        matter how many experiments there are. Experiments are deleted cluster by cluster once their resources are
+        deleted, those on a failed cluster are kept so that the teardown can be run again. Stopped experiments are
+        left as they are.
+
+        :type hackathon: Hackathon
+        :param hackathon: the hackathon whose experiments are torn down
+
+        :rtype: int
+        :return count of experiments torn down
+        """
+        experiments = Experiment.objects(hackathon=hackathon.id, virtual_environments__provider=VE_PROVIDER.K8S,
+                                         status__in=[EStatus.INIT, EStatus.STARTING, EStatus.RUNNING])
+        clusters = {}
+        for template in experiments.distinct("template"):
+            cluster = template.k8s_cluster
+            if cluster:
+                key = (cluster.api_url, cluster.namespace)
+                clusters.setdefault(key, (cluster, []))[1].append(template.id)
+
+        count = 0
+        for cluster, template_ids in list(clusters.values()):
+            try:
+                adapter = self.__get_adapter_from_cluster(cluster)
+                adapter.delete_by_labels({K8S_LABEL.HACKATHON: str(hackathon.id)})
+            except Exception as e:
+                self.log.error("k8s_service_stop_failed: {} {}".format(cluster.api_url, e))
+                continue
+            count += experiments.filter(template__in=template_ids).delete()
+
+        self.log.debug("k8s experiments of hackathon {} stopped: {}".format(hackathon.name, count))
+        return count
+
     @staticmethod
     def __create_useful_k8s_resource(env_name, template_content, labels):
         """ helper func to generate available and unique resources yaml
@@ -161,34 +185,90 @@ class K8SExprStarter(ExprStarter):
                 yaml.dump(TemplateRender(env_name, "service", s, labels).render())
                 for s in template_content.get_resource("service")
             ],
-            statefulsets=[
+            stateful_sets=[
                 yaml.dump(TemplateRender(env_name, "statefulset", s, labels).render())
                 for s in template_content.get_resource("statefulset")
             ],
             persistent_volume_claims=[
-                yaml.dump(TemplateRender(env_name, "statefulset", p, labels).render())
+                yaml.dump(TemplateRender(env_name, "persistentvolumeclaim", p, labels).render())
                 for p in template_content.get_resource("persistentvolumeclaim")
             ],
         )
 
         return k8s_env
 
-    @staticmethod
-    def __wait_for_k8s_ready(adapter, deployments, stateful_sets):
-        # TODO Sleep for ready is NOT GOOD IDEA, Why not use watch api?
-        # Wait up to 30 minutes
-        end_time = int(time.time()) + 60 * 60 * 30
-
-        for d_yaml in deployments:
-            d = yaml.load(d_yaml)
-            while adapter.get_deployment_status(d['metadata']['name']) != K8S_DEPLOYMENT_STATUS.AVAILABLE:
-                time.sleep(1)
-                if int(time.time()) > end_time:
-                    raise RuntimeError("Start deployment error: Timeout")
-
-        for s in stateful_sets:
-            # TODO check statfulSet status
-            pass
+    def __provision(self, adapter, k8s_resource):
+        """Create k8s resources of experiment concurrently
+
+        Services and PVCs don't depend on anything so they are created at once, deployments and statefulsets are
+        created once the PVCs they mount exist. Resources existing already(409) are taken as created, so that
+        provisioning can be retried.
+
+        :rtype: dict
+        :return seconds from the start until each stage done
+        """
+        pool = self.__get_provision_pool()
+        start = time.time()
+        timings = {}
+
+        def submit(stage, func, *args):
+            def run():
+                result = func(*args)
+                timings[stage] = max(timings.get(stage, 0), round(time.time() - start, 3))
+                return result
+
+            return pool.submit(run)
+
+        services = [submit("service", adapter.create_k8s_service, s, True) for s in k8s_resource.services]
+        pvcs = [submit("pvc", adapter.create_k8s_pvc, p) for p in k8s_resource.persistent_volume_claims]
+        for f in pvcs:
+            f.result()
+
+        workloads = [submit("deployment", adapter.create_k8s_deployment, d) for d in k8s_resource.deployments]
+        workloads += [submit("statefulset", adapter.create_k8s_statefulset, s) for s in k8s_resource.stateful_sets]
+
+        for i, f in enumerate(services):
+            # overwrite service config and get the public port from K8s
+            k8s_resource.services[i] = yaml.dump(f.result())
+        for f in workloads:
+            f.result()
+
+        timings["total"] = round(time.time() - start, 3)
+        self.log.debug("k8s resources provisioned: %s" % timings)
+        return timings
+
+    def __get_provision_pool(self):
+        with K8SExprStarter.__provision_pool_lock:
+            if K8SExprStarter.__provision_pool is None:
+                K8SExprStarter.__provision_pool = ThreadPoolExecutor(
+                    max_workers=self.util.safe_get_config("k8s.provision_concurrency", 8))
+            return K8SExprStarter.__provision_pool
+
+    def __wait_for_k8s_ready(self, adapter, experiment, deployments, services):
+        """Config endpoint of experiment once all deployments are available
+
+        The readiness is notified by the watch stream shared by all experiments in the namespace, so the scheduler
+        thread returns right away rather than polling the status of deployments.
+        """
+        # TODO check statfulSet status
+        names = [yaml.safe_load(d)['metadata']['name'] for d in deployments]
+        experiment_id = experiment.id
+        start = time.time()
+
+        def on_ready(ready):
+            expr = Experiment.objects(id=experiment_id).first()
+            if not expr:
+                return
+            if not ready:
+                self.log.error("Start deployment error: Timeout, experiment %s" % experiment_id)
+                expr.status = EStatus.FAILED
+                expr.save()
+                return
+            expr.provision_timings["ready"] = round(time.time() - start, 3)
+            expr.save()
+            self.__config_endpoint(expr, services)
+
+        adapter.watch_deployments_ready(names, on_ready, self.util.safe_get_config("k8s.ready_timeout", 1800))
 
     def __config_endpoint(self, expr, services):
         self.log.debug("experiment started %s successfully. Setting remote parameters." % expr.id)
@@ -204,7 +284,7 @@ class K8SExprStarter(ExprStarter):
         assert isinstance(ingress, list)
         svc = None
         for s_yaml in services:
-            s = yaml.load(s_yaml)
+            s = yaml.safe_load(s_yaml)
             if s['spec'].get("type") == "NodePort":
                 svc = s
                 break
@@ -236,10 +316,12 @@ class K8SExprStarter(ExprStarter):
         expr.save()
 
     @staticmethod
-    def __get_adapter_from_ctx(adapter_class, context):
-        template_content = context.template_content
-        cluster = template_content.cluster_info
-        return adapter_class(cluster.api_url, cluster.token, cluster.namespace)
+    def __get_adapter_from_cluster(cluster):
+        """
+        :type cluster: K8sCluster
+        :param cluster: the k8s cluster of template
+        """
+        return K8SServiceAdapter(cluster.api_url, cluster.token, cluster.namespace)
 
 
 class TemplateRender:
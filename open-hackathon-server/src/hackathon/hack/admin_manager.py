@@ -7,12 +7,12 @@ import sys
 
 sys.path.append("..")
 
-from flask import g
+from flask import g, has_app_context
 from mongoengine import Q
 
 from hackathon import Component, RequiredFeature
 from hackathon.hmongo.models import Hackathon, User, UserHackathon
-from hackathon.constants import HACK_USER_TYPE, HACK_USER_STATUS
+from hackathon.constants import HACK_USER_TYPE, HACK_USER_STATUS, CACHE_NAMESPACE
 from hackathon.hackathon_response import precondition_failed, ok, not_found, internal_server_error, bad_request
 
 __all__ = ["AdminManager"]
@@ -40,7 +40,7 @@ class AdminManager(Component):
         if g.user.is_super:
             return True
 
-        return UserHackathon.objects(role=HACK_USER_TYPE.ADMIN, hackathon=g.hackathon, user=g.user).count() > 0
+        return self.is_hackathon_admin(g.hackathon.id, g.user.id)
 
     def get_entitled_hackathons_list(self, user):
         """Get hackathon id list that specific user is entitled to manage
@@ -70,12 +70,12 @@ class AdminManager(Component):
         user_hackathon_rels = UserHackathon.objects(hackathon=hackathon,
                                                     role__in=[HACK_USER_TYPE.ADMIN, HACK_USER_TYPE.JUDGE]).all()
 
-        def get_admin_details(rel):
-            dic = rel.dic()
-            dic["user_info"] = self.user_manager.user_display_info(rel.user)
-            return dic
+        admins = [rel.dic() for rel in user_hackathon_rels]
+        users = self.user_manager.user_display_info_batch([dic.get("user") for dic in admins])
+        for dic in admins:
+            dic["user_info"] = users.get(dic.get("user"))
 
-        return [get_admin_details(rel) for rel in user_hackathon_rels]
+        return admins
 
     def add_admin(self, args):
         """Add a new administrator on a hackathon
@@ -112,6 +112,7 @@ class AdminManager(Component):
                 user_hackathon.remark = args.get("remark")
                 user_hackathon.save()
 
+            self.invalidate_permissions(user.id)
             return ok()
         except Exception as e:
             self.log.error(e)
@@ -134,6 +135,8 @@ class AdminManager(Component):
             return precondition_failed("hackathon creator can not be deleted")
 
         user_hackathon.delete()
+        if user_hackathon.user:
+            self.invalidate_permissions(user_hackathon.user.id)
         return ok()
 
     def update_admin(self, args):
@@ -159,6 +162,8 @@ class AdminManager(Component):
             if 'remark' in args:
                 user_hackathon.remark = args['remark']
             user_hackathon.save()
+            if user_hackathon.user:
+                self.invalidate_permissions(user_hackathon.user.id)
 
             return ok('update hackathon admin successfully')
         except Exception as e:
@@ -177,10 +182,59 @@ class AdminManager(Component):
         :rtype: bool
         :return True if specific user has admin privilidge on specific hackathon otherwise False
         """
-        if User.objects(id=user_id, is_super=True).count():
+        permissions = self.get_user_permissions(user_id)
+        if permissions["is_super"]:
             return True
 
-        return UserHackathon.objects(
+        return permissions["roles"].get(str(hackathon_id)) == HACK_USER_TYPE.ADMIN
+
+    def get_user_permissions(self, user_id):
+        """Get the permission index of user
+
+        Roles of user across all hackathons are loaded in one query, cached and memoized per request. So that checking
+        permissions of the same user repeatedly, e.g. once per team in team list, doesn't query DB any more.
+
+        :type user_id: string or object_id
+        :param user_id: the id of user
+
+        :rtype: dict
+        :return dict like {"is_super": False, "roles": {"<hackathon_id>": HACK_USER_TYPE.ADMIN}}
+        """
+        user_id = str(user_id)
+        memo = self.__get_permissions_memo()
+        if user_id not in memo:
+            memo[user_id] = self.cache.get_cache(key=user_id,
+                                                 createfunc=lambda: self.__load_permissions(user_id),
+                                                 namespace=CACHE_NAMESPACE.USER_PERMISSION)
+        return memo[user_id]
+
+    def invalidate_permissions(self, user_id):
+        """Drop the cached permission index of user. Must be called once admins or judges of hackathon changed
+
+        :type user_id: string or object_id
+        :param user_id: the id of user
+        """
+        user_id = str(user_id)
+        self.__get_permissions_memo().pop(user_id, None)
+        self.cache.invalidate(user_id, namespace=CACHE_NAMESPACE.USER_PERMISSION)
+
+    @staticmethod
+    def __get_permissions_memo():
+        if not has_app_context():
+            return {}
+
+        if "user_permissions" not in g:
+            g.user_permissions = {}
+        return g.user_permissions
+
+    @staticmethod
+    def __load_permissions(user_id):
+        user = User.objects(id=user_id).only("is_super").first()
+        user_hackathons = UserHackathon.objects(
             user=user_id,
-            hackathon=hackathon_id,
-            role=HACK_USER_TYPE.ADMIN).count() > 0
+            role__in=[HACK_USER_TYPE.ADMIN, HACK_USER_TYPE.JUDGE]).no_dereference().only("hackathon", "role")
+
+        return {
+            "is_super": bool(user and user.is_super),
+            "roles": dict((str(uh.hackathon.id), uh.role) for uh in user_hackathons if uh.hackathon)
+        }
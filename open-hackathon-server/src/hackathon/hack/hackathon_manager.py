@@ -21,7 +21,7 @@ from hackathon.hmongo.models import Hackathon, UserHackathon, DockerHostServer,
 from hackathon.hackathon_response import internal_server_error, ok, not_found, general_error, HTTP_CODE, bad_request
 from hackathon.constants import HACKATHON_CONFIG, HACK_USER_TYPE, HACK_STATUS, HACK_USER_STATUS, HTTP_HEADER, \
     FILE_TYPE, HACK_TYPE, HACKATHON_STAT, DockerHostServerStatus, HACK_NOTICE_CATEGORY, HACK_NOTICE_EVENT, \
-    ORGANIZATION_TYPE, CLOUD_PROVIDER
+    ORGANIZATION_TYPE, CLOUD_PROVIDER, CACHE_NAMESPACE, SCHEDULER_EXECUTOR
 from hackathon import RequiredFeature, Component, Context
 
 docker_host_manager = RequiredFeature("docker_host_manager")
@@ -96,9 +96,9 @@ class HackathonManager(Component):
             return self.__get_hackathon_stat(hackathon)
 
         cache_key = "hackathon_stat_%s" % hackathon.id
-        return self.cache.get_cache(key=cache_key, createfunc=internal_get_stat)
+        return self.cache.get_cache(key=cache_key, createfunc=internal_get_stat,
+                                    namespace=CACHE_NAMESPACE.HACKATHON_STAT)
 
-    # TODO: implement HackathonStat related features: order_by == 'registered_users_num':
     def get_hackathon_list(self, args):
         # get values from request's QueryString
         page = int(args.get("page", 1))
@@ -124,30 +124,35 @@ class HackathonManager(Component):
             order_by_condition = '-event_start_time'
         elif order_by == 'registered_users_num':  # 人气热点
             # hackathons with zero registered users would not be shown.
-            hot_hackathon_stat = HackathonStat.objects(type=HACKATHON_STAT.REGISTER, count__gt=0).order_by('-count')
-            hot_hackathon_list = [stat.hackathon.id for stat in hot_hackathon_stat]
-            condition_filter = Q(id__in=hot_hackathon_list)
+            condition_filter = Q(register_count__gt=0)
+            order_by_condition = ('-register_count', '-id')
         else:
             order_by_condition = '-id'
 
-        # perform db query with pagination
-        pagination = Hackathon.objects(status_filter & name_filter & condition_filter).order_by(
-            order_by_condition).paginate(page,
-                                         per_page)
+        # perform db query with pagination. References of hackathon are not used in list so skip dereferencing
+        if not isinstance(order_by_condition, tuple):
+            order_by_condition = (order_by_condition,)
+        pagination = Hackathon.objects(status_filter & name_filter & condition_filter).no_dereference().order_by(
+            *order_by_condition).paginate(page, per_page, select_related=False)
 
-        hackathon_list = pagination.items
-        hackathon_stat = HackathonStat.objects(hackathon__in=hackathon_list)
+        # prefetch related documents of all hackathons in current page, one query per collection
+        hackathon_ids = [h.id for h in pagination.items]
+        stats = self.__get_hackathon_stat_dict(hackathon_ids)
 
         user = None
-        user_hackathon = []
-        team = []
+        user_info = None
+        user_hackathons = {}
+        teams = {}
         if self.user_manager.validate_token():
             user = g.user
-            user_hackathon = UserHackathon.objects(user=user, hackathon__in=hackathon_list)
-            team = Team.objects(members__user=user, hackathon__in=hackathon_list)
+            user_info = self.user_manager.user_display_info(user)
+            user_hackathons = dict((uh.hackathon.id, uh) for uh in
+                                   UserHackathon.objects(user=user, hackathon__in=hackathon_ids).no_dereference())
+            teams = dict((t.hackathon.id, t) for t in
+                         Team.objects(members__user=user, hackathon__in=hackathon_ids).no_dereference())
 
         def func(hackathon):
-            return self.__fill_hackathon_detail(hackathon, user, hackathon_stat, user_hackathon, team)
+            return self.__fill_hackathon_detail(hackathon, user, user_info, stats, user_hackathons, teams)
 
         # return serializable items as well as total count
         return self.util.paginate(pagination, func)
@@ -189,7 +194,7 @@ class HackathonManager(Component):
         hackathon.config.update(properties)
         hackathon.save()
 
-        self.cache.invalidate(self.__get_config_cache_key(hackathon))
+        self.cache.invalidate(self.__get_config_cache_key(hackathon), namespace=CACHE_NAMESPACE.HACKATHON_CONFIG)
         return ok()
 
     def delete_basic_property(self, hackathon, keys):
@@ -199,7 +204,7 @@ class HackathonManager(Component):
         list(map(lambda key: hackathon.config.pop(key, None), keys))
 
         hackathon.save()
-        self.cache.invalidate(self.__get_config_cache_key(hackathon))
+        self.cache.invalidate(self.__get_config_cache_key(hackathon), namespace=CACHE_NAMESPACE.HACKATHON_CONFIG)
         return ok()
 
     def get_recycle_minutes(self, hackathon):
@@ -379,6 +384,7 @@ class HackathonManager(Component):
         if stat.count < 0:
             stat.count = 0
         stat.save()
+        self.__sync_register_count(hackathon, stat)
 
     def increase_hackathon_stat(self, hackathon, stat_type, increase):
         """Increase or descrease the count for certain hackathon stat
@@ -402,6 +408,22 @@ class HackathonManager(Component):
             stat.count = 0
         stat.update_time = self.util.get_now()
         stat.save()
+        self.__sync_register_count(hackathon, stat)
+
+    def sync_register_count(self):
+        """Rebuild the denormalized Hackathon.register_count from HackathonStat
+
+        Only required for hackathons registered before register_count added, new registrations are synced by
+        update_hackathon_stat and increase_hackathon_stat.
+        """
+        stats = HackathonStat.objects(type=HACKATHON_STAT.REGISTER).aggregate(
+            {"$group": {"_id": "$hackathon", "count": {"$max": "$count"}}})
+
+        Hackathon.objects(register_count__ne=0).update(set__register_count=0)
+        synced = 0
+        for stat in stats:
+            synced += Hackathon.objects(id=stat["_id"]).update_one(set__register_count=stat["count"])
+        return synced
 
     def get_distinct_tags(self):
         """Return all distinct hackathon tags for auto-complete usage"""
@@ -626,7 +648,9 @@ class HackathonManager(Component):
                 event: 'int[,int...]',                   // filter by event, default unfiltered
                 order_by: 'time' | 'event' | 'category', // order by update_time, event, category, default by time
                 page: int,                               // page number after pagination, start from 1, default 1
-                per_page: int                            // items per page, default 1000
+                per_page: int,                           // items per page, default 1000
+                cursor: string                           // paginate by cursor instead of page if present, empty
+                                                         // for the first page, then the cursor of previous page
             }
 
         :return: json style text, see util.Utility
@@ -687,11 +711,11 @@ class HackathonManager(Component):
         else:
             order_by_condition = '-update_time'
 
-        pagination = HackathonNotice.objects(
-            hackathon_filter & category_filter & event_filter & user_filter & is_read_filter
-        ).order_by(
-            order_by_condition
-        ).paginate(page, per_page)
+        notices = HackathonNotice.objects(hackathon_filter & category_filter & event_filter & user_filter & is_read_filter)
+        if "cursor" in body:
+            pagination = notices.cursor_paginate(order_by_condition, body.get("cursor"), per_page, with_total=True)
+        else:
+            pagination = notices.order_by(order_by_condition).paginate(page, per_page)
 
         def func(hackathon_notice):
             return hackathon_notice.dic()
@@ -724,6 +748,7 @@ class HackathonManager(Component):
                                     method="check_hackathon_for_pre_allocate_expr",
                                     id="check_hackathon_for_pre_allocate_expr",
                                     next_run_time=next_run_time,
+                                    executor=SCHEDULER_EXECUTOR.HOUSEKEEPING,
                                     minutes=20)
 
     def __is_pre_allocate_enabled(self, hackathon):
@@ -761,6 +786,7 @@ class HackathonManager(Component):
                                             id=job_id,
                                             context=Context(hackathon_id=hack.id),
                                             next_run_time=next_run_time,
+                                            executor=SCHEDULER_EXECUTOR.HOUSEKEEPING,
                                             seconds=pre_allocate_interval
                                             )
             elif is_job_exists:
@@ -840,41 +866,54 @@ class HackathonManager(Component):
 
         return detail
 
-    def __fill_hackathon_detail(self, hackathon, user, hackathon_stat, user_hackathon, team):
-        """Return hackathon info as well as its details including configs, stat, organizers, like if user logon"""
-        detail = hackathon.dic()
-
-        detail["stat"] = {
-            "register": 0,
-            "like": 0}
+    def __fill_hackathon_detail(self, hackathon, user, user_info, stats, user_hackathons, teams):
+        """Return hackathon info as well as its details including stat, like if user logon
 
-        for stat in hackathon_stat:
-            if stat.type == HACKATHON_STAT.REGISTER and stat.hackathon.id == hackathon.id:
-                detail["stat"]["register"] = stat.count
-            elif stat.type == HACKATHON_STAT.LIKE and stat.hackathon.id == hackathon.id:
-                detail["stat"]["like"] = stat.count
+        All related documents are prefetched and keyed by hackathon id, see get_hackathon_list
+        """
+        detail = hackathon.dic()
+        detail["stat"] = stats[hackathon.id]
 
         if user:
-            detail['user'] = self.user_manager.user_display_info(user)
+            detail['user'] = dict(user_info)
             detail['user']['admin'] = user.is_super
-            if user_hackathon:
-                for uh in user_hackathon:
-                    if uh.hackathon.id == hackathon.id:
-                        detail['user']['admin'] = detail['user']['admin'] or (uh.role == HACK_USER_TYPE.ADMIN)
-
-                        if uh.like:
-                            detail['like'] = uh.like
-
-                        if uh.role == HACK_USER_TYPE.COMPETITOR:
-                            detail['registration'] = uh.dic()
-                            for t in team:
-                                if t.hackathon.id == hackathon.id:
-                                    detail['team'] = t.dic()
-                                    break
-                        break
+            uh = user_hackathons.get(hackathon.id)
+            if uh:
+                detail['user']['admin'] = detail['user']['admin'] or (uh.role == HACK_USER_TYPE.ADMIN)
+
+                if uh.like:
+                    detail['like'] = uh.like
+
+                if uh.role == HACK_USER_TYPE.COMPETITOR:
+                    detail['registration'] = uh.dic()
+                    if hackathon.id in teams:
+                        detail['team'] = teams[hackathon.id].dic()
 
         return detail
 
+    def __sync_register_count(self, hackathon, stat):
+        """Keep the denormalized register count of hackathon in sync with HackathonStat"""
+        if stat.type == HACKATHON_STAT.REGISTER:
+            Hackathon.objects(id=hackathon.id).update_one(set__register_count=stat.count)
+
+    def __get_hackathon_stat_dict(self, hackathon_ids):
+        """Get register and like count of hackathons in one query
+
+        :type hackathon_ids: list
+        :param hackathon_ids: id list of hackathons
+
+        :rtype: dict
+        :return stat dict keyed by hackathon id. e.g. {id: {"register": 1, "like": 0}}
+        """
+        stats = dict((hid, {HACKATHON_STAT.REGISTER: 0, HACKATHON_STAT.LIKE: 0}) for hid in hackathon_ids)
+        stat_list = HackathonStat.objects(hackathon__in=hackathon_ids,
+                                          type__in=[HACKATHON_STAT.REGISTER, HACKATHON_STAT.LIKE]) \
+            .only("hackathon", "type", "count").no_dereference()
+        for stat in stat_list:
+            stats[stat.hackathon.id][stat.type] = stat.count
+
+        return stats
+
     def __create_hackathon(self, creator, context):
         """Insert hackathon and creator(admin of course) to database
 
@@ -921,6 +960,7 @@ class HackathonManager(Component):
                                   status=HACK_USER_STATUS.AUTO_PASSED,
                                   remark='creator')
             admin.save()
+            self.admin_manager.invalidate_permissions(creator.id)
         except Exception as ex:
             # TODO: send out a email to remind administrator to deal with this problems
             self.log.error(ex)
@@ -944,7 +984,8 @@ class HackathonManager(Component):
             return configs
 
         cache_key = self.__get_config_cache_key(hackathon)
-        return self.cache.get_cache(key=cache_key, createfunc=__internal_get_config)
+        return self.cache.get_cache(key=cache_key, createfunc=__internal_get_config,
+                                    namespace=CACHE_NAMESPACE.HACKATHON_CONFIG)
 
     def __get_hackathon_organizers(self, hackathon):
         organizers = self.db.find_all_objects_by(HackathonOrganizer, hackathon_id=hackathon.id)
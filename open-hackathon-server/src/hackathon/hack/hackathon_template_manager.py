@@ -11,23 +11,12 @@ sys.path.append("..")
 
 from flask import g
 
-from hackathon.hmongo.models import Template
+from hackathon.hmongo.models import Template, Hackathon, DockerHostServer
 
 from hackathon import Component, RequiredFeature, Context
-from hackathon.constants import VE_PROVIDER, TEMPLATE_STATUS, CLOUD_PROVIDER
+from hackathon.constants import VE_PROVIDER, TEMPLATE_STATUS, CLOUD_PROVIDER, SCHEDULER_EXECUTOR
 from hackathon.hackathon_response import not_found, internal_server_error
 
-import collections
-def flatten(x):
-    result = []
-    for el in x:
-        if isinstance(x, collections.Iterable) and not isinstance(el, str):
-            result.extend(flatten(el))
-        else:
-            result.append(el)
-    return result
- 
-
 
 __all__ = ["HackathonTemplateManager"]
 
@@ -38,7 +27,7 @@ class HackathonTemplateManager(Component):
     team_manager = RequiredFeature("team_manager")
     hackathon_manager = RequiredFeature("hackathon_manager")
     template_library = RequiredFeature("template_library")
-    hosted_docker = RequiredFeature("hosted_docker")
+    hosted_docker = RequiredFeature("hosted_docker_proxy")
 
     def add_template_to_hackathon(self, template_id):
         try:
@@ -93,27 +82,30 @@ class HackathonTemplateManager(Component):
         return settings
 
     def pull_images_for_hackathon(self, context):
-        hackathon_id = context.hackathon_id
-        templates = self.__get_templates_for_pull(hackathon_id)
-        images = [self.__get_images_from_template(x) for x in templates]
-        images_to_pull = flatten(images)
-
-        self.log.debug('expected images: %s on hackathon: %s' % (images_to_pull, hackathon_id))
-        # get all docker host server on hackathon
-        hosts = self.db.find_all_objects_by(DockerHostServer, hackathon_id=hackathon_id)
-        # loop to get every docker host
-        for docker_host in hosts:
+        """Pull the images of docker templates of hackathon to its docker hosts, one schedule job per missing image
+
+        :type context: Context
+        :param context: the context of schedule job, including hackathon_id
+        """
+        hackathon = Hackathon.objects(id=context.hackathon_id).first()
+        if not hackathon:
+            return
+        images_to_pull = self.__get_images_for_pull(hackathon)
+
+        self.log.debug('expected images: %s on hackathon: %s' % (images_to_pull, hackathon.name))
+        # loop to get every docker host of hackathon
+        for docker_host in DockerHostServer.objects(hackathon=hackathon, disabled=False):
             download_images = self.__get_undownloaded_images_on_docker_host(docker_host, images_to_pull)
             self.log.debug('need to pull images: %s on host: %s' % (download_images, docker_host.vm_name))
             for dl_image in download_images:
-                image = dl_image.split(':')[0]
-                tag = dl_image.split(':')[1]
+                image, tag = dl_image.rsplit(':', 1)
                 context = Context(image=image,
                                   tag=tag,
                                   docker_host=docker_host.id)
-                self.scheduler.add_once(feature="hosted_docker",
+                self.scheduler.add_once(feature="hosted_docker_proxy",
                                         method="pull_image",
                                         context=context,
+                                        executor=SCHEDULER_EXECUTOR.IMAGE,
                                         seconds=3)
 
     def __init__(self):
@@ -142,18 +134,19 @@ class HackathonTemplateManager(Component):
             data.append((template, content))
         return data
 
-    # template may have multiple images
-    def __get_images_from_template(self, template):
-        template_content = self.template_library.load_template(template)
-        docker_units = [u for u in template_content.units if u.provider == VE_PROVIDER.DOCKER]
-        docker_images = [du.get_image_with_tag() for du in docker_units]
-        return docker_images
+    def __get_images_for_pull(self, hackathon):
+        """Images of the checked docker templates of hackathon, in 'image:tag' format"""
+        templates = [t for t in hackathon.templates
+                     if t.provider == VE_PROVIDER.DOCKER and t.status == TEMPLATE_STATUS.CHECK_PASS and t.docker_image]
+        return sorted(set(self.__get_image_with_tag(t.docker_image) for t in templates))
 
-    def __get_templates_for_pull(self, hackathon_id):
-        htrs = self.db.find_all_objects_by(HackathonTemplateRel, hackathon_id=hackathon_id)
-        templates = [h.template for h in htrs]
-        templates = [t for t in templates if t.provider == VE_PROVIDER.DOCKER and t.status == TEMPLATE_STATUS.CHECK_PASS]
-        return templates
+    @staticmethod
+    def __get_image_with_tag(image):
+        # the part after the last ':' is a port of registry rather than tag if it contains '/'
+        name, sep, tag = image.rpartition(':')
+        if not sep or '/' in tag:
+            return image + ':latest'
+        return image
 
     def __get_undownloaded_images_on_docker_host(self, docker_host, expected_images):
         images = []
@@ -162,4 +155,4 @@ class HackathonTemplateManager(Component):
         for ex_image in expected_images:
             if ex_image not in current_images:
                 images.append(ex_image)
-        return flatten(images)
+        return images
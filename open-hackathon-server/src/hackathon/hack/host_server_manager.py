@@ -13,15 +13,18 @@ from time import strftime, sleep
 sys.path.append("..")
 
 from hackathon import Component, RequiredFeature, Context
-from hackathon.hmongo.models import DockerHostServer, Hackathon
+from hackathon.hmongo.models import DockerHostServer, Hackathon, Experiment
 from hackathon.constants import (DockerPingResult, AVMStatus,
                                  DockerHostServerStatus, DHS_QUERY_STATE,
-                                 ServiceDeploymentSlot, TCPProtocol,
-                                 EStatus)
+                                 DOCKER_PLACEMENT_STRATEGY, ServiceDeploymentSlot,
+                                 TCPProtocol, EStatus)
 from hackathon.hackathon_response import ok, not_found
 
 __all__ = ["DockerHostManager"]
 
+# filter of hosts which can take one more container
+HAS_FREE_SLOT = {"$expr": {"$lt": ["$container_count", "$container_max_count"]}}
+
 
 class DockerHostManager(Component):
     """Component to manage docker host server"""
@@ -40,29 +43,43 @@ class DockerHostManager(Component):
         host_servers = DockerHostServer.objects(hackathon=hackathon)
         return [host_server.dic() for host_server in host_servers]
 
-    def get_available_docker_host(self, hackathon):
-        vms = DockerHostServer.objects.filter(__raw__={'$where': 'this.container_count+1 < this.container_max_count'}) \
-            .filter(hackathon=hackathon, state=DockerHostServerStatus.DOCKER_READY, disabled=False).all()
+    def get_available_docker_host(self, hackathon, strategy=None):
+        """Choose a docker host of hackathon for a new container and reserve a container slot on it
 
-        if self.util.is_local():
-            if len(vms) > 0:
-                return Context(state=DHS_QUERY_STATE.SUCCESS, docker_host_server=vms[0])
-            else:
-                return Context(state=DHS_QUERY_STATE.FAILED)
+        Hosts that have free slots are tried in the order of placement strategy. The slot is reserved by increasing
+        container_count atomically only if the host still has a free slot, so that concurrent starts can't overcommit
+        a host. Call release_container_slot once the container is removed or failed to start.
+
+        :type hackathon: Hackathon
+        :param hackathon: the hackathon that the container belongs to
+
+        :type strategy: str|unicode
+        :param strategy: one of DOCKER_PLACEMENT_STRATEGY, docker.placement_strategy in config by default
+
+        :rtype: Context
+        :return: context with state(one of DHS_QUERY_STATE) and docker_host_server where the slot is reserved
+        """
+        strategy = strategy or self.util.safe_get_config("docker.placement_strategy",
+                                                         DOCKER_PLACEMENT_STRATEGY.LEAST_LOADED)
+        order = "-container_count" if strategy == DOCKER_PLACEMENT_STRATEGY.BIN_PACKING else "container_count"
+        vms = DockerHostServer.objects(hackathon=hackathon, state=DockerHostServerStatus.DOCKER_READY, disabled=False,
+                                       __raw__=HAS_FREE_SLOT).order_by(order)
 
         has_locked_host = False
         for host in vms:
-            # check docker status
-            if not self.docker.ping(host):
-                host.state = DockerHostServerStatus.UNAVAILABLE
-                host.save()
-                continue
+            if not self.util.is_local():
+                # check docker status by the latest probe
+                if not self.docker.is_host_alive(host):
+                    continue
 
-            # cloud service locked?
-            if not self.is_host_server_locked(host):
-                return Context(state=DHS_QUERY_STATE.SUCCESS, docker_host_server=host)
-            else:
-                has_locked_host = True
+                # cloud service locked?
+                if self.is_host_server_locked(host):
+                    has_locked_host = True
+                    continue
+
+            reserved = self.reserve_container_slot(host)
+            if reserved:
+                return Context(state=DHS_QUERY_STATE.SUCCESS, docker_host_server=reserved)
 
         if has_locked_host:
             # still has available host but locked
@@ -74,6 +91,48 @@ class DockerHostManager(Component):
             # no VM found or starting
             return Context(state=DHS_QUERY_STATE.FAILED)
 
+    def reserve_container_slot(self, host_server):
+        """Take a container slot of docker host if it still has a free one
+
+        :type host_server: DockerHostServer
+        :param host_server: the host to place container
+
+        :rtype: DockerHostServer
+        :return: the host with the increased container_count, None if the host is full
+        """
+        return DockerHostServer.objects(id=host_server.id, __raw__=HAS_FREE_SLOT).modify(inc__container_count=1,
+                                                                                          new=True)
+
+    def release_container_slot(self, host_server_id):
+        """Give back the container slot taken by reserve_container_slot
+
+        :type host_server_id: bson.ObjectId
+        :param host_server_id: id of the docker host
+        """
+        # a raw update since -1 is out of the range of container_count
+        DockerHostServer.objects(id=host_server_id, container_count__gt=0).update_one(
+            __raw__={"$inc": {"container_count": -1}})
+
+    def hold_virtual_environment_slot(self, experiment_id, virtual_environment_name):
+        """Count the container of virtual environment in its docker host again, e.g. the container is running again
+
+        Whether the container holds a slot is recorded by docker_container.slot_reserved and flipped atomically, so
+        that a slot is taken once only no matter how many times it's called. The slot is taken even if the host is
+        full, since the container is already there.
+
+        :rtype: bool
+        :return True if a slot is taken, False if the container holds one already
+        """
+        return self.__flip_slot_reserved(experiment_id, virtual_environment_name, True)
+
+    def release_virtual_environment_slot(self, experiment_id, virtual_environment_name):
+        """Give back the slot held by the container of virtual environment, once only
+
+        :rtype: bool
+        :return True if a slot is given back, False if the container doesn't hold any
+        """
+        return self.__flip_slot_reserved(experiment_id, virtual_environment_name, False)
+
     def is_host_server_locked(self, docker_host):
         raise NotImplementedError()
 
@@ -250,6 +309,26 @@ class DockerHostManager(Component):
 
         return self.__check_docker_host_server(host_server).dic()
 
+    def __flip_slot_reserved(self, experiment_id, virtual_environment_name, reserved):
+        # only the containers created with a reserved slot are released, never the ones before slots are recorded
+        ve_filter = {"name": virtual_environment_name, "docker_container": {"$ne": None},
+                     "docker_container.slot_reserved": {"$ne": True} if reserved else True}
+        expr = Experiment.objects(id=experiment_id, __raw__={"virtual_environments": {"$elemMatch": ve_filter}}) \
+            .no_dereference().only("virtual_environments").modify(
+            __raw__={"$set": {"virtual_environments.$.docker_container.slot_reserved": reserved}})
+        if not expr:
+            return False
+
+        container = expr.virtual_environments.get(name=virtual_environment_name).docker_container
+        ref = container._data.get("host_server")
+        host_server_id = getattr(ref, "id", ref)
+        if host_server_id:
+            if reserved:
+                DockerHostServer.objects(id=host_server_id).update_one(inc__container_count=1)
+            else:
+                self.release_container_slot(host_server_id)
+        return True
+
     def __check_docker_host_server(self, host_server):
         ping = self.docker.ping(host_server)
         if not ping:
@@ -35,7 +35,23 @@ class RegisterManager(Component):
         registers = UserHackathon.objects(hackathon=hackathon_id,
                                           role=HACK_USER_TYPE.COMPETITOR).order_by('-create_time')[:num]
 
-        return [self.__get_registration_with_profile(x) for x in registers]
+        return self.__get_registrations_with_profile(registers)
+
+    def get_hackathon_registration_page(self, hackathon_id, cursor=None, per_page=100):
+        """Get registered users page by page, order by create_time desc
+
+        :type cursor: str|unicode
+        :param cursor: cursor returned by previous page, None or empty for the first page
+
+        :rtype: dict
+        :return registrations of the page as well as the cursor of next page, see util.Utility
+        """
+        pagination = UserHackathon.objects(hackathon=hackathon_id, role=HACK_USER_TYPE.COMPETITOR).cursor_paginate(
+            "-create_time", cursor, per_page, with_total=True, select_related=False)
+
+        result = self.util.paginate(pagination)
+        result["items"] = self.__get_registrations_with_profile(pagination.items)
+        return result
 
     def get_registration_by_id(self, registration_id):
         return UserHackathon.objects(id=registration_id).first()
@@ -200,18 +216,21 @@ class RegisterManager(Component):
         register = self.get_registration_by_user_and_hackathon(user_id, hackathon.id)
         return register is not None and register.role == HACK_USER_TYPE.COMPETITOR
 
-    def __get_registration_with_profile(self, registration):
+    def __get_registrations_with_profile(self, registrations):
         """Return user display info as well as the registration detail in dict
 
-        :type registration: UserHackathonRel
-        :param registration: the detail of the user registration
+        :type registrations: list
+        :param registrations: list of UserHackathon, the registrations of users
 
-        :rtype: dict
-        :return the detail of registration as well as user display info
+        :rtype: list
+        :return the detail of registrations as well as user display info
         """
-        register_dic = registration.dic()
-        register_dic['user'] = self.user_manager.user_display_info(registration.user)
-        return register_dic
+        register_dics = [registration.dic() for registration in registrations]
+        users = self.user_manager.user_display_info_batch([dic.get("user") for dic in register_dics])
+        for dic in register_dics:
+            dic['user'] = users.get(dic.get('user'))
+
+        return register_dics
 
     def __is_hackathon_filled_up(self, hackathon):
         """Check whether all seats are occupied or not
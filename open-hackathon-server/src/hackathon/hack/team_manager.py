@@ -88,12 +88,12 @@ class TeamManager(Component):
         if not team:
             return None
 
-        def sub(t):
-            m = to_dic(t)
-            m["user"] = self.user_manager.user_display_info(t.user)
-            return m
+        members = [to_dic(t) for t in team.members]
+        users = self.user_manager.user_display_info_batch([m["user"] for m in members])
+        for m in members:
+            m["user"] = users.get(m["user"])
 
-        return [sub(t) for t in team.members]
+        return members
 
     def get_hackathon_team_list(self, hackathon_id, name=None, number=None):
         """Get the team list of selected hackathon
@@ -124,13 +124,20 @@ class TeamManager(Component):
         if self.user_manager.validate_token():
             user = g.user
 
-        def get_team(team):
-            teamDic = team.dic()
+        team_dics = [team.dic() for team in teams]
+        user_ids = set()
+        for teamDic in team_dics:
+            user_ids.add(teamDic.get("leader"))
+            user_ids.update(m["user"] for m in teamDic.get("members", []))
+        users = self.user_manager.user_display_info_batch(user_ids)
+
+        def get_team(teamDic):
+            leader = users.get(teamDic.get("leader"), {})
             teamDic['leader'] = {
-                'id': str(team.leader.id),
-                'name': team.leader.name,
-                'nickname': team.leader.nickname,
-                'avatar_url': team.leader.avatar_url
+                'id': teamDic.get("leader"),
+                'name': leader.get("name"),
+                'nickname': leader.get("nickname"),
+                'avatar_url': leader.get("avatar_url")
             }
             teamDic['cover'] = teamDic.get('cover', '')
             teamDic['project_name'] = teamDic.get('project_name', '')
@@ -138,17 +145,15 @@ class TeamManager(Component):
             teamDic['works'] = teamDic.get('works', '')
             [teamDic.pop(key, None) for key in
              ['assets', 'azure_keys', 'scores', 'templates', 'hackathon']]
-            teamDic["member_count"] = team.members.filter(status=TEAM_MEMBER_STATUS.APPROVED).count()
-
-            def sub(t):
-                m = to_dic(t)
-                m["user"] = self.user_manager.user_display_info(t.user)
-                return m
+            teamDic["members"] = teamDic.get("members", [])
+            teamDic["member_count"] = len(
+                [m for m in teamDic["members"] if m.get("status") == TEAM_MEMBER_STATUS.APPROVED])
 
-            teamDic["members"] = [sub(t) for t in team.members]
+            for m in teamDic["members"]:
+                m["user"] = users.get(m["user"])
             return teamDic
 
-        return [get_team(x) for x in teams]
+        return [get_team(x) for x in team_dics]
 
     def create_default_team(self, hackathon, user):
         """Create a default new team for user after registration.
@@ -716,14 +721,16 @@ class TeamManager(Component):
 
     def __team_detail(self, team, user=None):
         resp = team.dic()
-        resp["leader"] = self.user_manager.user_display_info(team.leader)
+        resp["members"] = resp.get("members", [])
+        users = self.user_manager.user_display_info_batch([resp.get("leader")] + [m["user"] for m in resp["members"]])
+
+        resp["leader"] = users.get(resp.get("leader"))
         resp["member_count"] = team.members.filter(status=TEAM_MEMBER_STATUS.APPROVED).count()
         # all team action not allowed if frozen
         resp["is_frozen"] = False
 
-        for i in range(0, len(team.members)):
-            mem = team.members[i]
-            resp["members"][i]["user"] = self.user_manager.user_display_info(mem.user)
+        for m in resp["members"]:
+            m["user"] = users.get(m["user"])
 
         if user:
             resp["is_admin"] = self.admin_manager.is_hackathon_admin(team.hackathon.id, user.id)
@@ -3,7 +3,32 @@
 This file is covered by the LICENSING file in the root of this project.
 """
 
-__all__ = ["factory", "RequiredFeature"]
+import threading
+
+from flask import g, has_app_context
+
+__all__ = ["factory", "RequiredFeature", "LIFETIME"]
+
+
+class LIFETIME:
+    """Lifetime of the objects built by a callable provider
+
+    - SINGLETON: built once upon the first request and shared by the whole process
+    - REQUEST: built once per flask request(stored in flask.g), a new one is built if no app context available
+    - TRANSIENT: built every time the feature is requested
+    """
+    SINGLETON = "singleton"
+    REQUEST = "request"
+    TRANSIENT = "transient"
+
+
+class _Provider(object):
+    """Wrapper of a provider registered to factory"""
+
+    def __init__(self, feature, build, lifetime):
+        self.feature = feature
+        self.build = build
+        self.lifetime = lifetime
 
 
 #
@@ -19,13 +44,15 @@ class HackathonFactory:
         False and more than one providers with same key(feature) are provided
         """
         self.providers = {}
+        self.instances = {}
         self.allow_replace = allow_replace
+        self.lock = threading.RLock()
 
     def set_allow_replace(self, allow_replace):
         """Set the value of allow_replace"""
         self.allow_replace = allow_replace
 
-    def provide(self, feature, provider, suspend_callable=False, *args, **kwargs):
+    def provide(self, feature, provider, suspend_callable=False, *args, lifetime=LIFETIME.SINGLETON, **kwargs):
         """Add a provider to factory
 
         :type feature: str|unicode
@@ -37,15 +64,22 @@ class HackathonFactory:
         :type suspend_callable: boolean
         :param suspend_callable: suspend the callable where we want to keep the original function
 
+        :type lifetime: str|unicode
+        :param lifetime: lifetime of the object built by a callable provider, see LIFETIME. Default is singleton which
+        means the callable is called only once. Ignored if provider is not callable or suspend_callable is True.
+        Keyword only, so that the positional args are passed to provider untouched
+
         :Example:
             from *** import UserManager
             factory.provide("user_manager", UesrManager)
-            factory.provide("user_manager", UesrManager, *init_args, **init_kwargs)
+            factory.provide("user_manager", UesrManager, False, *init_args, **init_kwargs)
 
             # or:
             um = UserManager
             factory.provide("user_manager", um)
 
+            # new instance for every flask request
+            factory.provide("user_manager", UserManager, lifetime=LIFETIME.REQUEST)
         """
         if not self.allow_replace:
             assert feature not in self.providers, "Duplicate feature: %r" % feature
@@ -55,14 +89,53 @@ class HackathonFactory:
         else:
             def call():
                 return provider
-        self.providers[feature] = call
+
+            lifetime = LIFETIME.SINGLETON
+
+        with self.lock:
+            self.instances.pop(feature, None)
+            self.providers[feature] = _Provider(feature, call, lifetime)
+
+    def get_lifetime(self, feature):
+        """Get the lifetime of objects provided by feature
+
+        :rtype: str|unicode
+        :return one of LIFETIME
+        """
+        return self.__get_provider(feature).lifetime
 
     def __getitem__(self, feature):
+        provider = self.__get_provider(feature)
+        if provider.lifetime == LIFETIME.SINGLETON:
+            return self.__get_singleton(provider)
+        elif provider.lifetime == LIFETIME.REQUEST and has_app_context():
+            return self.__get_request_scoped(provider)
+        return provider.build()
+
+    def __get_provider(self, feature):
         try:
-            provider = self.providers[feature]
+            return self.providers[feature]
         except KeyError:
             raise KeyError("Unknown feature named %r" % feature)
-        return provider()
+
+    def __get_singleton(self, provider):
+        try:
+            return self.instances[provider.feature]
+        except KeyError:
+            pass
+
+        # RLock since building a component may request other features in the same thread
+        with self.lock:
+            if provider.feature not in self.instances:
+                self.instances[provider.feature] = provider.build()
+            return self.instances[provider.feature]
+
+    def __get_request_scoped(self, provider):
+        if "factory_instances" not in g:
+            g.factory_instances = {}
+        if provider.feature not in g.factory_instances:
+            g.factory_instances[provider.feature] = provider.build()
+        return g.factory_instances[provider.feature]
 
 
 factory = HackathonFactory()
@@ -113,7 +186,8 @@ class RequiredFeature(object):
     def __init__(self, feature, assertion=NoAssertion):
         """Create instance of RequiredFeature.
 
-        Will get the actual target from factory upon the first call.
+        Will get the actual target from factory upon the first call and keep it for later calls, unless the feature
+        is provided with LIFETIME.REQUEST in which case it's resolved from factory for every flask request.
 
         :type feature: str|unicode
         :param feature: the key to get object from factory
@@ -132,9 +206,12 @@ class RequiredFeature(object):
         return self.result  # <-- will request the feature upon first call
 
     def __getattr__(self, name):
-        self.result = self.request()
         if name == "result":
-            return self.result
+            result = self.request()
+            # request scoped objects must be resolved per request, others are resolved only once
+            if factory.get_lifetime(self.feature) != LIFETIME.REQUEST:
+                self.result = result
+            return result
         else:
             return getattr(self.result, name)
 
@@ -4,20 +4,85 @@ This file is covered by the LICENSING file in the root of this project.
 """
 
 import os
+import socket
+import threading
+import time
+import uuid
+import atexit
 from pytz import utc
-from datetime import timedelta
+from datetime import timedelta, datetime
+from collections import defaultdict
 import inspect
+import concurrent.futures
 
+import pymongo
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from apscheduler.executors.base import run_job
+from apscheduler.executors.pool import BasePoolExecutor
 from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.util import undefined
-from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_ADDED
+from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_ADDED, EVENT_JOB_MISSED
 
-from hackathon.hackathon_factory import RequiredFeature
+from hackathon.hackathon_factory import RequiredFeature, factory, LIFETIME
+from hackathon.constants import SCHEDULER_EXECUTOR, HEALTH, HEALTH_STATUS
+from hackathon.context import Context
 from hackathon.util import safe_get_config, get_config, get_now
 from hackathon.log import log
 
-__all__ = ["HackathonScheduler"]
+__all__ = ["HackathonScheduler", "LeaderElection", "MonitoredThreadPoolExecutor", "Histogram", "JobMetrics",
+           "JobMethodRegistry", "job_methods", "pack_job_context", "unpack_job_context"]
+
+# version of the format of job context saved in job store, see pack_job_context
+JOB_CONTEXT_VERSION = 1
+JOB_CONTEXT_SIMPLE_TYPES = (str, int, float, bool, ObjectId, datetime, type(None))
+
+
+def to_job_value(value):
+    """Convert value to the plain types which are cheap to pickle. TypeError raised if it cannot be converted"""
+    if isinstance(value, Context):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {k: to_job_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_job_value(v) for v in value]
+    if isinstance(value, JOB_CONTEXT_SIMPLE_TYPES):
+        return value
+    raise TypeError("%s cannot be saved in job context" % type(value).__name__)
+
+
+def pack_job_context(context):
+    """Compact the context of job to {"v": version, "ctx": fields} before it's saved into job store
+
+    Only the plain fields such as ids and names are kept. Documents or template content are dropped, the job should
+    load them by id when it runs, so that they are not pickled on every write and wake-up of job.
+
+    :type context: Context
+    :param context: the execution context of job
+
+    :rtype: dict
+    """
+    if context is None:
+        return None
+    fields = {}
+    for key, value in context.to_dict().items():
+        try:
+            fields[key] = to_job_value(value)
+        except TypeError as e:
+            log.warn("field '%s' of job context dropped, put its id in context instead: %s" % (key, e))
+    return {"v": JOB_CONTEXT_VERSION, "ctx": fields}
+
+
+def unpack_job_context(payload):
+    """Restore the context packed by pack_job_context
+
+    :rtype: Context
+    :return the context of job. Contexts of jobs saved before the compact format are returned as they are
+    """
+    if isinstance(payload, dict) and payload.get("v") == JOB_CONTEXT_VERSION:
+        return Context.from_object(payload["ctx"])
+    return payload
 
 
 def scheduler_listener(event):
@@ -37,7 +102,83 @@ def scheduler_listener(event):
         log.debug("The schedule job %s executed and return value is '%s'" % (event.job_id, event.retval))
 
 
-def scheduler_executor(feature, method, context):
+class JobMethod(object):
+    """Entry of the dispatch table of jobs: the method to call and whether it expects the context"""
+
+    def __init__(self, feature, method):
+        self.feature = feature
+        self.method = method
+        self.provider = factory.providers.get(feature)
+
+        inst = factory[feature]
+        mtd = getattr(inst, method)
+        # singletons are bound once. Others are resolved on every call as their lifetime requires
+        self.bound = mtd if factory.get_lifetime(feature) == LIFETIME.SINGLETON else None
+        self.takes_context = self.__takes_context(mtd)
+
+    def is_stale(self):
+        """The feature is provided again since the method was registered, e.g. replaced in tests"""
+        return factory.providers.get(self.feature) is not self.provider
+
+    def __call__(self, context):
+        mtd = self.bound or getattr(factory[self.feature], self.method)
+        if self.takes_context:
+            return mtd(context)
+        return mtd()
+
+    @staticmethod
+    def __takes_context(mtd):
+        # 'self' is not in the signature of bound method
+        for param in inspect.signature(mtd).parameters.values():
+            if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD, param.VAR_POSITIONAL):
+                return True
+        return False
+
+
+class JobMethodRegistry(object):
+    """Dispatch table of the methods executed by scheduler jobs, keyed by 'feature.method'
+
+    A method is looked up from factory and inspected only once when it's registered, either in advance by register or
+    upon the first run of its job, rather than on every run of job.
+    """
+
+    def __init__(self):
+        self.__methods = {}
+
+    def register(self, feature, method):
+        """Add the method of feature to the dispatch table
+
+        :type feature: str|unicode
+        :param feature: the instance key for hackathon_factory
+
+        :type method: str|unicode
+        :param method: the name of method related to instance
+
+        :rtype: JobMethod
+        """
+        entry = JobMethod(feature, method)
+        # registering the same method in two threads builds two equal entries, either one is fine
+        self.__methods["%s.%s" % (feature, method)] = entry
+        return entry
+
+    def get(self, feature, method):
+        """Get the method from dispatch table, register it if it's not there yet
+
+        :rtype: JobMethod
+        """
+        entry = self.__methods.get("%s.%s" % (feature, method))
+        if entry is None or entry.is_stale():
+            entry = self.register(feature, method)
+        return entry
+
+    def clear(self):
+        self.__methods.clear()
+
+
+job_methods = JobMethodRegistry()
+
+
+def scheduler_executor(feature, method, context, leader_only=False):
     """task for all apscheduler jobs
 
     While the context of apscheduler job will be serialized and saved into MySQL, it's hard that add an instance method
@@ -47,7 +188,7 @@ def scheduler_executor(feature, method, context):
     not serializable.
 
     However functions are much easier, that's why we define function 'scheduler_executor' out of any class. It acts as a
-    redirect engine. We find the method that the job really want to execute and then call it.
+    redirect engine. We find the method that the job really want to execute from the dispatch table and then call it.
 
     :type feature: str|unicode
     :param feature: the instance key for hackathon_factory.
@@ -55,20 +196,289 @@ def scheduler_executor(feature, method, context):
     :type method: str|unicode
     :param method: the name of method related to instance
 
-    :type context: Context, see definition in hackathon/__init__.py
-    :param context: the expected execution context of target method
+    :type context: dict
+    :param context: the expected execution context of target method, packed by pack_job_context
+
+    :type leader_only: bool
+    :param leader_only: skip the job unless the scheduler of current process is the leader of cluster
     """
+    if leader_only and not RequiredFeature("scheduler").is_leader():
+        log.debug("skip '%s.%s' since the scheduler is not the leader" % (feature, method))
+        return
+
+    context = unpack_job_context(context)
     log.debug("prepare to execute '%s.%s' with context: %s" % (feature, method, context))
-    inst = RequiredFeature(feature)
-    mtd = getattr(inst, method)
-    args_len = len(inspect.getargspec(mtd).args)
+    job_methods.get(feature, method)(context)
 
-    if args_len < 2:
-        # if target method doesn't expect any parameter except 'self', the args_len is 1
-        mtd()
-    else:
-        # call with execution context
-        mtd(context)
+
+class LeaderElection(object):
+    """Elect one process of the cluster by a lease in MongoDB
+
+    The lease is a document {_id: name, holder, expire_time}. A process becomes the leader by taking the lease if it's
+    expired, and stays the leader by renewing the lease every renew_seconds in a background thread. If the leader dies,
+    another process takes over once the lease expires; if it exits normally, the lease is released and taken over on
+    the next renewal of others.
+    """
+
+    def __init__(self, collection, name="scheduler", lease_seconds=15, renew_seconds=5, on_elected=None):
+        """
+        :type collection: pymongo.collection.Collection
+        :param collection: the collection of leases
+
+        :type on_elected: function
+        :param on_elected: called without argument once the process becomes the leader
+        """
+        self.collection = collection
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.on_elected = on_elected
+        self.holder = "%s-%d-%s" % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+
+        # time.monotonic() until which the lease is held for sure
+        self.__valid_until = 0
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def is_leader(self):
+        return time.monotonic() < self.__valid_until
+
+    def renew(self):
+        """Take or renew the lease
+
+        :rtype: bool
+        :return True if the process is the leader
+        """
+        start = time.monotonic()
+        now = get_now()
+        was_leader = self.is_leader()
+        try:
+            self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"holder": self.holder}, {"expire_time": {"$lt": now}}]},
+                {"$set": {"holder": self.holder, "expire_time": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True)
+            # stop acting as the leader a renewal earlier than the lease expires in db, so that the clock drift
+            # between processes doesn't lead to two leaders
+            self.__valid_until = start + self.lease_seconds - self.renew_seconds
+        except DuplicateKeyError:
+            # the lease is held by another process
+            self.__valid_until = 0
+        except Exception as e:
+            # keep the leadership until the lease expires, it may be a transient error of db
+            log.error("renew lease of %s error: %s" % (self.name, e))
+
+        if self.is_leader() and not was_leader:
+            log.info("%s becomes the leader of %s" % (self.holder, self.name))
+            if self.on_elected:
+                self.on_elected()
+        return self.is_leader()
+
+    def release(self):
+        """Give up the lease so that another process takes over at once"""
+        self.__valid_until = 0
+        try:
+            self.collection.delete_one({"_id": self.name, "holder": self.holder})
+        except Exception as e:
+            log.error("release lease of %s error: %s" % (self.name, e))
+
+    def start(self):
+        """Renew the lease in a background thread until stop"""
+        self.__thread = threading.Thread(target=self.__run, name="leader-election-" + self.name)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        self.release()
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            self.renew()
+            self.__stopped.wait(self.renew_seconds)
+
+
+def get_job_key(job):
+    """Name of job in metrics, "feature.method" of the jobs added by HackathonScheduler"""
+    if job.func is scheduler_executor and len(job.args) >= 2:
+        return "%s.%s" % (job.args[0], job.args[1])
+    return job.name
+
+
+class Histogram(object):
+    """Count of values in buckets, the values are seconds"""
+    BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.BUCKETS) and value > self.BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        """Upper bound of the bucket where the p(0-1) percentile falls in, max value for the last bucket"""
+        if not self.count:
+            return None
+        rank = p * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.BUCKETS[i] if i < len(self.BUCKETS) else round(self.max, 3)
+        return round(self.max, 3)
+
+    def to_dict(self):
+        labels = ["le_%s" % b for b in self.BUCKETS] + ["inf"]
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count, 3) if self.count else None,
+            "max": round(self.max, 3),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "buckets": dict(zip(labels, self.counts))}
+
+
+class JobMetrics(object):
+    """Execution time, scheduling lag, error and misfire counters of jobs, per feature.method"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = defaultdict(lambda: {"duration": Histogram(), "lag": Histogram(), "runs": 0, "errors": 0,
+                                         "misfires": 0, "queued": 0, "running": 0})
+
+    def on_queued(self, job):
+        with self.lock:
+            self.jobs[get_job_key(job)]["queued"] += 1
+
+    def on_started(self, job, run_times):
+        lag = (datetime.now(utc) - run_times[0]).total_seconds()
+        with self.lock:
+            m = self.jobs[get_job_key(job)]
+            m["queued"] -= 1
+            m["running"] += 1
+            m["lag"].observe(max(lag, 0))
+
+    def on_finished(self, job, duration, events):
+        with self.lock:
+            m = self.jobs[get_job_key(job)]
+            m["running"] -= 1
+            m["duration"].observe(duration)
+            for event in events or []:
+                if event.code == EVENT_JOB_EXECUTED:
+                    m["runs"] += 1
+                elif event.code == EVENT_JOB_ERROR:
+                    m["runs"] += 1
+                    m["errors"] += 1
+                elif event.code == EVENT_JOB_MISSED:
+                    m["misfires"] += 1
+
+    def get_stats(self):
+        """
+        :rtype: dict
+        :return {feature.method: {"runs", "errors", "misfires", "queued", "running", "duration", "lag"}}, duration
+            and lag are histograms in seconds, see Histogram.to_dict
+        """
+        with self.lock:
+            return dict((key, dict(m, duration=m["duration"].to_dict(), lag=m["lag"].to_dict()))
+                        for key, m in self.jobs.items())
+
+
+class MonitoredThreadPoolExecutor(BasePoolExecutor):
+    """Thread pool executor of APScheduler which counts the queued and running jobs
+
+    The execution time and scheduling lag of jobs are recorded in metrics if given.
+    """
+
+    def __init__(self, max_workers=10, metrics=None):
+        self.max_workers = int(max_workers)
+        self.metrics = metrics
+        super(MonitoredThreadPoolExecutor, self).__init__(concurrent.futures.ThreadPoolExecutor(self.max_workers))
+        self.stat_lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.submitted = 0
+        self.peak_queued = 0
+
+    def get_stats(self):
+        """
+        :rtype: dict
+        :return counters of jobs: {"max_workers", "running", "queued", "peak_queued", "submitted", "saturation"}, the
+            saturation is the ratio of busy threads
+        """
+        with self.stat_lock:
+            return {
+                "max_workers": self.max_workers,
+                "running": self.running,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "submitted": self.submitted,
+                "saturation": round(float(self.running) / self.max_workers, 2)}
+
+    def _do_submit_job(self, job, run_times):
+        def callback(f):
+            exc, tb = (f.exception_info() if hasattr(f, 'exception_info') else
+                       (f.exception(), getattr(f.exception(), '__traceback__', None)))
+            if exc:
+                self._run_job_error(job.id, exc, tb)
+            else:
+                self._run_job_success(job.id, f.result())
+
+        with self.stat_lock:
+            self.queued += 1
+            self.submitted += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        if self.metrics:
+            self.metrics.on_queued(job)
+        f = self._pool.submit(self.__run_job, job, run_times)
+        f.add_done_callback(callback)
+
+    def __run_job(self, job, run_times):
+        with self.stat_lock:
+            self.queued -= 1
+            self.running += 1
+        if self.metrics:
+            self.metrics.on_started(job, run_times)
+
+        start = time.time()
+        events = None
+        try:
+            events = run_job(job, job._jobstore_alias, run_times, self._logger.name)
+            return events
+        finally:
+            with self.stat_lock:
+                self.running -= 1
+            if self.metrics:
+                self.metrics.on_finished(job, time.time() - start, events)
+
+
+class LeaderOnlyScheduler(BackgroundScheduler):
+    """BackgroundScheduler that runs jobs only while it's the leader
+
+    It's used with a job store shared by all processes, the jobs are added by any process but run by the leader only.
+    """
+
+    def __init__(self, election, **options):
+        self.election = election
+        super(LeaderOnlyScheduler, self).__init__(**options)
+
+    def _process_jobs(self):
+        if not self.election.is_leader():
+            # the jobs are left in job store for the leader, check again after the next renewal
+            return self.election.renew_seconds
+        wait = super(LeaderOnlyScheduler, self)._process_jobs()
+        # jobs added to the shared job store by other processes don't wake up the leader, check the store at least
+        # once per renewal, e.g. experiments queued with seconds=0 by the followers
+        if wait is None:
+            return self.election.renew_seconds
+        return min(wait, self.election.renew_seconds)
 
 
 class HackathonScheduler(object):
@@ -84,7 +494,64 @@ class HackathonScheduler(object):
         """
         return self.__apscheduler
 
-    def add_once(self, feature, method, context=None, id=None, replace_existing=True, run_date=None, **delta):
+    def is_leader(self):
+        """Whether the scheduler of current process is the leader of cluster
+
+        Jobs added by add_interval run on the leader only, so that they run once per cluster rather than once per
+        process.
+        """
+        return self.__election is None or self.__election.is_leader()
+
+    def get_executor_stats(self):
+        """Counters of the thread pools of jobs
+
+        :rtype: dict
+        :return {name of executor: counters}, see MonitoredThreadPoolExecutor.get_stats
+        """
+        return dict((name, e.get_stats()) for name, e in self.__executors.items())
+
+    def get_job_metrics(self):
+        """Metrics of jobs since the process started, and count of jobs waiting in job store
+
+        :rtype: dict
+        :return {"jobs": see JobMetrics.get_stats, "pending": {feature.method: count of jobs in job store}}
+        """
+        pending = defaultdict(int)
+        if self.__apscheduler:
+            for job in self.__apscheduler.get_jobs(jobstore=self.jobstore):
+                pending[get_job_key(job)] += 1
+        return {"jobs": self.__metrics.get_stats(), "pending": dict(pending)}
+
+    def report_job_metrics(self):
+        """Report metrics of jobs as a health item, Warning if any job failed or missed its run time
+
+        :rtype: dict
+        """
+        metrics = self.get_job_metrics()
+        failed = sorted(key for key, m in metrics["jobs"].items() if m["errors"] or m["misfires"])
+        metrics[HEALTH.STATUS] = HEALTH_STATUS.WARNING if failed else HEALTH_STATUS.OK
+        if failed:
+            metrics[HEALTH.DESCRIPTION] = "jobs failed or missed: %s" % ", ".join(failed)
+        return metrics
+
+    def report_health(self):
+        """Report health of the thread pools of jobs
+
+        :rtype: dict
+        :return health status item of scheduler. Warning if jobs are waiting for a thread of any pool
+        """
+        executors = self.get_executor_stats()
+        saturated = [name for name, stats in executors.items() if stats["queued"] > 0]
+        health = {
+            HEALTH.STATUS: HEALTH_STATUS.WARNING if saturated else HEALTH_STATUS.OK,
+            "leader": self.is_leader(),
+            "executors": executors}
+        if saturated:
+            health[HEALTH.DESCRIPTION] = "jobs are queued in executors: %s" % ", ".join(sorted(saturated))
+        return health
+
+    def add_once(self, feature, method, context=None, id=None, replace_existing=True, run_date=None,
+                 executor=SCHEDULER_EXECUTOR.DEFAULT, **delta):
         """Add a job to APScheduler and executed only once
 
         Job will be executed at 'run_date' or after certain timedelta.
@@ -115,6 +582,9 @@ class HackathonScheduler(object):
         :type run_date: datetime | None
         :param run_date: job run date. If None, job run date will be datetime.now()+timedelta(delta)
 
+        :type executor: str|unicode
+        :param executor: the thread pool to run the job, one of SCHEDULER_EXECUTOR
+
         :type delta: kwargs for timedelta
         :param delta: kwargs for timedelta. For example: minutes=5. Will be ignored if run_date is not None
         """
@@ -129,10 +599,11 @@ class HackathonScheduler(object):
                                        max_instances=1,
                                        replace_existing=replace_existing,
                                        jobstore=self.jobstore,
-                                       args=[feature, method, context])
+                                       executor=self.__get_executor(executor),
+                                       args=[feature, method, pack_job_context(context)])
 
     def add_interval(self, feature, method, context=None, id=None, replace_existing=True, next_run_time=undefined,
-                     **interval):
+                     leader_only=True, executor=SCHEDULER_EXECUTOR.DEFAULT, **interval):
         """Add an interval job to APScheduler and executed.
 
         Job will be executed firstly at 'next_run_time'. And then executed in interval.
@@ -162,10 +633,18 @@ class HackathonScheduler(object):
         :type next_run_time: datetime | undefined
         :param next_run_time: the first time the job will be executed. leave undefined to don't execute until interval time reached
 
+        :type leader_only: bool
+        :param leader_only: run the job only in the process whose scheduler is the leader of cluster, see is_leader
+
+        :type executor: str|unicode
+        :param executor: the thread pool to run the job, one of SCHEDULER_EXECUTOR
+
         :type interval: kwargs for "interval" trigger
         :param interval: kwargs for "interval" trigger. For example: minutes=5.
         """
         if self.__apscheduler:
+            # interval jobs run again and again, put the method into the dispatch table in advance
+            job_methods.register(feature, method)
             self.__apscheduler.add_job(scheduler_executor,
                                        trigger='interval',
                                        id=id,
@@ -173,7 +652,9 @@ class HackathonScheduler(object):
                                        replace_existing=replace_existing,
                                        next_run_time=next_run_time,
                                        jobstore=self.jobstore,
-                                       args=[feature, method, context],
+                                       executor=self.__get_executor(executor),
+                                       args=[feature, method, pack_job_context(context)],
+                                       kwargs={"leader_only": leader_only},
                                        **interval)
 
     def remove_job(self, job_id):
@@ -205,14 +686,25 @@ class HackathonScheduler(object):
         """
         self.app = app
         self.__apscheduler = None
+        self.__election = None
+        self.__executors = {}
+        self.__metrics = JobMetrics()
 
         # NOT instantiate while in flask DEBUG mode or in the main thread
         # It's to avoid APScheduler being instantiated twice
         if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
-            self.__apscheduler = BackgroundScheduler(timezone=utc)
+            job_store_type = safe_get_config("scheduler.job_store", "memory")
+            if safe_get_config("scheduler.leader_election", True):
+                self.__election = self.__create_election()
+
+            if self.__election and job_store_type in ("mysql", "mongodb"):
+                # all processes share the job store, only the leader takes jobs out of it
+                self.__apscheduler = LeaderOnlyScheduler(self.__election, timezone=utc)
+                self.__election.on_elected = self.__apscheduler.wakeup
+            else:
+                self.__apscheduler = BackgroundScheduler(timezone=utc)
 
             # add MySQL job store
-            job_store_type = safe_get_config("scheduler.job_store", "memory")
             if job_store_type == "mysql":
                 log.debug("add aps_cheduler job store based on mysql")
                 self.__apscheduler.add_jobstore('sqlalchemy',
@@ -227,7 +719,32 @@ class HackathonScheduler(object):
                                                 host=safe_get_config("scheduler.host", "localhost"),
                                                 port=safe_get_config("scheduler.port", 27017))
 
+            # add thread pools, long jobs like provisioning experiments don't take all threads from the short ones
+            sizes = {SCHEDULER_EXECUTOR.DEFAULT: 10, SCHEDULER_EXECUTOR.PROVISION: 8, SCHEDULER_EXECUTOR.IMAGE: 2,
+                     SCHEDULER_EXECUTOR.HOUSEKEEPING: 4}
+            sizes.update(safe_get_config("scheduler.executors", {}))
+            for name, max_workers in sizes.items():
+                self.__executors[name] = MonitoredThreadPoolExecutor(max_workers, self.__metrics)
+                self.__apscheduler.add_executor(self.__executors[name], name)
+
             # add event listener
             self.__apscheduler.add_listener(scheduler_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_ADDED)
             log.info("APScheduler loaded")
             self.__apscheduler.start()
+
+            if self.__election:
+                self.__election.start()
+                atexit.register(self.__election.stop)
+
+    def __get_executor(self, executor):
+        # jobs are never dropped for an executor missing in config
+        return executor if executor in self.__executors else SCHEDULER_EXECUTOR.DEFAULT
+
+    def __create_election(self):
+        client = pymongo.MongoClient(safe_get_config("scheduler.host", "localhost"),
+                                     safe_get_config("scheduler.port", 27017), connect=False)
+        collection = client[safe_get_config("scheduler.database", "apscheduler")][
+            safe_get_config("scheduler.lease_collection", "scheduler_lease")]
+        return LeaderElection(collection,
+                              lease_seconds=safe_get_config("scheduler.lease_seconds", 15),
+                              renew_seconds=safe_get_config("scheduler.lease_renew_seconds", 5))
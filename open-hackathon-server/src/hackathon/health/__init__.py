@@ -24,7 +24,11 @@ all_health_items = {
     "docker": RequiredFeature("health_check_hosted_docker"),
     "guacamole": RequiredFeature("health_check_guacamole"),
     "storage": RequiredFeature("storage"),
-    "mongodb": RequiredFeature("health_check_mongodb")
+    "mongodb": RequiredFeature("health_check_mongodb"),
+    "cache": RequiredFeature("cache"),
+    "expr_pool": RequiredFeature("health_check_expr_pool"),
+    "scheduler": RequiredFeature("health_check_scheduler"),
+    "scheduler_jobs": RequiredFeature("health_check_scheduler_jobs")
 }
 
 # basic health check items which are fundamental for OHP
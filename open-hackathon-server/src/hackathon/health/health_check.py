@@ -17,7 +17,10 @@ from hackathon import RequiredFeature, Component
 __all__ = [
     "HostedDockerHealthCheck",
     "GuacamoleHealthCheck",
-    "StorageHealthCheck"
+    "StorageHealthCheck",
+    "ExprPoolHealthCheck",
+    "SchedulerHealthCheck",
+    "SchedulerJobsHealthCheck"
 ]
 
 STATUS = "status"
@@ -94,3 +97,42 @@ class StorageHealthCheck(HealthCheck):
 
     def __init__(self):
         self.storage = RequiredFeature("storage")
+
+
+class ExprPoolHealthCheck(HealthCheck):
+    """Report the hit rate of the warm pool of pre-allocated experiments
+
+    see more on expr/expr_mgr.py
+    """
+
+    def __init__(self):
+        self.expr_manager = RequiredFeature("expr_manager")
+
+    def report_health(self):
+        return self.expr_manager.report_pool_health()
+
+
+class SchedulerHealthCheck(HealthCheck):
+    """Report the usage of thread pools of scheduler jobs
+
+    see more on hackathon_scheduler.py
+    """
+
+    def __init__(self):
+        self.scheduler = RequiredFeature("scheduler")
+
+    def report_health(self):
+        return self.scheduler.report_health()
+
+
+class SchedulerJobsHealthCheck(HealthCheck):
+    """Report execution time, scheduling lag and errors of scheduler jobs
+
+    see more on hackathon_scheduler.py
+    """
+
+    def __init__(self):
+        self.scheduler = RequiredFeature("scheduler")
+
+    def report_health(self):
+        return self.scheduler.report_job_metrics()
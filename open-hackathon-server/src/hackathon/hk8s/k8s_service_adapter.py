@@ -10,14 +10,30 @@ import yaml as yaml_tool
 from kubernetes import client
 from kubernetes.client.rest import ApiException
 
-from hackathon.constants import HEALTH, HEALTH_STATUS, K8S_DEPLOYMENT_STATUS
+from hackathon.constants import HEALTH, HEALTH_STATUS
 from .service_adapter import ServiceAdapter
+from .k8s_watcher import DeploymentWatcher, get_deployment_status
 
 from .errors import DeploymentError, ServiceError, StatefulSetError, PVCError
 
 __all__ = ["K8SServiceAdapter"]
 disable_warnings(InsecureRequestWarning)
 
+HTTP_NOT_FOUND = 404
+HTTP_METHOD_NOT_ALLOWED = 405
+HTTP_CONFLICT = 409
+
+
+def get_label_selector(labels):
+    """Build the label selector of k8s api, e.g. {"a": "1", "b": "2"} -> "a=1,b=2"
+
+    :type labels: dict
+    :param labels: labels that the selected resources must have
+
+    :rtype: str
+    """
+    return ",".join(["{}={}".format(k, v) for k, v in list(labels.items())])
+
 
 class K8SServiceAdapter(ServiceAdapter):
     def __init__(self, api_url, token, namespace):
@@ -61,8 +77,7 @@ class K8SServiceAdapter(ServiceAdapter):
         _deployments = []
         kwargs = {"timeout_seconds": timeout, "watch": False}
         if labels and isinstance(labels, dict):
-            label_selector = ",".join(["{}={}".format(k, v) for k, v in list(labels.items())])
-            kwargs['label_selector'] = label_selector
+            kwargs['label_selector'] = get_label_selector(labels)
 
         apps_v1_group = client.AppsV1Api(self.api_client)
         try:
@@ -82,17 +97,18 @@ class K8SServiceAdapter(ServiceAdapter):
         api_instance = client.AppsV1Api(self.api_client)
         if isinstance(yaml, str) or isinstance(yaml, str):
             # Only support ONE deployment yaml
-            yaml = yaml_tool.load(yaml)
+            yaml = yaml_tool.safe_load(yaml)
         assert isinstance(yaml, dict), "Start a deployment without legal yaml."
         metadata = yaml.get("metadata", {})
         deploy_name = metadata.get("name")
 
         try:
-            if self.get_deployment_by_name(deploy_name, need_raise=False):
-                raise DeploymentError("Deployment name was existed.")
-
             api_instance.create_namespaced_deployment(self.namespace, yaml, async_req=False)
         except ApiException as e:
+            if e.status == HTTP_CONFLICT:
+                # created by previous attempt, names of k8s resources are unique per experiment
+                self.log.debug("Deployment {} exists already".format(deploy_name))
+                return deploy_name
             self.log.error("Start deployment error: {}".format(e))
             raise DeploymentError("Start deployment error: {}".format(e))
         return deploy_name
@@ -108,15 +124,25 @@ class K8SServiceAdapter(ServiceAdapter):
         return _deploy
 
     def get_deployment_status(self, deployment_name):
-        _deploy = self.get_deployment_by_name(deployment_name)
-        _status = _deploy.status
-        if not _status.replicas:
-            return K8S_DEPLOYMENT_STATUS.PAUSE
-        if _status.replicas == _status.available_replicas:
-            return K8S_DEPLOYMENT_STATUS.AVAILABLE
-        if _status.unavailable_replicas > 0:
-            return K8S_DEPLOYMENT_STATUS.ERROR
-        return K8S_DEPLOYMENT_STATUS.PENDING
+        return get_deployment_status(self.get_deployment_by_name(deployment_name))
+
+    def watch_deployments_ready(self, deployment_names, callback, timeout):
+        """Call callback once all deployments become available, see DeploymentWatcher.watch
+
+        Deployments of all experiments in the namespace share one watch stream rather than polling their status.
+        """
+        self.__get_watcher().watch(deployment_names, callback, timeout)
+
+    def wait_for_deployments_ready(self, deployment_names, timeout):
+        """Block until all deployments become available or timeout
+
+        :rtype: bool
+        :return True if all deployments are available otherwise False
+        """
+        return self.__get_watcher().wait(deployment_names, timeout)
+
+    def __get_watcher(self):
+        return DeploymentWatcher.get_watcher(self.api_client, self.api_url, self.namespace)
 
     def start_k8s_deployment(self, deployment_name):
         _deploy = self.get_deployment_by_name(deployment_name)
@@ -166,17 +192,29 @@ class K8SServiceAdapter(ServiceAdapter):
             return None
         return _svc.to_dict()
 
-    def create_k8s_service(self, yaml):
+    def create_k8s_service(self, yaml, detail=False):
+        """Create service
+
+        :type detail: bool
+        :param detail: return the created service rather than its name, which includes the node ports allocated
+
+        :rtype: str|dict
+        :return name of the service, or the service in dict if detail is True
+        """
         if isinstance(yaml, str) or isinstance(yaml, str):
             # Only support ONE deployment yaml
-            yaml = yaml_tool.load(yaml)
+            yaml = yaml_tool.safe_load(yaml)
         assert isinstance(yaml, dict), "Create a service without legal yaml."
 
         api_instance = client.CoreV1Api(self.api_client)
         try:
-            svc = api_instance.create_namespaced_service(self.namespace, yaml)
-            return svc.to_dict()['metadata']['name']
+            svc = api_instance.create_namespaced_service(self.namespace, yaml).to_dict()
+            return svc if detail else svc['metadata']['name']
         except ApiException as e:
+            if e.status == HTTP_CONFLICT:
+                svc_name = yaml.get("metadata", {}).get("name")
+                self.log.debug("Service {} exists already".format(svc_name))
+                return self.get_service_by_name(svc_name) if detail else svc_name
             self.log.error("Create service error: {}".format(e))
             raise ServiceError("Create service error: {}".format(e))
 
@@ -195,13 +233,16 @@ class K8SServiceAdapter(ServiceAdapter):
     def create_k8s_statefulset(self, yaml):
         if isinstance(yaml, str) or isinstance(yaml, str):
             # Only support ONE deployment yaml
-            yaml = yaml_tool.load(yaml)
+            yaml = yaml_tool.safe_load(yaml)
         assert isinstance(yaml, dict), "Create a statefulset without legal yaml."
 
         api_instance = client.AppsV1Api(self.api_client)
         try:
             api_instance.create_namespaced_stateful_set(self.namespace, yaml)
         except ApiException as e:
+            if e.status == HTTP_CONFLICT:
+                self.log.debug("StatefulSet {} exists already".format(yaml.get("metadata", {}).get("name")))
+                return
             self.log.error("Create StatefulSet error: {}".format(e))
             raise StatefulSetError("Create StatefulSet error: {}".format(e))
 
@@ -220,13 +261,16 @@ class K8SServiceAdapter(ServiceAdapter):
     def create_k8s_pvc(self, yaml):
         if isinstance(yaml, str) or isinstance(yaml, str):
             # Only support ONE deployment yaml
-            yaml = yaml_tool.load(yaml)
+            yaml = yaml_tool.safe_load(yaml)
         assert isinstance(yaml, dict), "Create a PVC without legal yaml."
 
         api_instance = client.CoreV1Api(self.api_client)
         try:
             api_instance.create_namespaced_persistent_volume_claim(self.namespace, yaml)
         except ApiException as e:
+            if e.status == HTTP_CONFLICT:
+                self.log.debug("PVC {} exists already".format(yaml.get("metadata", {}).get("name")))
+                return
             self.log.error("Create PVC error: {}".format(e))
             raise PVCError("Create PVC error: {}".format(e))
 
@@ -237,3 +281,67 @@ class K8SServiceAdapter(ServiceAdapter):
         except ApiException as e:
             self.log.error("Delete PVC error: {}".format(e))
             raise PVCError("Delete PVC error: {}".format(e))
+
+    ###
+    # Teardown
+    ###
+
+    def delete_by_labels(self, labels):
+        """Delete all deployments, statefulsets, PVCs and services with the labels in the namespace
+
+        Resources are deleted by collection, so tearing down any number of experiments takes a few requests. Pods
+        are deleted in background by the garbage collector of k8s.
+
+        :type labels: dict
+        :param labels: labels stamped by TemplateRender, e.g. {K8S_LABEL.EXPERIMENT: experiment_id}
+        """
+        assert labels, "Delete k8s resources without labels."
+        label_selector = get_label_selector(labels)
+        body = client.V1DeleteOptions(propagation_policy="Background")
+        apps_v1_group = client.AppsV1Api(self.api_client)
+        core_v1_group = client.CoreV1Api(self.api_client)
+
+        try:
+            apps_v1_group.delete_collection_namespaced_deployment(self.namespace, label_selector=label_selector,
+                                                                  body=body)
+        except ApiException as e:
+            self.log.error("Delete deployments error: {}".format(e))
+            raise DeploymentError("Delete deployments of {} error {}".format(label_selector, e))
+
+        try:
+            apps_v1_group.delete_collection_namespaced_stateful_set(self.namespace, label_selector=label_selector,
+                                                                    body=body)
+        except ApiException as e:
+            self.log.error("Delete StatefulSets error: {}".format(e))
+            raise StatefulSetError("Delete StatefulSets of {} error {}".format(label_selector, e))
+
+        try:
+            core_v1_group.delete_collection_namespaced_persistent_volume_claim(self.namespace,
+                                                                               label_selector=label_selector)
+        except ApiException as e:
+            self.log.error("Delete PVCs error: {}".format(e))
+            raise PVCError("Delete PVCs of {} error {}".format(label_selector, e))
+
+        self.__delete_services(core_v1_group, label_selector)
+        self.log.info("Deleted k8s resources of {}".format(label_selector))
+
+    def __delete_services(self, core_v1_group, label_selector):
+        try:
+            # deleting collection of services is supported since k8s 1.19, delete them one by one before that
+            if hasattr(core_v1_group, "delete_collection_namespaced_service"):
+                try:
+                    core_v1_group.delete_collection_namespaced_service(self.namespace, label_selector=label_selector)
+                    return
+                except ApiException as e:
+                    if e.status not in (HTTP_NOT_FOUND, HTTP_METHOD_NOT_ALLOWED):
+                        raise
+
+            for svc in core_v1_group.list_namespaced_service(self.namespace, label_selector=label_selector).items:
+                try:
+                    core_v1_group.delete_namespaced_service(svc.metadata.name, self.namespace)
+                except ApiException as e:
+                    if e.status != HTTP_NOT_FOUND:
+                        raise
+        except ApiException as e:
+            self.log.error("Delete services error: {}".format(e))
+            raise ServiceError("Delete services of {} error {}".format(label_selector, e))
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+"""
+
+import threading
+import time
+
+from kubernetes import client, watch
+from kubernetes.client.rest import ApiException
+
+from hackathon import Component
+from hackathon.constants import K8S_DEPLOYMENT_STATUS, K8S_LABEL
+
+__all__ = ["DeploymentWatcher", "get_deployment_status"]
+
+HTTP_GONE = 410
+
+
+def get_deployment_status(deployment):
+    """Get status of deployment
+
+    :type deployment: kubernetes.client.V1Deployment
+    :param deployment: the deployment read from k8s api server
+
+    :rtype: int
+    :return one of K8S_DEPLOYMENT_STATUS
+    """
+    _status = deployment.status
+    if not _status or not _status.replicas:
+        return K8S_DEPLOYMENT_STATUS.PAUSE
+    if _status.replicas == _status.available_replicas:
+        return K8S_DEPLOYMENT_STATUS.AVAILABLE
+    if (_status.unavailable_replicas or 0) > 0:
+        return K8S_DEPLOYMENT_STATUS.ERROR
+    return K8S_DEPLOYMENT_STATUS.PENDING
+
+
+class _Subscription(object):
+    """Deployments an experiment is waiting for"""
+
+    def __init__(self, names, callback, deadline):
+        self.pending = set(names)
+        self.callback = callback
+        self.deadline = deadline
+
+
+class DeploymentWatcher(Component):
+    """Watch the deployments of experiments in a namespace and notify the waiters once they become available
+
+    There is only one watch stream per namespace of a k8s cluster no matter how many experiments are waiting, the
+    stream is opened by the first waiter and closed once nobody waits any more. Events of deployments are fanned
+    out to the waiters from the thread of the stream, so waiting doesn't occupy a thread of scheduler.
+
+    Use get_watcher rather than the constructor to share the watcher of a namespace.
+    """
+    __watchers = {}
+    __watchers_lock = threading.Lock()
+
+    @classmethod
+    def get_watcher(cls, api_client, api_url, namespace):
+        """Get the shared watcher of namespace
+
+        :type api_client: kubernetes.client.ApiClient
+        :param api_client: client of the k8s api server, used when the watcher is created
+
+        :type api_url: str|unicode
+        :param api_url: url of the k8s api server
+
+        :type namespace: str|unicode
+        :param namespace: the namespace of deployments
+        """
+        key = (api_url, namespace)
+        with cls.__watchers_lock:
+            if key not in cls.__watchers:
+                cls.__watchers[key] = cls(api_client, namespace)
+            return cls.__watchers[key]
+
+    def __init__(self, api_client, namespace, watch_timeout=None):
+        self.api_client = api_client
+        self.namespace = namespace
+        self.watch_timeout = watch_timeout or self.util.safe_get_config("k8s.watch_timeout", 30)
+
+        self.lock = threading.Lock()
+        self.thread = None
+        self.statuses = {}
+        self.subscriptions = []
+        self.events_received = 0
+
+    def watch(self, deployment_names, callback, timeout):
+        """Call callback once all deployments become available or timeout
+
+        :type deployment_names: list
+        :param deployment_names: names of the deployments
+
+        :type callback: function
+        :param callback: called with True if all deployments are available, False if timeout or any deployment is
+            deleted. It's called in the thread of watch stream, so it should return quickly
+
+        :type timeout: int
+        :param timeout: max seconds to wait
+        """
+        subscription = _Subscription(deployment_names, callback, time.time() + timeout)
+        with self.lock:
+            subscription.pending -= set(n for n in deployment_names
+                                        if self.statuses.get(n) == K8S_DEPLOYMENT_STATUS.AVAILABLE)
+            if subscription.pending:
+                self.subscriptions.append(subscription)
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.__run, name="k8s-watch-" + self.namespace)
+                    self.thread.daemon = True
+                    self.thread.start()
+                return
+
+        self.__notify([(subscription, True)])
+
+    def wait(self, deployment_names, timeout):
+        """Block until all deployments become available or timeout
+
+        :rtype: bool
+        :return True if all deployments are available otherwise False
+        """
+        done = threading.Event()
+        result = []
+
+        def callback(ready):
+            result.append(ready)
+            done.set()
+
+        self.watch(deployment_names, callback, timeout)
+        done.wait()
+        return result[0]
+
+    def __run(self):
+        resource_version = None
+        while True:
+            with self.lock:
+                if not self.subscriptions:
+                    # statuses are not tracked without stream, so they must be listed again next time
+                    self.statuses.clear()
+                    self.thread = None
+                    return
+
+            try:
+                api_instance = client.AppsV1Api(self.api_client)
+                if resource_version is None:
+                    ret = api_instance.list_namespaced_deployment(self.namespace, label_selector=K8S_LABEL.EXPERIMENT)
+                    for d in ret.items:
+                        self.__on_event("ADDED", d)
+                    resource_version = ret.metadata.resource_version
+
+                w = watch.Watch()
+                for event in w.stream(api_instance.list_namespaced_deployment, self.namespace,
+                                      label_selector=K8S_LABEL.EXPERIMENT,
+                                      resource_version=resource_version,
+                                      timeout_seconds=self.__get_watch_timeout()):
+                    resource_version = event["object"].metadata.resource_version
+                    self.__on_event(event["type"], event["object"])
+                    if self.__expire():
+                        w.stop()
+                        break
+                self.__expire()
+            except ApiException as e:
+                if e.status != HTTP_GONE:
+                    # e.g. wrong token or api server down, waiters time out rather than wait for ever
+                    self.log.error("watch deployments of %s error: %s" % (self.namespace, e))
+                    self.__expire()
+                    time.sleep(1)
+                # resource version is too old, list them again
+                resource_version = None
+            except Exception as e:
+                self.log.error("watch deployments of %s error: %s" % (self.namespace, e))
+                self.__expire()
+                time.sleep(1)
+                resource_version = None
+
+    def __get_watch_timeout(self):
+        """Seconds until the nearest deadline of waiters, so that the stream ends on time to expire them"""
+        with self.lock:
+            deadline = min([s.deadline for s in self.subscriptions] or [time.time()])
+        return max(1, min(self.watch_timeout, int(deadline - time.time()) + 1))
+
+    def __on_event(self, event_type, deployment):
+        name = deployment.metadata.name
+        finished = []
+        with self.lock:
+            self.events_received += 1
+            if event_type == "DELETED":
+                self.statuses.pop(name, None)
+                finished = [(s, False) for s in self.subscriptions if name in s.pending]
+            else:
+                self.statuses[name] = get_deployment_status(deployment)
+                if self.statuses[name] == K8S_DEPLOYMENT_STATUS.AVAILABLE:
+                    for s in self.subscriptions:
+                        s.pending.discard(name)
+                    finished = [(s, True) for s in self.subscriptions if not s.pending]
+
+            for s, _ in finished:
+                self.subscriptions.remove(s)
+
+        self.__notify(finished)
+
+    def __expire(self):
+        """Notify the waiters which are timeout
+
+        :rtype: bool
+        :return True if nobody is waiting any more
+        """
+        now = time.time()
+        with self.lock:
+            expired = [s for s in self.subscriptions if s.deadline <= now]
+            for s in expired:
+                self.subscriptions.remove(s)
+            idle = not self.subscriptions
+
+        self.__notify([(s, False) for s in expired])
+        return idle
+
+    def __notify(self, finished):
+        for subscription, ready in finished:
+            try:
+                subscription.callback(ready)
+            except Exception as e:
+                self.log.error(e)
@@ -1,6 +1,7 @@
 from mongoengine import connect
 
-from hackathon.hmongo.models import User
+from hackathon.hmongo import models
+from hackathon.hmongo.models import User, HDocumentBase
 from hackathon.util import safe_get_config
 
 mongodb_host = safe_get_config("mongodb.host", "localhost")
@@ -31,6 +32,22 @@ def setup_db():
     # default super admin
 
 
+def ensure_indexes():
+    """Create the indexes declared in meta of all models
+
+    Indexes are created by mongoengine upon the first access of collection as well. Run it after deployment so that
+    indexes are built before any traffic.
+
+    :rtype: list
+    :return names of the models whose indexes are ensured
+    """
+    documents = [c for c in vars(models).values()
+                 if isinstance(c, type) and issubclass(c, HDocumentBase) and not c._meta.get("abstract")]
+    for document in documents:
+        document.ensure_indexes()
+    return [d.__name__ for d in documents]
+
+
 def add_super_user(name, nickname, password):
     admin = User(
         name=name,
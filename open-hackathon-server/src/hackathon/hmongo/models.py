@@ -6,11 +6,11 @@ This file is covered by the LICENSING file in the root of this project.
 import hashlib
 from mongoengine import QuerySet, DateTimeField, DynamicDocument, EmbeddedDocument, StringField, \
     BooleanField, IntField, DynamicEmbeddedDocument, EmbeddedDocumentListField, URLField, ListField, \
-    EmbeddedDocumentField, ReferenceField, UUIDField, DictField, DynamicField, PULL
+    EmbeddedDocumentField, ReferenceField, UUIDField, DictField, DynamicField, FloatField, PULL
 
 from hackathon.util import get_now, make_serializable
 from hackathon.constants import TEMPLATE_STATUS, HACK_USER_TYPE, VE_PROVIDER
-from hackathon.hmongo.pagination import Pagination
+from hackathon.hmongo.pagination import Pagination, CursorPagination
 from hackathon import app
 
 
@@ -33,8 +33,12 @@ class HQuerySet(QuerySet):
     """add some handy helpers on the default query set from mongoengine
     """
 
-    def paginate(self, page, per_page):
-        return Pagination(self, page, per_page)
+    def paginate(self, page, per_page, select_related=True):
+        return Pagination(self, page, per_page, select_related)
+
+    def cursor_paginate(self, order_by="id", cursor=None, per_page=20, with_total=False, select_related=True):
+        """Keyset pagination, see CursorPagination"""
+        return CursorPagination(self, order_by, cursor, per_page, with_total, select_related)
 
 
 class HDocumentBase(DynamicDocument):
@@ -111,7 +115,9 @@ class User(HDocumentBase):
                 # default unqiue is not sparse, so we have to set it by ourselves
                 "fields": ["provider", "openid"],
                 "unique": True,
-                "sparse": True}]}
+                "sparse": True},
+            "name",
+            "emails.email"]}
 
     def __init__(self, **kwargs):
         super(User, self).__init__(**kwargs)
@@ -144,7 +150,8 @@ class UserToken(HDocumentBase):
                 # but mongodb only support Single Key Index on Hashed Token so far
                 # set the `cls` option to False can disable this beahviour on mongoengine
                 "fields": ["#token"],
-                "cls": False}]}
+                "cls": False},
+            "user"]}
 
     def __init__(self, **kwargs):
         super(UserToken, self).__init__(**kwargs)
@@ -274,6 +281,7 @@ class Hackathon(HDocumentBase):
     awards = EmbeddedDocumentListField(Award)
     templates = ListField(ReferenceField(Template, reverse_delete_rule=PULL))  # templates for hackathon
     azure_keys = ListField(ReferenceField(AzureKey))
+    register_count = IntField(default=0)  # denormalized from HackathonStat for ordering hackathons by popularity
 
     event_start_time = DateTimeField()
     event_end_time = DateTimeField()
@@ -283,6 +291,19 @@ class Hackathon(HDocumentBase):
     judge_end_time = DateTimeField()
     archive_time = DateTimeField()
 
+    meta = {
+        "indexes": [
+            {
+                # hot hackathons: order by register_count with or without status filter
+                "fields": ["-register_count", "-id"]},
+            {
+                "fields": ["status", "-register_count", "-id"]},
+            # latest and upcoming hackathons, with or without status filter
+            "-create_time",
+            ("status", "-create_time"),
+            "-event_start_time",
+            ("status", "-event_start_time")]}
+
     def __init__(self, **kwargs):
         super(Hackathon, self).__init__(**kwargs)
 
@@ -297,6 +318,13 @@ class UserHackathon(HDocumentBase):
     remark = StringField()
     deleted = BooleanField(default=False)
 
+    meta = {
+        "indexes": [
+            # role checks and registration of certain user
+            ("user", "hackathon", "role"),
+            # registration and admin list of hackathon
+            ("hackathon", "role", "status")]}
+
     def __init__(self, **kwargs):
         super(UserHackathon, self).__init__(**kwargs)
 
@@ -306,6 +334,11 @@ class HackathonStat(HDocumentBase):
     count = IntField(min_value=0)
     hackathon = ReferenceField(Hackathon)
 
+    meta = {
+        "indexes": [
+            ("hackathon", "type"),
+            "type"]}
+
 
 class HackathonNotice(HDocumentBase):
     category = IntField()  # category: Class HACK_NOTICE_CATEGORY, controls how icons/descriptions are shown at front-end
@@ -318,6 +351,13 @@ class HackathonNotice(HDocumentBase):
     receiver = ReferenceField(User)
     is_read = BooleanField(default=False)
 
+    meta = {
+        "indexes": [
+            # notice list of user or hackathon, newest first
+            ("receiver", "hackathon", "-update_time"),
+            # duplicate check of notices
+            ("receiver", "event", "hackathon")]}
+
     def __init__(self, **kwargs):
         super(HackathonNotice, self).__init__(**kwargs)
 
@@ -362,10 +402,25 @@ class Team(HDocumentBase):
     azure_keys = ListField(ReferenceField(AzureKey))
     templates = ListField(ReferenceField(Template))  # templates for team
 
+    meta = {
+        "indexes": [
+            ("hackathon", "name"),
+            ("members.user", "hackathon"),
+            "works.id"]}
+
     def __init__(self, **kwargs):
         super(Team, self).__init__(**kwargs)
 
 
+class DockerHostHealth(DynamicEmbeddedDocument):
+    # result of the latest probe of docker remote api, see HostedDockerFormation.probe_hosts
+    alive = BooleanField(default=False)
+    latency = FloatField()  # milliseconds
+    checked_time = DateTimeField()
+    last_seen = DateTimeField()  # last time the host responded
+    history = ListField(BooleanField(), default=[])  # results of the recent probes, the latest at the end
+
+
 class DockerHostServer(HDocumentBase):
     vm_name = StringField(required=True)
     public_dns = StringField()
@@ -379,6 +434,11 @@ class DockerHostServer(HDocumentBase):
     state = IntField(default=0)  # 0-VM starting, 1-docker init, 2-docker API ready, 3-unavailable
     disabled = BooleanField(default=False)  # T-disabled by manager, F-available
     hackathon = ReferenceField(Hackathon)
+    health = EmbeddedDocumentField(DockerHostHealth)
+
+    meta = {
+        "indexes": [
+            ("hackathon", "state", "disabled", "container_count")]}
 
     def __init__(self, **kwargs):
         super(DockerHostServer, self).__init__(**kwargs)
@@ -397,10 +457,12 @@ class PortBinding(DynamicEmbeddedDocument):
 
 
 class DockerContainer(DynamicEmbeddedDocument):
-    name = StringField(required=True, unique=True)
+    name = StringField(required=True, unique=True, sparse=True)
     image = StringField()
     container_id = StringField()
     host_server = ReferenceField(DockerHostServer)
+    # whether the container is counted in container_count of host_server, see DockerHostManager
+    slot_reserved = BooleanField(default=False)
     port_bindings = EmbeddedDocumentListField(PortBinding, default=[])
 
 
@@ -473,7 +535,7 @@ class VirtualEnvironment(DynamicEmbeddedDocument):
     Virtual environment is abstraction of smallest environment unit in template
     """
     provider = IntField()  # VE_PROVIDER in enum.py
-    name = StringField(required=True, unique=True)
+    name = StringField(required=True, unique=True, sparse=True)
     status = IntField(required=True)  # VEStatus in enum.py
     remote_provider = IntField()  # VERemoteProvider in enum.py
     remote_paras = DictField()
@@ -491,6 +553,21 @@ class Experiment(HDocumentBase):
     user = ReferenceField(User)
     hackathon = ReferenceField(Hackathon)
     virtual_environments = EmbeddedDocumentListField(VirtualEnvironment, default=[])
+    # seconds from the start of provisioning until each stage done, e.g. {"pvc": 0.5, "deployment": 1.2}
+    provision_timings = DictField()
+
+    meta = {
+        "indexes": [
+            # experiment list and recycling of hackathon, pre-allocated experiments(user=None)
+            ("hackathon", "status", "user", "template"),
+            # running experiment of certain user
+            ("user", "hackathon", "status"),
+            # starting pre-allocated experiments and usage of template
+            ("template", "status", "user"),
+            # experiment by guacamole connection name
+            "virtual_environments.name",
+            # running and recently stopped experiments of the reconcile job
+            ("status", "update_time")]}
 
     def __init__(self, **kwargs):
         super(Experiment, self).__init__(**kwargs)
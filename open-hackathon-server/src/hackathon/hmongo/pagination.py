@@ -3,19 +3,25 @@
 This file is covered by the LICENSING file in the root of this project.
 """
 
+import base64
+import hashlib
 import math
 import sys
 
+from bson import json_util
 from flask import abort
-
+from mongoengine import Q
 from mongoengine.queryset import QuerySet
 
-__all__ = ("Pagination")
+from hackathon.hackathon_factory import RequiredFeature
+from hackathon.constants import CACHE_NAMESPACE
+
+__all__ = ("Pagination", "CursorPagination")
 
 
 class Pagination(object):
 
-    def __init__(self, iterable, page, per_page):
+    def __init__(self, iterable, page, per_page, select_related=True):
 
         if page < 1:
             abort(404)
@@ -23,6 +29,7 @@ class Pagination(object):
         self.iterable = iterable
         self.page = page
         self.per_page = per_page
+        self.select_related = select_related
 
         if isinstance(iterable, QuerySet):
             self.total = iterable.count()
@@ -34,7 +41,8 @@ class Pagination(object):
 
         self.items = iterable[start_index:end_index]
         if isinstance(self.items, QuerySet):
-            self.items = self.items.select_related()
+            # dereference all references of items in bulk, or keep the raw references if not required
+            self.items = self.items.select_related() if select_related else list(self.items)
         if not self.items and page != 1:
             abort(404)
 
@@ -51,7 +59,7 @@ class Pagination(object):
         if isinstance(iterable, QuerySet):
             iterable._skip = None
             iterable._limit = None
-        return self.__class__(iterable, self.page - 1, self.per_page)
+        return self.__class__(iterable, self.page - 1, self.per_page, self.select_related)
 
     @property
     def prev_num(self):
@@ -71,7 +79,7 @@ class Pagination(object):
         if isinstance(iterable, QuerySet):
             iterable._skip = None
             iterable._limit = None
-        return self.__class__(iterable, self.page + 1, self.per_page)
+        return self.__class__(iterable, self.page + 1, self.per_page, self.select_related)
 
     @property
     def has_next(self):
@@ -118,3 +126,83 @@ class Pagination(object):
                 last = num
         if last != self.pages:
             yield None
+
+
+class CursorPagination(object):
+    """Keyset pagination which seeks to the next page by the sort key and _id of the last item
+
+    Unlike Pagination, which skips (page - 1) * per_page documents and counts all of them on every request, the
+    cost of a page doesn't grow with its depth. The cursor is an opaque string to be passed back to fetch the next
+    page, None if no more pages.
+
+    The documents are sorted by the sort key and then by _id in the same direction, the sort key shouldn't be None.
+
+    Count of all documents is optional. It's counted on the first page and cached, pages after it reuse the cached
+    count which may be stale for at most the expiry of namespace 'pagination_total'.
+    """
+    cache = RequiredFeature("cache")
+
+    def __init__(self, queryset, order_by="id", cursor=None, per_page=20, with_total=False, select_related=True):
+        """Fetch the page after cursor
+
+        :type queryset: QuerySet
+        :param queryset: the filtered queryset to paginate
+
+        :type order_by: str|unicode
+        :param order_by: field name to sort by, prefixed by '-' for descending order. e.g. '-update_time'
+
+        :type cursor: str|unicode
+        :param cursor: cursor returned by previous page, None or empty for the first page
+
+        :type with_total: bool
+        :param with_total: whether to count all documents or not
+        """
+        if per_page < 1:
+            abort(400)
+
+        self.per_page = per_page
+        self.field = order_by.lstrip("+-")
+        self.descending = order_by.startswith("-")
+
+        page_queryset = queryset.clone()
+        if cursor:
+            page_queryset = page_queryset.filter(self.__after(*self.__decode(cursor)))
+
+        id_order = "-id" if self.descending else "+id"
+        order = [id_order] if self.field in ("id", "pk") else [order_by, id_order]
+        items = page_queryset.order_by(*order).limit(per_page + 1)
+        items = list(items.select_related() if select_related else items)
+
+        self.has_next = len(items) > per_page
+        self.items = items[:per_page]
+        self.cursor = self.__encode(self.items[-1]) if self.has_next else None
+        self.total = self.__count(queryset, refresh=not cursor) if with_total else None
+
+    def __after(self, value, last_id):
+        """Query of the documents after the last one of previous page"""
+        op = "lt" if self.descending else "gt"
+        if self.field in ("id", "pk"):
+            return Q(**{"id__" + op: last_id})
+
+        return Q(**{"%s__%s" % (self.field, op): value}) | Q(**{self.field: value, "id__" + op: last_id})
+
+    def __encode(self, item):
+        value = None if self.field in ("id", "pk") else getattr(item, self.field)
+        data = json_util.dumps({"v": value, "id": item.id})
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    @staticmethod
+    def __decode(cursor):
+        try:
+            data = json_util.loads(base64.urlsafe_b64decode(str(cursor).encode()).decode())
+            return data["v"], data["id"]
+        except Exception:
+            abort(400)
+
+    def __count(self, queryset, refresh):
+        query = json_util.dumps(queryset._query, sort_keys=True)
+        key = "%s:%s" % (queryset._collection.name, hashlib.md5(query.encode()).hexdigest())
+        if refresh:
+            self.cache.invalidate(key, namespace=CACHE_NAMESPACE.PAGINATION_TOTAL)
+
+        return self.cache.get_cache(key=key, createfunc=queryset.count, namespace=CACHE_NAMESPACE.PAGINATION_TOTAL)
@@ -38,6 +38,15 @@ class __K8sTemplate(__Template):
 class __K8sUnit(object):
     YAML_TEMPLATE = "yaml_template"
 
+    # remote parameters of guacamole
+    REMOTE_PARAMETER_NAME = "name"
+    REMOTE_PARAMETER_DISPLAY_NAME = "displayname"
+    REMOTE_PARAMETER_HOST_NAME = "hostname"
+    REMOTE_PARAMETER_PROTOCOL = "protocol"
+    REMOTE_PARAMETER_PORT = "port"
+    REMOTE_PARAMETER_USER_NAME = "username"
+    REMOTE_PARAMETER_PASSWORD = "password"
+
 
 TEMPLATE = __Template()
 DOCKER_TEMPLATE = __DockerTemplate()
@@ -2,12 +2,13 @@
 """
 This file is covered by the LICENSING file in the root of this project.
 """
+
 from flask import g
 from werkzeug.exceptions import BadRequest, InternalServerError, Forbidden, NotFound
 from mongoengine import Q
 
 from hackathon import Component, RequiredFeature
-from hackathon.constants import VE_PROVIDER
+from hackathon.constants import VE_PROVIDER, CACHE_NAMESPACE
 from hackathon.hmongo.models import Template, Experiment, NetworkConfigTemplate
 from hackathon.hackathon_response import ok, internal_server_error, forbidden
 from hackathon.constants import TEMPLATE_STATUS
@@ -44,13 +45,20 @@ class TemplateLibrary(Component):
         criterion = self.__generate_search_criterion(args)
         return [t.dic() for t in Template.objects(criterion)]
 
-    @staticmethod
-    def load_template(template):
+    def load_template(self, template):
         """load template content
-        :param template:
-        :return:
+
+        The content is cached by the id and update time of template, so that jobs of experiments which only carry
+        ids don't parse the template again. Cache backends return a copy, callers can't change the cached content.
+
+        :type template: Template
+        :param template: the template to load
+
+        :rtype: TemplateContent
         """
-        return TemplateContent.load_from_template(template)
+        key = "%s:%s" % (template.id, template.update_time)
+        return self.cache.get_cache(key, lambda: TemplateContent.load_from_template(template),
+                                    namespace=CACHE_NAMESPACE.TEMPLATE_CONTENT)
 
     def create_template(self, args):
         """ Create template """
@@ -10,7 +10,7 @@ from flask import request, g
 from mongoengine import Q, NotUniqueError, ValidationError
 
 from hackathon.hackathon_response import bad_request, internal_server_error, not_found, ok, unauthorized
-from hackathon.constants import HTTP_HEADER, HACK_USER_TYPE, FILE_TYPE
+from hackathon.constants import HTTP_HEADER, HACK_USER_TYPE, FILE_TYPE, CACHE_NAMESPACE
 from hackathon import Component, Context, RequiredFeature
 from hackathon.hmongo.models import UserToken, User, UserEmail, UserProfile, UserHackathon
 from hackathon.util import get_remote, get_config
@@ -19,6 +19,9 @@ __all__ = ["UserManager"]
 
 users_operation_time = {}
 
+# fields of User that never leave the database: not returned to clients and not kept in the user session cache
+SENSITIVE_USER_FIELDS = ("password", "access_token")
+
 
 class UserManager(Component):
     """Component for user management"""
@@ -51,11 +54,24 @@ class UserManager(Component):
                 user.online = False
                 user.save()
             g.user = None
-            g.token.delete()
+            UserToken.objects(token=g.token).delete()
+            self.cache.invalidate(g.token, namespace=CACHE_NAMESPACE.USER_TOKEN)
+            self.invalidate_user_session(user_id)
             return ok()
         except Exception as e:
             self.log.error(e)
-            return internal_server_error(e.message)
+            return internal_server_error(str(e))
+
+    def invalidate_user_session(self, user_id):
+        """Drop the cached snapshot of user
+
+        Must be called once the user gets updated, otherwise the change is invisible to the
+        authenticated requests until the cached snapshot expires.
+
+        :type user_id: str|unicode|ObjectId
+        :param user_id: id of the user
+        """
+        self.cache.invalidate(str(user_id), namespace=CACHE_NAMESPACE.USER_SESSION)
 
     def login(self, provider, context):
         if provider == "db":
@@ -241,10 +257,8 @@ class UserManager(Component):
         ret = user.dic()
 
         # pop high-security-risk data
-        if "password" in ret:
-            ret.pop("password")
-        if "access_token" in ret:
-            ret.pop("access_token")
+        for field in SENSITIVE_USER_FIELDS:
+            ret.pop(field, None)
 
         return ret
 
@@ -263,13 +277,32 @@ class UserManager(Component):
         if user is None:
             return None
 
-        ret = self.cleaned_user_dic(user)
+        return self.__set_display_avatar(self.cleaned_user_dic(user))
 
-        # set avatar_url to display
-        if "profile" in ret and "avatar_url" in ret["profile"]:
-            ret["avatar_url"] = ret["profile"]["avatar_url"]
+    def user_display_info_batch(self, user_ids):
+        """Return display info of many users in one query
 
-        return ret
+        Only the fields returned by user_display_info are loaded. Use it in listings rather than calling
+        user_display_info per item which dereferences the users one by one.
+
+        :type user_ids: list|set
+        :param user_ids: ids of users, either string or ObjectId. None is ignored
+
+        :rtype: dict
+        :return display info of users keyed by the string of user id. Users not found are absent
+        """
+        user_ids = set(str(user_id) for user_id in user_ids if user_id)
+        if not user_ids:
+            return {}
+
+        infos = {}
+        for user in User.objects(id__in=list(user_ids)).exclude(*SENSITIVE_USER_FIELDS).as_pymongo():
+            ret = self.util.make_serializable(user)
+            ret["id"] = ret.pop("_id")
+            ret.pop("_cls", None)
+            infos[ret["id"]] = self.__set_display_avatar(ret)
+
+        return infos
 
     def get_talents(self):
         # todo real talents list
@@ -278,12 +311,12 @@ class UserManager(Component):
         self.log.debug("get talents {}".format(users))
         return [self.user_display_info(u) for u in users]
 
-    @staticmethod
-    def update_user_avatar_url(user, url):
+    def update_user_avatar_url(self, user, url):
         if not user.profile:
             user.profile = UserProfile()
         user.profile.avatar_url = url
         user.save()
+        self.invalidate_user_session(user.id)
         return True
 
     def upload_files(self, user_id, file_type):
@@ -320,9 +353,20 @@ class UserManager(Component):
 
     # ----------------------------private methods-------------------------------------
 
+    @staticmethod
+    def __set_display_avatar(ret):
+        # set avatar_url to display
+        if "profile" in ret and "avatar_url" in ret["profile"]:
+            ret["avatar_url"] = ret["profile"]["avatar_url"]
+
+        return ret
+
     def __validate_token(self, token):
         """Validate token to make sure it exists and not expired
 
+        Both the token and the user it belongs to are cached, so that a warm cache validates the token without
+        querying the DB. The expiry of token is checked on every request anyway.
+
         :type token: str|unicode
         :param token: token strin
 
@@ -331,17 +375,45 @@ class UserManager(Component):
         """
         if "authenticated" in g and g.authenticated:
             return g.user
-        else:
-            # todo eliminate the warning related to 'objects'
-            t = UserToken.objects(token=token).first()
-            if t and t.expire_date >= self.util.get_now():
-                g.authenticated = True
-                g.user = t.user
-                # save token to g, to determine which one to remove, when logout
-                g.token = t
-                return t.user
 
-        return None
+        def load_token():
+            t = UserToken.objects(token=token).no_dereference().first()
+            if t is None:
+                return None
+            return {"user_id": t.user.id, "expire_date": t.expire_date}
+
+        user_token = self.cache.get_cache(key=token, createfunc=load_token, namespace=CACHE_NAMESPACE.USER_TOKEN)
+        if user_token is None or user_token["expire_date"] < self.util.get_now():
+            return None
+
+        session = self.__get_user_session(user_token["user_id"])
+        if session is None:
+            return None
+
+        g.authenticated = True
+        g.user = User._from_son(session["user"])
+        # save token to g, to determine which one to remove, when logout
+        g.token = token
+        return g.user
+
+    def __get_user_session(self, user_id):
+        """Get the cached snapshot of user
+
+        The sensitive fields are not loaded, so the password hash and the oauth access token are never written to the
+        cache. Read them from the database in the few places that need them, e.g. login.
+
+        :rtype: dict
+        :return dict of the user son or None if user not found
+        """
+
+        def load_session():
+            user = User.objects(id=user_id).exclude(*SENSITIVE_USER_FIELDS).first()
+            if user is None:
+                return None
+            return {"user": user.to_mongo().to_dict()}
+
+        return self.cache.get_cache(key=str(user_id), createfunc=load_session,
+                                    namespace=CACHE_NAMESPACE.USER_SESSION)
 
     def __generate_api_token(self, admin):
         token_issue_date = self.util.get_now()
@@ -352,6 +424,8 @@ class UserManager(Component):
                                expire_date=token_expire_date,
                                issue_date=token_issue_date)
         user_token.save()
+        # login updates the user, sessions of the other tokens should see it
+        self.invalidate_user_session(admin.id)
         return user_token
 
     def __db_login(self, context):
@@ -11,13 +11,14 @@ from flask import g
 
 from hackathon.hmongo.models import User, UserProfile
 from hackathon.hackathon_response import internal_server_error, not_found
-from hackathon import Component
+from hackathon import Component, RequiredFeature
 
 __all__ = ["UserProfileManager"]
 
 
 class UserProfileManager(Component):
     """Component to manager user profile"""
+    user_manager = RequiredFeature("user_manager")
 
     def get_user_profile(self, user_id):
         user = User.objects.get(id=user_id)
@@ -29,6 +30,7 @@ class UserProfileManager(Component):
         # if user do not create profile, create default
         user.profile = UserProfile()
         user.save()
+        self.user_manager.invalidate_user_session(user.id)
         return user.dic()
 
     def create_user_profile(self, args):
@@ -38,6 +40,7 @@ class UserProfileManager(Component):
             user = User.objects.get(id=u_id)
             user.profile = UserProfile(**args)
             user.save()
+            self.user_manager.invalidate_user_session(user.id)
             return user.dic()
         except Exception as e:
             self.log.debug(e)
@@ -50,6 +53,7 @@ class UserProfileManager(Component):
             user = User.objects.get(id=u_id)
             user.profile = UserProfile(**args)
             user.save()
+            self.user_manager.invalidate_user_session(user.id)
             return user.dic()
         except Exception as e:
             self.log.debug(e)
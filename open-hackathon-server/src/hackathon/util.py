@@ -249,8 +249,8 @@ class Utility(object):
     def paginate(self, pagination, func=None):
         """Convert pagination results from DB to serializable dict
 
-        :type pagination: Pagination
-        :param pagination: object of Pagination defined in flask-SqlAlchemy
+        :type pagination: Pagination|CursorPagination
+        :param pagination: object of Pagination or CursorPagination defined in hmongo.pagination
 
         :type func: function
         :param func: a function that to be applied to each item
@@ -259,6 +259,16 @@ class Utility(object):
         if func:
             items = [func(item) for item in pagination.items]
 
+        if hasattr(pagination, "cursor"):
+            # keyset pagination, pass the cursor back to get the next page
+            return {
+                "items": items,
+                "per_page": pagination.per_page,
+                "cursor": pagination.cursor,
+                "has_next": pagination.has_next,
+                "total": pagination.total
+            }
+
         return {
             "items": items,
             "page": pagination.page,
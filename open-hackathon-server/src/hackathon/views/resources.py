@@ -251,7 +251,12 @@ class UserHackathonLikeResource(HackathonResource):
 
 class UserExperimentResource(HackathonResource, Component):
     def get(self):
-        return expr_manager.get_expr_status_and_confirm_starting(self.context().id)
+        # pass the times polled to back off while experiment is starting, e.g. ?id=xxx&attempt=3
+        parser = reqparse.RequestParser()
+        parser.add_argument('id', type=str, location='args', required=True)
+        parser.add_argument('attempt', type=int, location='args', default=0)
+        args = parser.parse_args()
+        return expr_manager.get_expr_status_and_confirm_starting(args["id"], args["attempt"])
 
     @token_required
     def post(self):
@@ -506,7 +511,14 @@ class AdminHackathonListResource(HackathonResource):
 class AdminRegisterListResource(HackathonResource):
     @admin_privilege_required
     def get(self):
-        return register_manager.get_hackathon_registration_list(g.hackathon.id)
+        parse = reqparse.RequestParser()
+        parse.add_argument("cursor", type=str, location="args", required=False)
+        parse.add_argument("per_page", type=int, location="args", default=100)
+
+        args = parse.parse_args()
+        if args["cursor"] is None:
+            return register_manager.get_hackathon_registration_list(g.hackathon.id)
+        return register_manager.get_hackathon_registration_page(g.hackathon.id, args["cursor"], args["per_page"])
 
 
 class AdminRegisterResource(HackathonResource):
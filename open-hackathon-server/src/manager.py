@@ -4,7 +4,8 @@ This file is covered by the LICENSING file in the root of this project.
 """
 from flask_script import Manager, Server, Shell
 
-from hackathon import app
+from hackathon import app, RequiredFeature
+from hackathon.hmongo import database
 from hackathon.hmongo.database import drop_db, setup_db, add_super_user
 
 banner = r"""
@@ -43,10 +44,35 @@ def init_db():
     setup_db()
 
 
+@manager.command
+def ensure_indexes():
+    """Create indexes declared in hackathon/hmongo/models.py"""
+    for name in database.ensure_indexes():
+        print("indexes ensured: %s" % name)
+
+
 @manager.command
 def create_super_user(username, password):
     add_super_user(username, username, password)
 
 
+@manager.command
+def teardown_hackathon_exprs(hackathon_name):
+    """Tear down the active k8s experiments of an ended hackathon"""
+    hackathon = RequiredFeature("hackathon_manager").get_hackathon_by_name(hackathon_name)
+    if not hackathon:
+        print("hackathon %s not found" % hackathon_name)
+        return
+    count = RequiredFeature("expr_manager").recycle_ended_hackathon_exprs(hackathon)
+    print("%d experiments of hackathon %s torn down" % (count, hackathon_name))
+
+
+@manager.command
+def sync_register_count():
+    """Rebuild the register count of hackathons which is used to order hackathons by popularity"""
+    hackathon_manager = RequiredFeature("hackathon_manager")
+    print("register count synced for %d hackathons" % hackathon_manager.sync_register_count())
+
+
 if __name__ == "__main__":
     manager.run()
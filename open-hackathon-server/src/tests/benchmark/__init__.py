@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+
+Micro benchmarks. They are NOT collected by pytest(file names don't start with 'test_'), run them manually, e.g.:
+
+    cd open-hackathon-server/src
+    python -m tests.benchmark.bench_factory
+
+A MongoDB configured in hackathon/config.py is required just like the api tests.
+"""
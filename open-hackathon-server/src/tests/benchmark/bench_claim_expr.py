@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+
+Latency of 500 parallel claims of experiments at hackathon kickoff, and check that no experiment is handed to two
+users. Part of the claims are served by the warm pool, the others are queued.
+
+WARNING: the configured database will be dropped.
+"""
+
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from hackathon import RequiredFeature
+from hackathon.constants import EStatus, VE_PROVIDER, HACKATHON_CONFIG
+from hackathon.hmongo.database import drop_db, setup_db
+from hackathon.hmongo.models import User, Hackathon, Template, Experiment
+
+CLAIMS = 500
+POOL = 300
+
+expr_manager = RequiredFeature("expr_manager")
+
+
+def seed():
+    drop_db()
+    setup_db()
+
+    template = Template(name="bench-template", provider=VE_PROVIDER.K8S, virtual_environment_count=1)
+    template.save()
+    hackathon = Hackathon(name="bench-hackathon", display_name="bench hackathon", templates=[template],
+                          config={HACKATHON_CONFIG.PRE_ALLOCATE_ENABLED: True})
+    hackathon.save()
+
+    pooled = [Experiment(status=EStatus.RUNNING, hackathon=hackathon, template=template, virtual_environments=[])
+              for i in range(POOL)]
+    Experiment.objects.insert(pooled, load_bulk=False)
+    users = [User(name="user%d" % i, nickname="user%d" % i) for i in range(CLAIMS)]
+    User.objects.insert(users, load_bulk=False)
+    return hackathon, template, list(User.objects())
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    print("seeding %d pre-allocated experiments and %d users ..." % (POOL, CLAIMS))
+    hackathon, template, users = seed()
+
+    # queued experiments are not started, only the claims are measured
+    scheduler = RequiredFeature("scheduler").get_scheduler()
+    if scheduler:
+        scheduler.shutdown(wait=False)
+
+    barrier = threading.Barrier(CLAIMS)
+
+    def claim(user):
+        barrier.wait()
+        start = time.time()
+        expr = expr_manager.claim_expr(user, hackathon, template)
+        return expr, (time.time() - start) * 1000
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=CLAIMS) as executor:
+        results = list(executor.map(claim, users))
+    elapsed = time.time() - start
+
+    latencies = [latency for _, latency in results]
+    expr_ids = [expr.id for expr, _ in results]
+    print("%d claims in %.2f s, latency p50 %.1f ms, p99 %.1f ms, max %.1f ms" % (
+        CLAIMS, elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99), max(latencies)))
+
+    claimed = Experiment.objects(hackathon=hackathon, status=EStatus.RUNNING, user__ne=None).count()
+    queued = Experiment.objects(hackathon=hackathon, status=EStatus.INIT).count()
+    print("claimed from pool %d, queued %d, distinct experiments %d" % (claimed, queued, len(set(expr_ids))))
+    assert len(set(expr_ids)) == CLAIMS, "experiment handed to more than one user"
+    assert claimed == POOL and queued == CLAIMS - POOL
+
+    drop_db()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        CLAIMS, POOL = [int(a) for a in sys.argv[1:3]]
+    main()
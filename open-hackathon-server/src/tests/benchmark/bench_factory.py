@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+
+Count the component constructions(provider calls) per API call.
+
+Compares the legacy behavior(every factory lookup builds a new object and module level RequiredFeature re-requests
+the feature on every attribute access) with the current singleton/scoped lifetimes.
+"""
+
+import time
+from collections import Counter
+
+from hackathon import app
+from hackathon.hackathon_factory import factory, RequiredFeature, LIFETIME
+
+CALLS = 100
+URLS = ["/health", "/api/hackathon/list", "/api/currenttime", "/api/hackathon/notice/list", "/api/template/list"]
+
+
+def legacy_getattr(self, name):
+    self.__dict__["result"] = self.request()
+    if name == "result":
+        return self.__dict__["result"]
+    return getattr(self.__dict__["result"], name)
+
+
+def instrument(counter):
+    for feature, provider in list(factory.providers.items()):
+        def counted(build=provider.build, feature=feature):
+            counter[feature] += 1
+            return build()
+
+        provider.build = counted
+
+
+def run(title):
+    client = app.test_client()
+    counter = Counter()
+    instrument(counter)
+
+    # warm up so that lazily created singletons are not counted
+    for url in URLS:
+        client.get(url)
+    counter.clear()
+
+    start = time.time()
+    for i in range(CALLS):
+        for url in URLS:
+            client.get(url)
+    elapsed = time.time() - start
+
+    calls = CALLS * len(URLS)
+    print("%s: %d provider calls in %d API calls, %.2f per call, %.2f ms per call" % (
+        title, sum(counter.values()), calls, float(sum(counter.values())) / calls, elapsed * 1000 / calls))
+    for feature, count in counter.most_common(10):
+        print("    %-30s %d" % (feature, count))
+
+
+def main():
+    original_getattr = RequiredFeature.__getattr__
+    original_lifetimes = dict((f, p.lifetime) for f, p in factory.providers.items())
+
+    # legacy: transient providers and re-requesting on every attribute access
+    RequiredFeature.__getattr__ = legacy_getattr
+    for feature, provider in factory.providers.items():
+        provider.lifetime = LIFETIME.TRANSIENT
+    run("before")
+
+    RequiredFeature.__getattr__ = original_getattr
+    for feature, provider in factory.providers.items():
+        provider.lifetime = original_lifetimes[feature]
+    run("after")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+
+Query count and latency of /api/hackathon/list over 1k hackathons and 100k registrations.
+
+WARNING: the configured database will be dropped.
+"""
+
+import sys
+import time
+import uuid
+import random
+from datetime import timedelta
+
+from pymongo import monitoring
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Count the commands sent to MongoDB"""
+
+    IGNORED = {"isMaster", "ismaster", "hello", "endSessions", "ping", "buildinfo", "buildInfo"}
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name not in self.IGNORED:
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# listener must be registered before the MongoClient is created while importing hackathon
+counter = CommandCounter()
+monitoring.register(counter)
+
+from hackathon import app, RequiredFeature
+from hackathon.util import get_now
+from hackathon.constants import HACK_USER_TYPE, HACK_USER_STATUS, HACKATHON_STAT, HACK_STATUS
+from hackathon.hmongo.database import drop_db, setup_db
+from hackathon.hmongo.models import User, UserToken, Hackathon, HackathonStat, UserHackathon, Team, TeamMember
+
+HACKATHONS = 1000
+REGISTRATIONS = 100000
+USERS = 10000
+ROUNDS = 20
+BATCH = 10000
+
+
+def insert(document_class, docs):
+    for i in range(0, len(docs), BATCH):
+        document_class.objects.insert(docs[i:i + BATCH], load_bulk=False)
+
+
+def seed():
+    drop_db()
+    setup_db()
+
+    now = get_now()
+    users = [User(name="user%d" % i, nickname="user%d" % i) for i in range(USERS)]
+    insert(User, users)
+    user_ids = [u.id for u in User.objects.only("id")]
+
+    hackathons = [Hackathon(name="hackathon%d" % i, display_name="hackathon %d" % i, status=HACK_STATUS.ONLINE,
+                            event_start_time=now + timedelta(days=i)) for i in range(HACKATHONS)]
+    insert(Hackathon, hackathons)
+    hackathon_ids = [h.id for h in Hackathon.objects.only("id")]
+
+    registrations = []
+    register_count = dict((hid, 0) for hid in hackathon_ids)
+    for i in range(REGISTRATIONS):
+        hid = random.choice(hackathon_ids)
+        register_count[hid] += 1
+        registrations.append(UserHackathon(user=user_ids[i % USERS], hackathon=hid, role=HACK_USER_TYPE.COMPETITOR,
+                                           status=HACK_USER_STATUS.AUTO_PASSED))
+    insert(UserHackathon, registrations)
+
+    stats = [HackathonStat(hackathon=hid, type=HACKATHON_STAT.REGISTER, count=c) for hid, c in register_count.items()]
+    stats += [HackathonStat(hackathon=hid, type=HACKATHON_STAT.LIKE, count=1) for hid in hackathon_ids]
+    insert(HackathonStat, stats)
+    RequiredFeature("hackathon_manager").sync_register_count()
+
+    # the login user is registered and joined a team in every hackathon
+    user_id = user_ids[0]
+    teams = [Team(name="team%d" % i, hackathon=hid, leader=user_id, members=[TeamMember(user=user_id)])
+             for i, hid in enumerate(hackathon_ids)]
+    insert(Team, teams)
+
+    token = UserToken(token=str(uuid.uuid1()), user=user_id, issue_date=now, expire_date=now + timedelta(days=1))
+    token.save()
+    return token.token
+
+
+def measure(client, url, headers):
+    client.get(url, headers=headers)  # warm up
+    counter.count = 0
+    start = time.time()
+    for i in range(ROUNDS):
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 200
+    elapsed = time.time() - start
+    return float(counter.count) / ROUNDS, elapsed * 1000 / ROUNDS
+
+
+def main():
+    print("seeding %d hackathons and %d registrations ..." % (HACKATHONS, REGISTRATIONS))
+    token = seed()
+
+    client = app.test_client()
+    for order_by in ["create_time", "event_start_time", "registered_users_num"]:
+        url = "/api/hackathon/list?order_by=%s&per_page=20" % order_by
+        for title, headers in [("anonymous", {}), ("login", {"Authorization": token})]:
+            queries, latency = measure(client, url, headers)
+            print("%-22s %-10s %6.1f queries %8.2f ms" % (order_by, title, queries, latency))
+
+    drop_db()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        HACKATHONS, REGISTRATIONS, USERS = [int(a) for a in sys.argv[1:4]]
+    main()
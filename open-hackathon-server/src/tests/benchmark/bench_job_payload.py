@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+This file is covered by the LICENSING file in the root of this project.
+
+Size and (de)serialization cost of 10k queued jobs in the MongoDB job store.
+
+Compares the legacy job arguments(the whole Context including TemplateContent pickled into every job) with the
+compact versioned format that carries ids only.
+
+WARNING: the "bench_jobs" collection of the configured scheduler database will be dropped.
+"""
+
+import sys
+import time
+from datetime import timedelta
+
+from apscheduler.jobstores.mongodb import MongoDBJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from bson import ObjectId
+
+from hackathon import Context
+from hackathon.constants import VE_PROVIDER
+from hackathon.hackathon_scheduler import scheduler_executor, pack_job_context
+from hackathon.template.template_constants import TEMPLATE, K8S_UNIT
+from hackathon.template.template_content import TemplateContent
+from hackathon.util import safe_get_config, get_now
+
+JOBS = 10000
+
+# a deployment and a service, about the size of the templates of a real hackathon
+YAML = """
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: {{ expr_name }}
+  labels:
+    app: {{ expr_name }}
+spec:
+  replicas: 1
+  selector:
+    matchLabels:
+      app: {{ expr_name }}
+  template:
+    metadata:
+      labels:
+        app: {{ expr_name }}
+    spec:
+      containers:
+      - name: desktop
+        image: openhackathon/ubuntu-vnc:latest
+        ports:
+        - containerPort: 5901
+        resources:
+          limits:
+            cpu: "1"
+            memory: 2Gi
+---
+apiVersion: v1
+kind: Service
+metadata:
+  name: {{ expr_name }}-vnc
+spec:
+  type: NodePort
+  selector:
+    app: {{ expr_name }}
+  ports:
+  - port: 5901
+    targetPort: 5901
+""" * 4
+
+
+def legacy_context(template_content):
+    return Context(template_content=template_content,
+                   template_name=template_content.name,
+                   hackathon_id=ObjectId(),
+                   experiment_id=ObjectId(),
+                   user_id=ObjectId(),
+                   pre_alloc_enabled=False)
+
+
+def compact_context():
+    return pack_job_context(Context(experiment_id=str(ObjectId())))
+
+
+def run(title, make_args):
+    scheduler = BackgroundScheduler()
+    store = MongoDBJobStore(database=safe_get_config("scheduler.database", "apscheduler"), collection="bench_jobs",
+                            host=safe_get_config("scheduler.host", "localhost"),
+                            port=safe_get_config("scheduler.port", 27017))
+    store.collection.drop()
+    scheduler.add_jobstore(store, alias="bench")
+    scheduler.start()
+
+    # the jobs are due tomorrow, nothing runs during the benchmark
+    run_date = get_now() + timedelta(days=1)
+    start = time.time()
+    for i in range(JOBS):
+        scheduler.add_job(scheduler_executor, "date", run_date=run_date, jobstore="bench", id="bench_%d" % i,
+                          args=["expr_manager", "start_queued_expr", make_args()])
+    add_time = time.time() - start
+
+    size = sum(len(doc["job_state"]) for doc in store.collection.find({}, {"job_state": True}))
+    start = time.time()
+    due = store.get_due_jobs(run_date + timedelta(seconds=1))
+    load_time = time.time() - start
+    assert len(due) == JOBS
+
+    print("%-8s %6.1f MB in job store, %6.1f KB per job, add %.2f s, load due jobs %.2f s" % (
+        title, size / 1024.0 / 1024, size / 1024.0 / JOBS, add_time, load_time))
+
+    scheduler.shutdown(wait=False)
+    store.collection.drop()
+
+
+def main():
+    template_content = TemplateContent("bench-template", "bench template",
+                                       {TEMPLATE.VIRTUAL_ENVIRONMENT_PROVIDER: VE_PROVIDER.K8S,
+                                        K8S_UNIT.YAML_TEMPLATE: YAML})
+
+    print("queuing %d jobs ..." % JOBS)
+    run("legacy", lambda: legacy_context(template_content))
+    run("compact", compact_context)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        JOBS = int(sys.argv[1])
+    main()
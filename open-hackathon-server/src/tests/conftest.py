@@ -1,9 +1,15 @@
+import threading
+import time
+
 import pytest
 
-from hackathon.constants import VE_PROVIDER, TEMPLATE_STATUS
-from hackathon.hmongo.models import User, Template, UserHackathon
+from hackathon import RequiredFeature, Context
+from hackathon.constants import VE_PROVIDER, TEMPLATE_STATUS, DockerHostServerStatus, EStatus
+from hackathon.hmongo.models import User, Template, UserHackathon, Hackathon, DockerHostServer, Experiment
 from hackathon.hmongo.database import add_super_user
 
+expr_manager = RequiredFeature("expr_manager")
+
 
 @pytest.fixture(scope="class")
 def user1():
@@ -58,4 +64,81 @@ def default_template(user1):
         creator=user1,
     )
     tmpl.save()
-    return tmpl
\ No newline at end of file
+    return tmpl
+
+
+@pytest.fixture()
+def hackathon():
+    # return new hackathon, the docker hosts added to it are removed with it
+    h = Hackathon(name="test-hackathon", display_name="test hackathon")
+    h.save()
+    yield h
+    DockerHostServer.objects(hackathon=h).delete()
+    h.delete()
+
+
+@pytest.fixture()
+def add_host(hackathon):
+    # return function to add ready docker hosts to the hackathon
+    def add(name, port=4243, **kwargs):
+        kwargs.setdefault("state", DockerHostServerStatus.DOCKER_READY)
+        kwargs.setdefault("container_max_count", 10)
+        host = DockerHostServer(vm_name=name, public_dns="127.0.0.1", public_docker_api_port=port,
+                                hackathon=hackathon, **kwargs)
+        host.save()
+        return host
+
+    return add
+
+
+@pytest.fixture()
+def wait_until():
+    # return function to poll condition until it holds or timeout(seconds) elapses
+    def wait(condition, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if condition():
+                return True
+            time.sleep(0.05)
+        return False
+
+    return wait
+
+
+class FakeStarter(object):
+    """Start and stop experiments without any cloud resource"""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.threads = set()
+        self.stopped = []
+
+    def start_expr(self, context):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        if context.get("experiment_id"):
+            expr = Experiment.objects.get(id=context.experiment_id)
+            expr.status = EStatus.STARTING
+        else:
+            expr = Experiment(status=EStatus.STARTING, template=context.template, hackathon=context.hackathon)
+        expr.save()
+        with self.lock:
+            self.running -= 1
+        return Context(experiment=expr)
+
+    def stop_expr(self, context):
+        self.stopped.append(context.experiment_id)
+
+
+@pytest.fixture()
+def starter(monkeypatch):
+    # return the starter of all experiments
+    s = FakeStarter()
+    monkeypatch.setattr(expr_manager.result, "get_starter", lambda hackathon, template: s)
+    return s
@@ -0,0 +1,128 @@
+"""A fake docker remote api server which keeps containers in memory"""
+
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeDockerServer(object):
+    """Run the server in a thread: `with FakeDockerServer() as server: ... server.port ...`"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.containers = {}  # id -> {"Id", "Names", "State": {"Running", "Restarting"}}
+        self.requests = defaultdict(int)  # (method, path without query) -> count
+        self.connections = 0
+        self.failures = defaultdict(int)  # path -> count of 503 responses to return
+        self.delay = 0
+        self.images = ["ubuntu:latest"]  # repo tags of pulled images
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def set_running(self, container_id, running):
+        with self.lock:
+            self.containers[container_id]["State"]["Running"] = running
+
+    def add_container(self, container_id, running=True):
+        with self.lock:
+            self.containers[container_id] = {"Id": container_id, "Names": ["/" + container_id],
+                                             "State": {"Running": running, "Restarting": False}}
+
+    def count(self, method, path):
+        return self.requests[(method, path)]
+
+    def __handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                BaseHTTPRequestHandler.setup(self)
+                with server.lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                self.__dispatch("GET")
+
+            def do_POST(self):
+                self.__dispatch("POST")
+
+            def do_DELETE(self):
+                self.__dispatch("DELETE")
+
+            def __send(self, code, data, content_type="application/json"):
+                body = data if isinstance(data, bytes) else json.dumps(data).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def __dispatch(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else {}
+                url = urlparse(self.path)
+                query = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+                with server.lock:
+                    server.requests[(method, url.path)] += 1
+                    failed = server.failures[url.path] > 0
+                    if failed:
+                        server.failures[url.path] -= 1
+                if server.delay:
+                    time.sleep(server.delay)
+                if failed:
+                    return self.__send(503, {"message": "unavailable"})
+
+                with server.lock:
+                    if url.path == "/_ping":
+                        return self.__send(200, b"OK", "text/plain")
+                    if url.path == "/containers/json":
+                        containers = [dict(c, State="running" if c["State"]["Running"] else "exited",
+                                           Status="Up 1 minute" if c["State"]["Running"] else "Exited (0)")
+                                      for c in server.containers.values()
+                                      if c["State"]["Running"] or query.get("all") == "1"]
+                        return self.__send(200, containers)
+                    if url.path == "/images/json":
+                        return self.__send(200, [{"RepoTags": [image]} for image in server.images])
+                    if url.path == "/images/create":
+                        server.images.append("%s:%s" % (query["fromImage"], query["tag"]))
+                        return self.__send(200, {"status": "Downloaded newer image"})
+                    if url.path == "/containers/create":
+                        container_id = query["name"]
+                        server.containers[container_id] = {"Id": container_id, "Names": ["/" + container_id],
+                                                           "State": {"Running": False, "Restarting": False},
+                                                           "Config": body}
+                        return self.__send(201, {"Id": container_id})
+
+                    m = re.match(r"^/containers/([^/]+)(/json|/start)?$", url.path)
+                    if not m or m.group(1) not in server.containers:
+                        return self.__send(404, {"message": "No such container"})
+                    container = server.containers[m.group(1)]
+                    if method == "GET" and m.group(2) == "/json":
+                        return self.__send(200, container)
+                    if method == "POST" and m.group(2) == "/start":
+                        container["State"]["Running"] = True
+                        return self.__send(204, b"")
+                    if method == "DELETE":
+                        server.containers.pop(m.group(1))
+                        return self.__send(204, b"")
+                return self.__send(405, {"message": "method not allowed"})
+
+        return Handler
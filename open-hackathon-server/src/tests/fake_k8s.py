@@ -0,0 +1,236 @@
+"""A fake k8s api server which keeps resources in memory, supports list, watch, read, create, patch and delete"""
+
+import copy
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# plural name of resource -> (api prefix, kind)
+RESOURCES = {
+    "deployments": ("/apis/apps/v1", "Deployment"),
+    "statefulsets": ("/apis/apps/v1", "StatefulSet"),
+    "services": ("/api/v1", "Service"),
+    "persistentvolumeclaims": ("/api/v1", "PersistentVolumeClaim"),
+    "pods": ("/api/v1", "Pod"),
+}
+
+PATH_PATTERN = re.compile(r"^(/apis/apps/v1|/api/v1)/namespaces/([^/]+)/([^/]+)(?:/([^/]+))?$")
+
+
+def match_labels(obj, selector):
+    labels = obj["metadata"].get("labels") or {}
+    for term in [t for t in (selector or "").split(",") if t]:
+        if "=" in term:
+            k, v = term.split("=", 1)
+            if labels.get(k) != v:
+                return False
+        elif term not in labels:
+            return False
+    return True
+
+
+def merge(target, patch):
+    for k, v in patch.items():
+        if isinstance(v, dict) and isinstance(target.get(k), dict):
+            merge(target[k], v)
+        else:
+            target[k] = v
+
+
+class FakeK8sApiServer(object):
+    """Run the server in a thread: `with FakeK8sApiServer() as server: ... server.url ...`"""
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.resources = defaultdict(dict)  # (namespace, plural) -> {name: obj}
+        self.events = []  # (resource_version, namespace, plural, type, obj)
+        self.resource_version = 0
+        self.requests = defaultdict(int)  # (method, plural, is_collection or watch) -> count
+        self.create_delay = 0
+        self.unsupported_collection_delete = set()  # plurals that can't be deleted by collection, like k8s < 1.19
+        self.error_code = None  # respond every request with this status code if set, e.g. 500
+        self.stopped = False
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler())
+        self.httpd.daemon_threads = True
+        self.url = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        with self.lock:
+            self.stopped = True
+            self.lock.notify_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, method, plural, kind="item"):
+        return self.requests[(method, plural, kind)]
+
+    def names(self, plural, namespace="default"):
+        with self.lock:
+            return sorted(self.resources[(namespace, plural)].keys())
+
+    def set_status(self, plural, name, status, namespace="default"):
+        """Update status of resource, emits a MODIFIED event"""
+        with self.lock:
+            obj = self.resources[(namespace, plural)][name]
+            obj["status"] = status
+            self.emit(namespace, plural, "MODIFIED", obj)
+
+    def set_deployment_available(self, name, namespace="default"):
+        self.set_status("deployments", name, {"replicas": 1, "availableReplicas": 1}, namespace)
+
+    def emit(self, namespace, plural, event_type, obj):
+        self.resource_version += 1
+        obj["metadata"]["resourceVersion"] = str(self.resource_version)
+        self.events.append((self.resource_version, namespace, plural, event_type, copy.deepcopy(obj)))
+        self.lock.notify_all()
+
+    def __handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.__dispatch("GET")
+
+            def do_POST(self):
+                self.__dispatch("POST")
+
+            def do_PATCH(self):
+                self.__dispatch("PATCH")
+
+            def do_PUT(self):
+                self.__dispatch("PATCH")
+
+            def do_DELETE(self):
+                # consume the delete options, otherwise they are taken as the next request of the connection
+                self.__body()
+                self.__dispatch("DELETE")
+
+            def __body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length)) if length else {}
+
+            def __send(self, code, data):
+                body = json.dumps(data).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def __status(self, code, reason):
+                self.__send(code, {"kind": "Status", "apiVersion": "v1", "status": "Failure", "reason": reason,
+                                   "code": code, "message": reason})
+
+            def __dispatch(self, method):
+                url = urlparse(self.path)
+                query = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+                m = PATH_PATTERN.match(url.path)
+                if not m or m.group(3) not in RESOURCES:
+                    return self.__status(404, "NotFound")
+
+                namespace, plural, name = m.group(2), m.group(3), m.group(4)
+                watching = query.get("watch") in ("true", "True", "1")
+                kind = "watch" if watching else ("item" if name else "collection")
+                with server.lock:
+                    server.requests[(method, plural, kind)] += 1
+                if server.error_code:
+                    return self.__status(server.error_code, "InternalError")
+
+                if watching:
+                    return self.__watch(namespace, plural, query)
+                if method == "POST" and server.create_delay:
+                    time.sleep(server.create_delay)
+
+                with server.lock:
+                    items = server.resources[(namespace, plural)]
+                    if method == "GET" and not name:
+                        selected = [o for o in items.values() if match_labels(o, query.get("labelSelector"))]
+                        return self.__send(200, {
+                            "kind": RESOURCES[plural][1] + "List", "apiVersion": "v1",
+                            "metadata": {"resourceVersion": str(server.resource_version)},
+                            "items": selected})
+                    if method == "GET":
+                        if name not in items:
+                            return self.__status(404, "NotFound")
+                        return self.__send(200, items[name])
+                    if method == "POST":
+                        obj = self.__body()
+                        obj_name = obj["metadata"]["name"]
+                        if obj_name in items:
+                            return self.__status(409, "AlreadyExists")
+                        obj.setdefault("metadata", {})["namespace"] = namespace
+                        if plural == "services":
+                            for port in obj.get("spec", {}).get("ports", []):
+                                port.setdefault("nodePort", 30000 + len(items))
+                        items[obj_name] = obj
+                        server.emit(namespace, plural, "ADDED", obj)
+                        return self.__send(201, obj)
+                    if method == "PATCH":
+                        if name not in items:
+                            return self.__status(404, "NotFound")
+                        merge(items[name], self.__body())
+                        server.emit(namespace, plural, "MODIFIED", items[name])
+                        return self.__send(200, items[name])
+                    if method == "DELETE" and name:
+                        if name not in items:
+                            return self.__status(404, "NotFound")
+                        obj = items.pop(name)
+                        server.emit(namespace, plural, "DELETED", obj)
+                        if plural == "services":
+                            # deleting service returns the deleted one rather than a status
+                            return self.__send(200, obj)
+                        return self.__send(200, {"kind": "Status", "apiVersion": "v1", "status": "Success"})
+                    if method == "DELETE" and plural in server.unsupported_collection_delete:
+                        return self.__status(405, "MethodNotAllowed")
+                    if method == "DELETE":
+                        deleted = [o for o in items.values() if match_labels(o, query.get("labelSelector"))]
+                        for obj in deleted:
+                            items.pop(obj["metadata"]["name"])
+                            server.emit(namespace, plural, "DELETED", obj)
+                        return self.__send(200, {"kind": RESOURCES[plural][1] + "List", "apiVersion": "v1",
+                                                 "metadata": {}, "items": deleted})
+                return self.__status(405, "MethodNotAllowed")
+
+            def __watch(self, namespace, plural, query):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                since = int(query.get("resourceVersion") or 0)
+                deadline = time.time() + int(query.get("timeoutSeconds") or 30)
+                try:
+                    while True:
+                        with server.lock:
+                            events = [e for e in server.events if e[0] > since and e[1] == namespace and
+                                      e[2] == plural and match_labels(e[4], query.get("labelSelector"))]
+                            if not events:
+                                remaining = deadline - time.time()
+                                if remaining <= 0 or server.stopped:
+                                    break
+                                server.lock.wait(remaining)
+                                continue
+                        for rv, _, _, event_type, obj in events:
+                            since = rv
+                            line = (json.dumps({"type": event_type, "object": obj}) + "\n").encode()
+                            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return Handler
@@ -0,0 +1,193 @@
+import time
+import threading
+
+from hackathon.cache.memory_cache import MemoryCacheBackend
+
+
+class TestMemoryCacheBackend(object):
+    def test_get_and_remove(self):
+        backend = MemoryCacheBackend()
+        assert backend.get("ns", "k", lambda: 1, None) == 1
+        assert backend.get("ns", "k", lambda: 2, None) == 1
+        assert backend.get("other", "k", lambda: 3, None) == 3
+
+        backend.remove("ns", "k")
+        assert backend.get("ns", "k", lambda: 4, None) == 4
+
+        stats = backend.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 3
+
+    def test_clear_namespace(self):
+        backend = MemoryCacheBackend()
+        backend.get("ns", "k", lambda: 1, None)
+        backend.get("other", "k", lambda: 1, None)
+
+        backend.clear("ns")
+        assert backend.stats()["size"] == 1
+        backend.clear()
+        assert backend.stats()["size"] == 0
+
+    def test_lru_eviction(self):
+        backend = MemoryCacheBackend(max_size=2)
+        backend.get("ns", "a", lambda: "a", None)
+        backend.get("ns", "b", lambda: "b", None)
+        # touch "a" so that "b" becomes the least recently used
+        backend.get("ns", "a", lambda: "x", None)
+        backend.get("ns", "c", lambda: "c", None)
+
+        assert backend.get("ns", "a", lambda: "x", None) == "a"
+        assert backend.get("ns", "b", lambda: "x", None) == "x"
+        assert backend.stats()["evictions"] == 2
+
+    def test_expire(self):
+        backend = MemoryCacheBackend()
+        assert backend.get("ns", "k", lambda: 1, 0.05) == 1
+        time.sleep(0.1)
+        assert backend.get("ns", "k", lambda: 2, 0.05) == 2
+        assert backend.stats()["expirations"] == 1
+
+    def test_single_flight(self):
+        backend = MemoryCacheBackend()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def create():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(backend.get("ns", "k", create, None)))
+                   for i in range(10)]
+        threads[0].start()
+        started.wait(5)
+        for t in threads[1:]:
+            t.start()
+        time.sleep(0.1)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        assert len(calls) == 1
+        assert results == ["value"] * 10
+        assert backend.stats()["coalesced"] == 9
+
+    def test_copy_returned(self):
+        backend = MemoryCacheBackend()
+        created = {"roles": {"a": 1}}
+        value = backend.get("ns", "k", lambda: created, None)
+        value["roles"]["b"] = 2
+        created["roles"]["c"] = 3
+
+        # neither the creator nor a caller changes the cached value
+        cached = backend.get("ns", "k", lambda: None, None)
+        assert cached == {"roles": {"a": 1}}
+        cached["roles"].clear()
+        assert backend.get("ns", "k", lambda: None, None) == {"roles": {"a": 1}}
+
+    def test_error_not_cached(self):
+        backend = MemoryCacheBackend()
+
+        def fail():
+            raise ValueError("fail")
+
+        try:
+            backend.get("ns", "k", fail, None)
+            assert False
+        except ValueError:
+            pass
+
+        assert backend.get("ns", "k", lambda: 1, None) == 1
+
+
+class TestRedisCacheBackend(object):
+    def setup_method(self, method):
+        import fakeredis
+        from hackathon.cache.redis_cache import RedisCacheBackend
+
+        # two backends on the same server act as two workers
+        server = fakeredis.FakeServer()
+        self.worker1 = RedisCacheBackend(client=fakeredis.FakeStrictRedis(server=server), local_expire=60)
+        self.worker2 = RedisCacheBackend(client=fakeredis.FakeStrictRedis(server=server), local_expire=60)
+
+    def teardown_method(self, method):
+        self.worker1.close()
+        self.worker2.close()
+
+    def test_shared_between_workers(self):
+        calls = []
+
+        def create():
+            calls.append(1)
+            return {"register": 1}
+
+        assert self.worker1.get("hackathon_stat", "h1", create, 60) == {"register": 1}
+        assert self.worker2.get("hackathon_stat", "h1", create, 60) == {"register": 1}
+        assert len(calls) == 1
+        assert self.worker2.stats()["remote_hits"] == 1
+
+    def test_invalidate_across_workers(self, wait_until):
+        self.worker1.get("hackathon_config", "h1", lambda: "old", 3600)
+        assert self.worker2.get("hackathon_config", "h1", lambda: "x", 3600) == "old"
+
+        self.worker1.remove("hackathon_config", "h1")
+        assert wait_until(lambda: self.worker2.stats()["invalidations_received"] == 1)
+        assert self.worker2.get("hackathon_config", "h1", lambda: "new", 3600) == "new"
+        assert self.worker1.get("hackathon_config", "h1", lambda: "x", 3600) == "new"
+
+    def test_clear_across_workers(self, wait_until):
+        self.worker1.get("ns", "a", lambda: 1, None)
+        self.worker1.get("other", "a", lambda: 1, None)
+        assert self.worker2.get("ns", "a", lambda: 2, None) == 1
+
+        self.worker1.clear("ns")
+        assert wait_until(lambda: self.worker2.stats()["invalidations_received"] == 1)
+        assert self.worker2.get("ns", "a", lambda: 2, None) == 2
+        assert self.worker2.get("other", "a", lambda: 2, None) == 1
+
+    def test_expire(self):
+        self.worker1.get("ns", "a", lambda: 1, 0.1)
+        time.sleep(0.2)
+        assert self.worker2.get("ns", "a", lambda: 2, 0.1) == 2
+
+    def test_lock_of_other_worker_kept(self):
+        lock_key = "ohp:cache:ns:a:lock"
+
+        def create():
+            # the lock expired and is taken by another worker meanwhile
+            self.worker1.client.set(lock_key, "other")
+            return 1
+
+        assert self.worker1.get("ns", "a", create, None) == 1
+        assert self.worker1.client.get(lock_key) == b"other"
+
+        # the lock of its own is released
+        assert self.worker2.get("ns", "b", lambda: 2, None) == 2
+        assert not self.worker2.client.exists("ohp:cache:ns:b:lock")
+
+    def test_created_once_if_write_fails(self, monkeypatch):
+        import redis
+
+        calls = []
+        set_key = self.worker1.client.set
+
+        def set_fail(name, *args, **kwargs):
+            if not name.endswith(":lock"):
+                raise redis.ConnectionError("write failed")
+            return set_key(name, *args, **kwargs)
+
+        monkeypatch.setattr(self.worker1.client, "set", set_fail)
+        assert self.worker1.get("ns", "a", lambda: calls.append(1) or 1, None) == 1
+        assert len(calls) == 1
+        assert self.worker1.stats()["remote_errors"] == 1
+
+    def test_waiter_timeout_not_written(self):
+        # held by a slow worker
+        self.worker1.client.set("ohp:cache:ns:a:lock", "slow", ex=60)
+        self.worker2.lock_timeout = 1
+
+        assert self.worker2.get("ns", "a", lambda: "waiter", None) == "waiter"
+        assert not self.worker2.client.exists("ohp:cache:ns:a")
@@ -0,0 +1,136 @@
+import pytest
+
+from hackathon import Context
+from hackathon.constants import DHS_QUERY_STATE, DOCKER_PLACEMENT_STRATEGY, VE_PROVIDER, VEStatus, EStatus
+from hackathon.docker.hosted_docker import HostedDockerFormation
+from hackathon.hack.host_server_manager import DockerHostManager
+from hackathon.hmongo.models import DockerHostServer, Experiment, VirtualEnvironment, DockerContainer
+from tests.fake_docker import FakeDockerServer
+
+
+@pytest.fixture()
+def manager():
+    return DockerHostManager()
+
+
+class TestDockerPlacement(object):
+    def test_least_loaded(self, hackathon, add_host, manager):
+        add_host("busy", container_count=3)
+        idle = add_host("idle", container_count=1)
+
+        context = manager.get_available_docker_host(hackathon, DOCKER_PLACEMENT_STRATEGY.LEAST_LOADED)
+        assert context.state == DHS_QUERY_STATE.SUCCESS
+        assert context.docker_host_server.id == idle.id
+        assert context.docker_host_server.container_count == 2
+
+    def test_bin_packing(self, hackathon, add_host, manager):
+        add_host("full", container_count=4, container_max_count=4)
+        busy = add_host("busy", container_count=3)
+        add_host("idle", container_count=1)
+
+        context = manager.get_available_docker_host(hackathon, DOCKER_PLACEMENT_STRATEGY.BIN_PACKING)
+        assert context.docker_host_server.id == busy.id
+        assert DockerHostServer.objects(id=busy.id).first().container_count == 4
+
+    def test_no_overcommit(self, hackathon, add_host, manager):
+        host = add_host("small", container_count=0, container_max_count=2)
+
+        states = [manager.get_available_docker_host(hackathon).state for i in range(3)]
+        assert states == [DHS_QUERY_STATE.SUCCESS, DHS_QUERY_STATE.SUCCESS, DHS_QUERY_STATE.FAILED]
+        # a host filled up by others since it was queried can't be reserved
+        assert manager.reserve_container_slot(host) is None
+        assert DockerHostServer.objects(id=host.id).first().container_count == 2
+
+    def test_skip_dead_host_by_health(self, hackathon, add_host, manager, monkeypatch):
+        with FakeDockerServer() as server:
+            docker = HostedDockerFormation()
+            dead = add_host("dead", container_count=0, port=1)
+            alive = add_host("alive", container_count=1, port=server.port)
+            docker.probe_hosts([dead, alive])
+
+            monkeypatch.setattr(DockerHostManager, "docker", docker)
+            monkeypatch.setattr(manager, "is_host_server_locked", lambda h: False)
+            monkeypatch.setattr(manager.util, "is_local", lambda: False)
+
+            pings = server.count("GET", "/_ping")
+            context = manager.get_available_docker_host(hackathon)
+            assert context.state == DHS_QUERY_STATE.SUCCESS
+            assert context.docker_host_server.id == alive.id
+            # the recorded health is used, no ping
+            assert server.count("GET", "/_ping") == pings
+
+    def test_release_on_stopped(self, hackathon, add_host, manager):
+        pytest.importorskip("pexpect")
+        from hackathon.expr.docker_expr_starter import DockerExprStarter
+
+        host = add_host("host", container_count=0)
+        manager.reserve_container_slot(host)
+        manager.reserve_container_slot(host)
+        ve = VirtualEnvironment(provider=VE_PROVIDER.DOCKER, name="placement-ve", status=VEStatus.RUNNING,
+                                docker_container=DockerContainer(name="placement-ve", host_server=host,
+                                                                 slot_reserved=True))
+        expr = Experiment(status=EStatus.RUNNING, hackathon=hackathon, virtual_environments=[ve])
+        expr.save()
+
+        context = Context(experiment_id=expr.id, virtual_environment_name=ve.name)
+        starter = DockerExprStarter()
+        starter._on_virtual_environment_stopped(context)
+        # stopped twice, e.g. rollback after stop, the slot is released only once
+        starter._on_virtual_environment_stopped(context)
+
+        assert DockerHostServer.objects(id=host.id).first().container_count == 1
+        expr.reload()
+        assert expr.status == EStatus.STOPPED
+        expr.delete()
+
+    def test_reserve_on_start(self, hackathon, add_host):
+        pytest.importorskip("pexpect")
+        from hackathon.expr.docker_expr_starter import DockerExprStarter
+
+        class Unit(object):
+            def __init__(self):
+                self.name = "web"
+
+            def get_name(self):
+                return self.name
+
+            def set_name(self, name):
+                self.name = name
+
+            def get_image_with_tag(self):
+                return "ubuntu:latest"
+
+        class Starter(DockerExprStarter):
+            def __init__(self, fail):
+                self.fail = fail
+                self.hosts = []
+
+            def _internal_start_virtual_environment(self, context):
+                self.hosts.append(context.docker_host_server_id)
+                if self.fail:
+                    raise Exception("failed on purpose")
+
+        host = add_host("host", container_count=0)
+        for fail in (False, True):
+            expr = Experiment(status=EStatus.STARTING, hackathon=hackathon, virtual_environments=[])
+            expr.save()
+            starter = Starter(fail)
+            starter._internal_start_expr(Context(experiment_id=expr.id, hackathon_id=hackathon.id,
+                                                 template_content=Context(units=[Unit()])))
+            assert starter.hosts == [host.id]
+
+            expr.reload()
+            ve = expr.virtual_environments[0]
+            assert ve.docker_container.host_server.id == host.id
+            assert ve.status == (VEStatus.FAILED if fail else VEStatus.INIT)
+            expr.delete()
+
+        # the slot of the failed start is given back
+        assert DockerHostServer.objects(id=host.id).first().container_count == 1
+
+        # the experiment is gone before the virtual environment is saved
+        starter = Starter(False)
+        starter._internal_start_expr(Context(experiment_id=expr.id, hackathon_id=hackathon.id,
+                                             template_content=Context(units=[Unit()])))
+        assert starter.hosts == []
+        assert DockerHostServer.objects(id=host.id).first().container_count == 1
@@ -0,0 +1,97 @@
+import socket
+import time
+from datetime import timedelta
+
+import pytest
+
+from hackathon.constants import DockerHostServerStatus, HEALTH, HEALTH_STATUS
+from hackathon.docker.hosted_docker import HostedDockerFormation
+from hackathon.hmongo.models import DockerHostServer
+from hackathon.util import get_now
+from tests.fake_docker import FakeDockerServer
+
+
+def get_dead_port():
+    # a port nobody listens on, connections are refused at once
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+@pytest.fixture()
+def servers():
+    with FakeDockerServer() as s1, FakeDockerServer() as s2:
+        yield [s1, s2]
+
+
+class TestDockerProbe(object):
+    def test_probe_concurrently(self, add_host, servers):
+        for server in servers:
+            server.delay = 1
+        hosts = [add_host("alive%d" % i, s.port) for i, s in enumerate(servers)]
+        hosts.append(add_host("dead", get_dead_port()))
+
+        start = time.time()
+        assert HostedDockerFormation().probe_hosts(hosts) == 2
+        # hosts are pinged at the same time rather than one by one, pings are not retried
+        assert time.time() - start < 1.5
+
+        alive = DockerHostServer.objects(id=hosts[0].id).first()
+        assert alive.health.alive
+        assert alive.health.latency >= 1000
+        assert alive.health.last_seen is not None
+        assert alive.health.history == [True]
+
+        dead = DockerHostServer.objects(id=hosts[2].id).first()
+        assert not dead.health.alive
+        assert dead.health.last_seen is None
+        # the probe records health only, the state is left to admins
+        assert dead.state == DockerHostServerStatus.DOCKER_READY
+
+    def test_rolling_history(self, add_host, servers):
+        host = add_host("alive", servers[0].port, state=DockerHostServerStatus.UNAVAILABLE)
+        docker = HostedDockerFormation()
+        for i in range(12):
+            docker.probe_hosts([host])
+
+        host.reload()
+        assert len(host.health.history) == 10
+        # a host marked unavailable by admin is not brought back by the probe
+        assert host.state == DockerHostServerStatus.UNAVAILABLE
+
+    def test_report_health_without_network(self, add_host, servers):
+        add_host("alive", servers[0].port)
+        add_host("dead", get_dead_port())
+        docker = HostedDockerFormation()
+        docker.probe_hosts()
+
+        health = docker.report_health()
+        assert health[HEALTH.STATUS] == HEALTH_STATUS.WARNING
+        assert len(health["probes"]) == 2
+        # report reads the recorded health, nothing is sent to the hosts
+        assert servers[0].count("GET", "/_ping") == 1
+
+    def test_disabled_host_not_reported(self, add_host, servers):
+        add_host("alive", servers[0].port)
+        add_host("disabled", servers[1].port, disabled=True)
+        docker = HostedDockerFormation()
+        docker.probe_hosts()
+
+        health = docker.report_health()
+        assert health[HEALTH.STATUS] == HEALTH_STATUS.OK
+        assert len(health["probes"]) == 1
+
+    def test_stale_health_taken_as_down(self, add_host, servers):
+        host = add_host("alive", servers[0].port)
+        HostedDockerFormation().probe_hosts([host])
+        DockerHostServer.objects(id=host.id).update(set__health__checked_time=get_now() - timedelta(hours=1))
+
+        health = HostedDockerFormation().report_health()
+        assert health[HEALTH.STATUS] == HEALTH_STATUS.ERROR
+
+    def test_probe_host_never_probed(self, servers, add_host):
+        host = add_host("new", servers[0].port)
+        assert HostedDockerFormation().is_host_alive(host)
+        assert servers[0].count("GET", "/_ping") == 1
@@ -0,0 +1,74 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from hackathon import app, RequiredFeature, Context
+from hackathon.constants import EStatus, VE_PROVIDER, HACKATHON_CONFIG, CLOUD_PROVIDER
+from hackathon.hmongo.models import Experiment, Hackathon, Template
+from hackathon.hmongo.database import drop_db, setup_db
+from hackathon.hackathon_scheduler import HackathonScheduler
+from hackathon.util import get_now
+
+expr_manager = RequiredFeature("expr_manager")
+
+
+@pytest.fixture()
+def expr():
+    Experiment.objects.delete()
+    template = Template(name="async-%s" % time.time(), provider=VE_PROVIDER.K8S, virtual_environment_count=1)
+    template.save()
+    hackathon = Hackathon(name="async-%s" % time.time(), display_name="async", templates=[template])
+    hackathon.save()
+    e = Experiment(status=EStatus.STARTING, hackathon=hackathon, template=template)
+    e.save()
+    return e
+
+
+class TestExprAsync(object):
+    @classmethod
+    def setup_class(cls):
+        drop_db()
+        setup_db()
+
+    @classmethod
+    def teardown_class(cls):
+        drop_db()
+
+    def test_stop_queued_expr(self, starter, expr):
+        assert expr_manager.stop_queued_expr(Context(experiment_id=str(expr.id)))
+        assert starter.stopped == [expr.id]
+        assert not expr_manager.stop_queued_expr(Context(experiment_id="5f0000000000000000000000"))
+
+    def test_poll_interval(self):
+        assert [expr_manager.get_poll_interval(i) for i in range(7)] == [1, 2, 4, 8, 16, 16, 16]
+        assert expr_manager.get_poll_interval(10000) == 16
+
+    def test_poll_api(self, expr):
+        client = app.test_client()
+        start = time.time()
+        resp = client.get("/api/user/experiment?id=%s&attempt=2" % expr.id)
+        # the status is reported at once, the client backs off by itself
+        assert time.time() - start < 1
+        assert resp.status_code == 200
+        assert resp.get_json()["status"] == EStatus.STARTING
+        assert resp.get_json()["poll_after"] == 4
+
+        Experiment.objects(id=expr.id).update(status=EStatus.FAILED)
+        resp = client.get("/api/user/experiment?id=%s" % expr.id)
+        assert resp.get_json()["status"] == EStatus.FAILED
+        assert "poll_after" not in resp.get_json()
+
+    def test_start_queued(self, user1, monkeypatch):
+        template = Template(name="async-%s" % time.time(), provider=VE_PROVIDER.K8S, virtual_environment_count=1)
+        template.save()
+        hackathon = Hackathon(name="async-%s" % time.time(), display_name="async", templates=[template],
+                              event_end_time=get_now() + timedelta(days=1),
+                              config={HACKATHON_CONFIG.CLOUD_PROVIDER: CLOUD_PROVIDER.KUBERNETES})
+        hackathon.save()
+        monkeypatch.setattr(HackathonScheduler, "add_once", lambda self, feature, method, **kwargs: None)
+
+        # the pool is empty, the new experiment is queued and the client is told to poll
+        ret = expr_manager.start_expr(user1, template.name, hackathon.name)
+        assert ret["status"] == EStatus.INIT
+        assert ret["poll_after"] == 1
@@ -0,0 +1,118 @@
+import time
+
+from hackathon import RequiredFeature, Context
+from hackathon.constants import EStatus, HACKATHON_CONFIG, VE_PROVIDER
+from hackathon.hmongo.models import Experiment, Hackathon, Template
+from hackathon.hmongo.database import drop_db, setup_db
+from hackathon.hackathon_scheduler import HackathonScheduler
+
+expr_manager = RequiredFeature("expr_manager")
+
+
+class TestExprPool(object):
+    @classmethod
+    def setup_class(cls):
+        drop_db()
+        setup_db()
+
+    @classmethod
+    def teardown_class(cls):
+        drop_db()
+
+    def setup_method(self):
+        Experiment.objects.delete()
+
+    def new_hackathon(self, templates=2, pre_num=2, concurrent=3):
+        templates = [Template(name="pool-%s-%d" % (time.time(), i), provider=VE_PROVIDER.K8S,
+                              virtual_environment_count=1).save() for i in range(templates)]
+        hackathon = Hackathon(name="pool-%s" % time.time(), display_name="pool", templates=templates, config={
+            HACKATHON_CONFIG.PRE_ALLOCATE_ENABLED: True,
+            HACKATHON_CONFIG.PRE_ALLOCATE_NUMBER: pre_num,
+            HACKATHON_CONFIG.PRE_ALLOCATE_CONCURRENT: concurrent})
+        hackathon.save()
+        return hackathon
+
+    def pooled(self, hackathon, template):
+        return Experiment.objects(hackathon=hackathon, template=template, user=None).count()
+
+    def test_top_up_all_templates(self, starter):
+        hackathon = self.new_hackathon(templates=2, pre_num=2, concurrent=3)
+        first, second = hackathon.templates
+
+        begin = time.time()
+        assert expr_manager.pre_allocate_expr(Context(hackathon_id=hackathon.id)) == 3
+        # started in parallel and shared by both templates
+        assert time.time() - begin < starter.delay * 2
+        assert starter.max_running == 3
+        assert self.pooled(hackathon, first) == 2
+        assert self.pooled(hackathon, second) == 1
+
+        # no slot until the starting ones are running
+        assert expr_manager.pre_allocate_expr(Context(hackathon_id=hackathon.id)) == 0
+        Experiment.objects(hackathon=hackathon).update(status=EStatus.RUNNING)
+        assert expr_manager.pre_allocate_expr(Context(hackathon_id=hackathon.id)) == 1
+        assert self.pooled(hackathon, second) == 2
+        assert expr_manager.pre_allocate_expr(Context(hackathon_id=hackathon.id)) == 0
+
+    def test_shared_pool(self, starter):
+        hackathons = [self.new_hackathon(templates=2, pre_num=2, concurrent=4) for _ in range(2)]
+        for hackathon in hackathons:
+            assert expr_manager.pre_allocate_expr(Context(hackathon_id=hackathon.id)) == 4
+
+        # the jobs of all hackathons start experiments by the same bounded pool
+        assert all(name.startswith("pre-allocate") for name in starter.threads)
+        assert len(starter.threads) <= 8
+
+    def test_claim_pooled_expr(self, starter, user1, user2):
+        hackathon = self.new_hackathon(templates=1, pre_num=1)
+        template = hackathon.templates[0]
+        expr_manager.pre_allocate_expr(Context(hackathon_id=hackathon.id))
+        Experiment.objects(hackathon=hackathon).update(status=EStatus.RUNNING)
+        pooled = Experiment.objects.get(hackathon=hackathon)
+        before = expr_manager.report_pool_health()
+
+        first = expr_manager.claim_expr(user1, hackathon, template)
+        assert first.id == pooled.id
+        assert first.user.id == user1.id
+
+        # the pool is empty, a new one is queued
+        second = expr_manager.claim_expr(user2, hackathon, template)
+        assert second.id != first.id
+        assert second.user.id == user2.id
+        assert second.status == EStatus.INIT
+
+        # claimed again by the same user
+        assert expr_manager.claim_expr(user1, hackathon, template).id == first.id
+        assert expr_manager.claim_expr(user2, hackathon, template).id == second.id
+
+        after = expr_manager.report_pool_health()
+        assert after["hit"] - before["hit"] == 1
+        assert after["miss"] - before["miss"] == 1
+        assert 0 < after["hit_rate"] <= 1
+
+    def test_start_queued_expr(self, starter, user1):
+        hackathon = self.new_hackathon(templates=1, pre_num=0)
+        expr = Experiment(status=EStatus.INIT, hackathon=hackathon, template=hackathon.templates[0], user=user1)
+        expr.save()
+
+        assert expr_manager.start_queued_expr(Context(experiment_id=str(expr.id)))
+        assert Experiment.objects.get(id=expr.id).status == EStatus.STARTING
+        # started only once
+        assert not expr_manager.start_queued_expr(Context(experiment_id=str(expr.id)))
+
+    def test_requeue_lost_start(self, starter, user1, monkeypatch):
+        hackathon = self.new_hackathon(templates=1, pre_num=0)
+        # queued before but its start job is lost, e.g. the server restarted
+        expr = Experiment(status=EStatus.INIT, hackathon=hackathon, template=hackathon.templates[0], user=user1)
+        expr.save()
+
+        jobs = []
+        monkeypatch.setattr(HackathonScheduler, "add_once",
+                            lambda self, feature, method, id=None, **kwargs: jobs.append((method, id)))
+        assert expr_manager.claim_expr(user1, hackathon, hackathon.templates[0]).id == expr.id
+        assert jobs == [("start_queued_expr", "start_expr_%s" % expr.id)]
+
+        # not queued again once started
+        Experiment.objects(id=expr.id).update(status=EStatus.STARTING)
+        expr_manager.claim_expr(user1, hackathon, hackathon.templates[0])
+        assert len(jobs) == 1
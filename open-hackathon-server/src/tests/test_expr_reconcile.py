@@ -0,0 +1,127 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from hackathon import RequiredFeature
+from hackathon.constants import EStatus, VEStatus, VE_PROVIDER, CACHE_NAMESPACE
+from hackathon.hmongo.models import Experiment, VirtualEnvironment, DockerContainer, DockerHostServer
+from hackathon.hmongo.database import drop_db, setup_db
+from hackathon.util import get_now
+from tests.fake_docker import FakeDockerServer
+
+expr_manager = RequiredFeature("expr_manager")
+docker_host_manager = RequiredFeature("docker_host_manager")
+cache = RequiredFeature("cache")
+
+
+@pytest.fixture()
+def server():
+    with FakeDockerServer() as s:
+        yield s
+
+
+def new_host(port):
+    host = DockerHostServer(vm_name="fake-%d" % port, public_dns="127.0.0.1", public_docker_api_port=port,
+                            container_max_count=100)
+    host.save()
+    return host
+
+
+def new_experiments(host, count, status=EStatus.RUNNING):
+    experiments = []
+    for i in range(count):
+        name = "reconcile-%s-%d" % (time.time(), i)
+        container = DockerContainer(name=name, container_id=name, host_server=host)
+        ve = VirtualEnvironment(provider=VE_PROVIDER.DOCKER, name=name, docker_container=container,
+                                status=VEStatus.RUNNING if status == EStatus.RUNNING else VEStatus.STOPPED)
+        experiments.append(Experiment(status=status, virtual_environments=[ve]).save())
+    return experiments
+
+
+class TestExprReconcile(object):
+    @classmethod
+    def setup_class(cls):
+        drop_db()
+        setup_db()
+
+    @classmethod
+    def teardown_class(cls):
+        drop_db()
+
+    def setup_method(self):
+        Experiment.objects.delete()
+        cache.clear(CACHE_NAMESPACE.DOCKER_CONTAINER_STATE)
+
+    def test_one_request_per_host(self, server):
+        host = new_host(server.port)
+        experiments = new_experiments(host, 10)
+        for i, e in enumerate(experiments):
+            server.add_container(e.virtual_environments[0].docker_container.container_id, running=i % 2 == 0)
+
+        # experiments loaded from db as the listing does
+        loaded = list(Experiment.objects())
+        assert expr_manager.reconcile_expr_status(loaded) == 5
+        assert server.count("GET", "/containers/json") == 1
+        assert server.count("GET", "/containers/%s/json" % experiments[0].id) == 0
+        assert sorted(e.status for e in loaded) == [EStatus.RUNNING] * 5 + [EStatus.STOPPED] * 5
+        assert Experiment.objects(status=EStatus.STOPPED).count() == 5
+        assert Experiment.objects(virtual_environments__status=VEStatus.STOPPED).count() == 5
+
+        # nothing changed, and the states are cached
+        assert expr_manager.reconcile_expr_status(list(Experiment.objects())) == 0
+        assert server.count("GET", "/containers/json") == 1
+
+    def test_background_job(self, server):
+        host = new_host(server.port)
+        stopped = new_experiments(host, 2, status=EStatus.STOPPED)
+        running = new_experiments(host, 2)
+        for e in stopped + running:
+            server.add_container(e.virtual_environments[0].docker_container.container_id)
+        server.set_running(running[0].virtual_environments[0].docker_container.container_id, False)
+
+        assert expr_manager.reconcile_expr_status() == 3
+        assert Experiment.objects(status=EStatus.RUNNING).count() == 3
+        assert Experiment.objects.get(id=running[0].id).status == EStatus.STOPPED
+
+    def test_long_stopped_skipped(self, server):
+        host = new_host(server.port)
+        recent, old = new_experiments(host, 2, status=EStatus.STOPPED)
+        Experiment.objects(id=old.id).update(update_time=get_now() - timedelta(days=1))
+        for e in (recent, old):
+            server.add_container(e.virtual_environments[0].docker_container.container_id)
+
+        # only the recently stopped one is checked
+        assert expr_manager.reconcile_expr_status() == 1
+        assert Experiment.objects.get(id=recent.id).status == EStatus.RUNNING
+        assert Experiment.objects.get(id=old.id).status == EStatus.STOPPED
+
+    def test_slot_follows_container(self, server):
+        host = new_host(server.port)
+        expr = new_experiments(host, 1)[0]
+        container = expr.virtual_environments[0].docker_container
+        Experiment.objects(id=expr.id).update_one(set__virtual_environments__0__docker_container__slot_reserved=True)
+        DockerHostServer.objects(id=host.id).update_one(set__container_count=1)
+        server.add_container(container.container_id, running=False)
+
+        # the container died, its slot is given back once only
+        assert expr_manager.reconcile_expr_status() == 1
+        assert DockerHostServer.objects.get(id=host.id).container_count == 0
+        assert not docker_host_manager.release_virtual_environment_slot(expr.id, container.name)
+        assert DockerHostServer.objects.get(id=host.id).container_count == 0
+
+        # the container is back, e.g. restarted by docker
+        server.set_running(container.container_id, True)
+        cache.clear(CACHE_NAMESPACE.DOCKER_CONTAINER_STATE)
+        assert expr_manager.reconcile_expr_status() == 1
+        assert DockerHostServer.objects.get(id=host.id).container_count == 1
+        assert not docker_host_manager.hold_virtual_environment_slot(expr.id, container.name)
+        assert DockerHostServer.objects.get(id=host.id).container_count == 1
+
+    def test_unreachable_host(self, server):
+        host = new_host(server.port)
+        new_experiments(host, 2)
+        server.failures["/containers/json"] = 10
+
+        assert expr_manager.reconcile_expr_status() == 0
+        assert Experiment.objects(status=EStatus.RUNNING).count() == 2
@@ -0,0 +1,75 @@
+import pytest
+
+from hackathon import app
+from hackathon.hackathon_factory import factory, RequiredFeature, LIFETIME
+
+
+class Component(object):
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+
+
+class Holder(object):
+    scoped = RequiredFeature("factory_test_request")
+
+
+@pytest.fixture(autouse=True)
+def provided(monkeypatch):
+    # provided again by every test
+    monkeypatch.setattr(factory, "allow_replace", True)
+    factory.provide("factory_test_singleton", Component)
+    factory.provide("factory_test_request", Component, lifetime=LIFETIME.REQUEST)
+
+
+class TestFactory(object):
+    def test_singleton_shared(self):
+        one = factory["factory_test_singleton"]
+        with app.test_request_context():
+            assert factory["factory_test_singleton"] is one
+        with app.test_request_context():
+            assert factory["factory_test_singleton"] is one
+
+    def test_request_scoped(self):
+        with app.test_request_context():
+            one = factory["factory_test_request"]
+            assert factory["factory_test_request"] is one
+        with app.test_request_context():
+            assert factory["factory_test_request"] is not one
+
+    def test_request_scoped_without_app_context(self):
+        one = factory["factory_test_request"]
+        assert isinstance(one, Component)
+        assert factory["factory_test_request"] is not one
+
+    def test_transient(self):
+        factory.provide("factory_test_transient", Component, lifetime=LIFETIME.TRANSIENT)
+        with app.test_request_context():
+            assert factory["factory_test_transient"] is not factory["factory_test_transient"]
+
+    def test_init_args(self):
+        factory.provide("factory_test_args", Component, False, "a", "b", lifetime=LIFETIME.TRANSIENT, c=1)
+        component = factory["factory_test_args"]
+        assert component.args == ("a", "b")
+        assert component.kwargs == {"c": 1}
+        assert factory.get_lifetime("factory_test_args") == LIFETIME.TRANSIENT
+
+    def test_init_args_default_lifetime(self):
+        factory.provide("factory_test_args", Component, False, "a")
+        assert factory["factory_test_args"].args == ("a",)
+        assert factory.get_lifetime("factory_test_args") == LIFETIME.SINGLETON
+
+    def test_required_feature(self):
+        # a new descriptor, the one of Holder may be resolved by another test already
+        feature = RequiredFeature("factory_test_singleton")
+        assert feature.result is factory["factory_test_singleton"]
+        assert "result" in feature.__dict__
+
+    def test_required_feature_request_scoped(self):
+        holder = Holder()
+        with app.test_request_context():
+            one = holder.scoped
+            assert holder.scoped is one
+        with app.test_request_context():
+            assert holder.scoped is not one
+        assert "result" not in Holder.__dict__["scoped"].__dict__
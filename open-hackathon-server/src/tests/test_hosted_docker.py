@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from hackathon import Context
+from hackathon.constants import VE_PROVIDER, TEMPLATE_STATUS
+from hackathon.hmongo.models import DockerHostServer, DockerContainer, Template, Hackathon
+from hackathon.docker.hosted_docker import HostedDockerFormation
+from hackathon.hack.hackathon_template_manager import HackathonTemplateManager
+from hackathon.hackathon_scheduler import HackathonScheduler
+from tests.fake_docker import FakeDockerServer
+
+
+@pytest.fixture()
+def server():
+    with FakeDockerServer() as s:
+        yield s
+
+
+@pytest.fixture()
+def host(server):
+    return DockerHostServer(vm_name="fake", public_dns="127.0.0.1", public_docker_api_port=server.port,
+                            container_max_count=10)
+
+
+@pytest.fixture()
+def docker():
+    # a new formation so that sessions and counters are not shared with other tests
+    return HostedDockerFormation()
+
+
+class TestHostedDocker(object):
+    def test_keep_alive(self, server, host, docker):
+        server.add_container("c1")
+        container = DockerContainer(name="c1", container_id="c1", host_server=host)
+
+        for i in range(10):
+            assert docker.ping(host)
+            assert docker.is_container_running(container)
+        assert len(docker.list_containers(host)) == 1
+
+        # all requests share one connection
+        assert server.connections == 1
+        stats = docker.get_host_stats()["http://127.0.0.1:%d" % server.port]
+        assert stats["requests"] == 21
+        assert stats["errors"] == 0
+        assert stats["avg_latency_ms"] > 0
+
+    def test_retry_idempotent(self, server, host, docker):
+        server.add_container("c1")
+        server.failures["/containers/c1/json"] = 2
+        container = DockerContainer(name="c1", container_id="c1", host_server=host)
+
+        assert docker.is_container_running(container)
+        assert server.count("GET", "/containers/c1/json") == 3
+
+    def test_no_retry_post(self, server, host, docker):
+        server.add_container("c1", running=False)
+        server.failures["/containers/c1/start"] = 1
+
+        docker.start_container(host, "c1")
+        assert server.count("POST", "/containers/c1/start") == 1
+        assert not server.containers["c1"]["State"]["Running"]
+        assert docker.get_host_stats()["http://127.0.0.1:%d" % server.port]["errors"] == 1
+
+    def test_timeout(self, server, host, docker):
+        server.delay = 1.5
+        assert not docker.ping(host, timeout=0.5)
+        assert docker.get_host_stats()["http://127.0.0.1:%d" % server.port]["errors"] == 1
+
+    def test_create_and_start(self, server, host, docker):
+        container = docker.create_container(host, {"Image": "ubuntu"}, "c2")
+        assert container["Id"] == "c2"
+        docker.start_container(host, "c2")
+        assert server.containers["c2"]["State"]["Running"]
+        assert docker.get_pulled_images(host) == ["ubuntu:latest"]
+        assert docker.stop_container(host, "c2").status_code == 204
+        assert "c2" not in server.containers
+
+    def test_pull_images_for_hackathon(self, server, docker, monkeypatch):
+        template = Template(name="pull-%s" % time.time(), provider=VE_PROVIDER.DOCKER, docker_image="busybox:1.0",
+                            status=TEMPLATE_STATUS.CHECK_PASS, virtual_environment_count=1)
+        template.save()
+        hackathon = Hackathon(name="pull-%s" % time.time(), display_name="pull", templates=[template])
+        hackathon.save()
+        DockerHostServer(vm_name="pull", public_dns="127.0.0.1", public_docker_api_port=server.port,
+                         container_max_count=10, hackathon=hackathon).save()
+
+        jobs = []
+        monkeypatch.setattr(HackathonScheduler, "add_once",
+                            lambda self, feature, method, context=None, **kwargs: jobs.append((method, context)))
+        HackathonTemplateManager().pull_images_for_hackathon(Context(hackathon_id=hackathon.id))
+        # ubuntu:latest is on the host already
+        assert [(m, c.image, c.tag) for m, c in jobs] == [("pull_image", "busybox", "1.0")]
+
+        docker.pull_image(jobs[0][1])
+        assert "busybox:1.0" in server.images
+
+        DockerHostServer.objects(hackathon=hackathon).delete()
+        hackathon.delete()
+        template.delete()
@@ -0,0 +1,65 @@
+import inspect
+
+import pytest
+
+from hackathon import Context
+from hackathon.hackathon_factory import factory, LIFETIME
+from hackathon.hackathon_scheduler import scheduler_executor, job_methods, pack_job_context
+
+
+class Worker(object):
+    built = 0
+
+    def __init__(self):
+        Worker.built += 1
+        self.calls = []
+
+    def no_context(self):
+        self.calls.append(None)
+
+    def with_context(self, context):
+        self.calls.append(context.experiment_id)
+
+
+@pytest.fixture(autouse=True)
+def clean(monkeypatch):
+    # the worker is provided again by every test
+    monkeypatch.setattr(factory, "allow_replace", True)
+    Worker.built = 0
+    job_methods.clear()
+
+
+class TestJobDispatch(object):
+    def test_arity(self):
+        worker = Worker()
+        factory.provide("dispatch_test_worker", worker)
+        scheduler_executor("dispatch_test_worker", "no_context", pack_job_context(Context(experiment_id="1")))
+        scheduler_executor("dispatch_test_worker", "with_context", pack_job_context(Context(experiment_id="2")))
+        assert worker.calls == [None, "2"]
+
+    def test_resolved_once(self, monkeypatch):
+        factory.provide("dispatch_test_worker", Worker)
+        signatures = []
+        signature = inspect.signature
+        monkeypatch.setattr(inspect, "signature", lambda f: signatures.append(f) or signature(f))
+
+        for i in range(5):
+            scheduler_executor("dispatch_test_worker", "with_context", Context(experiment_id=i))
+        assert len(signatures) == 1
+        assert Worker.built == 1
+        assert factory["dispatch_test_worker"].calls == [0, 1, 2, 3, 4]
+
+    def test_transient_built_per_run(self):
+        factory.provide("dispatch_test_worker", Worker, lifetime=LIFETIME.TRANSIENT)
+        for i in range(3):
+            scheduler_executor("dispatch_test_worker", "no_context", None)
+        # one for the registration and one per run
+        assert Worker.built == 4
+
+    def test_provided_again(self):
+        first, second = Worker(), Worker()
+        factory.provide("dispatch_test_worker", first)
+        scheduler_executor("dispatch_test_worker", "no_context", None)
+        factory.provide("dispatch_test_worker", second)
+        scheduler_executor("dispatch_test_worker", "no_context", None)
+        assert first.calls == [None] and second.calls == [None]
@@ -0,0 +1,94 @@
+import pickle
+from datetime import timedelta
+
+from bson import ObjectId
+
+from hackathon import Context, RequiredFeature
+from hackathon.constants import VE_PROVIDER
+from hackathon.hackathon_factory import factory
+from hackathon.hackathon_scheduler import pack_job_context, unpack_job_context, scheduler_executor
+from hackathon.hmongo.models import Template
+from hackathon.template.template_constants import TEMPLATE, K8S_UNIT
+from hackathon.template.template_content import TemplateContent
+from hackathon.util import get_now
+
+scheduler = RequiredFeature("scheduler")
+template_library = RequiredFeature("template_library")
+
+
+class Recorder(object):
+    def __init__(self):
+        self.contexts = []
+
+    def record(self, context):
+        self.contexts.append(context)
+
+
+class TestJobPayload(object):
+    def test_pack_simple_fields(self):
+        oid = ObjectId()
+        context = Context(experiment_id=oid, name="expr", count=2, ids=[oid], tags=Context(a=1))
+        payload = pack_job_context(context)
+        assert payload == {"v": 1, "ctx": {"experiment_id": oid, "name": "expr", "count": 2, "ids": [oid],
+                                           "tags": {"a": 1}}}
+
+        restored = unpack_job_context(pickle.loads(pickle.dumps(payload)))
+        assert restored.experiment_id == oid
+        assert restored.tags.a == 1
+
+    def test_drop_complex_fields(self):
+        content = TemplateContent("t", "", {TEMPLATE.VIRTUAL_ENVIRONMENT_PROVIDER: VE_PROVIDER.K8S,
+                                            K8S_UNIT.YAML_TEMPLATE: ""})
+        payload = pack_job_context(Context(experiment_id="1", template_content=content))
+        assert payload["ctx"] == {"experiment_id": "1"}
+
+    def test_legacy_payload(self):
+        # jobs saved before the compact format still carry the context itself
+        context = Context(experiment_id="1")
+        assert unpack_job_context(context) is context
+        assert unpack_job_context(None) is None
+
+    def test_executor_unpacks(self):
+        recorder = Recorder()
+        factory.provide("payload_test_recorder", recorder)
+        scheduler_executor("payload_test_recorder", "record", pack_job_context(Context(experiment_id="1")))
+        scheduler_executor("payload_test_recorder", "record", Context(experiment_id="2"))
+        assert [c.experiment_id for c in recorder.contexts] == ["1", "2"]
+
+    def test_job_store_keeps_compact_args(self):
+        scheduler.add_once("payload_test_recorder", "record", context=Context(experiment_id="1"),
+                           id="payload_compact", minutes=10)
+        job = scheduler.get_scheduler().get_job("payload_compact", scheduler.jobstore)
+        assert job.args[2] == {"v": 1, "ctx": {"experiment_id": "1"}}
+        scheduler.remove_job("payload_compact")
+
+
+class TestTemplateCache(object):
+    def create_template(self):
+        template = Template(name="cache-template-%s" % ObjectId(), provider=VE_PROVIDER.K8S,
+                            content="name: {{ expr_name }}", virtual_environment_count=1, update_time=get_now())
+        template.save()
+        return template
+
+    def test_load_once_per_version(self, monkeypatch):
+        template = self.create_template()
+        loaded = []
+        load = TemplateContent.load_from_template.__func__
+
+        def count_load(cls, t):
+            loaded.append(t.id)
+            return load(cls, t)
+
+        monkeypatch.setattr(TemplateContent, "load_from_template", classmethod(count_load))
+        first = template_library.load_template(template)
+        second = template_library.load_template(template)
+        assert len(loaded) == 1
+        # copies are returned, changes of starters don't leak into the cache
+        assert first is not second
+        first.resource["deployment"].append({"name": "changed"})
+        assert second.get_resource("deployment") == []
+
+        template.update_time = get_now() + timedelta(seconds=1)
+        template_library.load_template(template)
+        assert len(loaded) == 2
+        template.delete()
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+import yaml
+
+from hackathon import RequiredFeature, Context
+from hackathon.constants import K8S_LABEL, VE_PROVIDER, VEStatus, EStatus
+from hackathon.hmongo.models import Template, K8sCluster, Experiment, VirtualEnvironment, K8sEnvironment
+from hackathon.hmongo.database import drop_db, setup_db
+from hackathon.hk8s.k8s_service_adapter import K8SServiceAdapter
+from tests.fake_k8s import FakeK8sApiServer
+
+DELAY = 0.3
+labels = {K8S_LABEL.EXPERIMENT: "e1"}
+
+
+def pvc(name):
+    return yaml.dump({"apiVersion": "v1", "kind": "PersistentVolumeClaim", "metadata": {"name": name, "labels": labels},
+                      "spec": {"accessModes": ["ReadWriteOnce"], "resources": {"requests": {"storage": "1Gi"}}}})
+
+
+def service(name):
+    return yaml.dump({"apiVersion": "v1", "kind": "Service", "metadata": {"name": name, "labels": labels},
+                      "spec": {"type": "NodePort", "selector": labels, "ports": [{"port": 5900}]}})
+
+
+def deployment(name):
+    return yaml.dump({
+        "apiVersion": "apps/v1", "kind": "Deployment", "metadata": {"name": name, "labels": labels},
+        "spec": {"replicas": 1, "selector": {"matchLabels": labels},
+                 "template": {"metadata": {"labels": labels},
+                              "spec": {"containers": [{"name": name, "image": "ubuntu"}]}}}})
+
+
+@pytest.fixture()
+def server():
+    with FakeK8sApiServer() as s:
+        # warm up the k8s client which loads its models lazily
+        adapter = K8SServiceAdapter(s.url, "token", "default")
+        adapter.create_k8s_service(yaml.safe_load(service("warm-up")))
+        adapter.create_k8s_deployment(yaml.safe_load(deployment("warm-up")))
+        s.create_delay = DELAY
+        yield s
+
+
+class TestK8sProvision(object):
+    @classmethod
+    def setup_class(cls):
+        drop_db()
+        setup_db()
+
+    @classmethod
+    def teardown_class(cls):
+        drop_db()
+
+    def start(self, server):
+        Experiment.objects.delete()
+        cluster = K8sCluster(api_url=server.url, token="token", namespace="default", ingress=["10.0.0.1"])
+        template = Template(name="k8s-%s" % time.time(), provider=VE_PROVIDER.K8S, k8s_cluster=cluster,
+                            virtual_environment_count=1)
+        template.save()
+
+        k8s_resource = K8sEnvironment(
+            name="env",
+            persistent_volume_claims=[pvc("data")],
+            services=[service("vnc"), service("web")],
+            deployments=[deployment("desktop"), deployment("db")],
+            stateful_sets=[])
+        experiment = Experiment(template=template, status=EStatus.INIT, virtual_environments=[
+            VirtualEnvironment(provider=VE_PROVIDER.K8S, name="env-%s" % time.time(), status=VEStatus.INIT,
+                               k8s_resource=k8s_resource)])
+        experiment.save()
+
+        context = Context(experiment_id=str(experiment.id))
+        RequiredFeature("k8s_service").schedule_start_k8s_service(context)
+        return Experiment.objects.get(id=experiment.id)
+
+    def test_concurrent_provision(self, server):
+        experiment = self.start(server)
+
+        timings = experiment.provision_timings
+        # bounded by the PVC stage and the slowest workload rather than the sum of all 5 resources
+        assert timings["total"] < DELAY * 3
+        assert timings["pvc"] <= timings["deployment"]
+        assert server.names("deployments") == ["db", "desktop", "warm-up"]
+        assert server.names("services") == ["vnc", "warm-up", "web"]
+        # the node port comes from the create response, no extra read
+        assert server.count("GET", "services") == 0
+        assert server.count("GET", "deployments") == 0
+        assert yaml.safe_load(experiment.virtual_environments[0].k8s_resource.services[0])["spec"]["ports"][0][
+            "node_port"]
+
+        server.set_deployment_available("desktop")
+        server.set_deployment_available("db")
+        deadline = time.time() + 10
+        while time.time() < deadline and Experiment.objects.get(id=experiment.id).status != EStatus.RUNNING:
+            time.sleep(0.1)
+
+        experiment = Experiment.objects.get(id=experiment.id)
+        assert experiment.status == EStatus.RUNNING
+        assert "ready" in experiment.provision_timings
+        assert experiment.virtual_environments[0].remote_paras["port"]
+
+    def test_existing_resources(self, server):
+        self.start(server)
+        # provisioning again takes the existing resources as created
+        experiment = self.start(server)
+        assert "total" in experiment.provision_timings
+        assert server.count("POST", "deployments", "collection") == 5
+        assert server.count("GET", "services") == 2
+        assert server.names("deployments") == ["db", "desktop", "warm-up"]
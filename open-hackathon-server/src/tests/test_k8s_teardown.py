@@ -0,0 +1,162 @@
+import time
+from datetime import timedelta
+
+import pytest
+import yaml
+from werkzeug.exceptions import PreconditionFailed
+
+from hackathon import RequiredFeature, Context
+from hackathon.constants import K8S_LABEL, VE_PROVIDER, VEStatus, EStatus, CLOUD_PROVIDER
+from hackathon.hmongo.models import Template, K8sCluster, Experiment, VirtualEnvironment, Hackathon
+from hackathon.hmongo.database import drop_db, setup_db
+from hackathon.hk8s.k8s_service_adapter import K8SServiceAdapter
+from tests.fake_k8s import FakeK8sApiServer
+
+RESOURCES = ("deployments", "statefulsets", "persistentvolumeclaims", "services")
+
+k8s_service = RequiredFeature("k8s_service")
+expr_manager = RequiredFeature("expr_manager")
+
+
+SPECS = {
+    "Deployment": lambda name, labels: {
+        "selector": {"matchLabels": labels},
+        "template": {"metadata": {"labels": labels}, "spec": {"containers": [{"name": name, "image": "ubuntu"}]}}},
+    "PersistentVolumeClaim": lambda name, labels: {"accessModes": ["ReadWriteOnce"]},
+    "Service": lambda name, labels: {"selector": labels, "ports": [{"port": 5900}]},
+}
+SPECS["StatefulSet"] = lambda name, labels: dict(SPECS["Deployment"](name, labels), serviceName=name)
+
+
+def resource(kind, name, labels):
+    return {"apiVersion": "apps/v1" if kind in ("Deployment", "StatefulSet") else "v1", "kind": kind,
+            "metadata": {"name": name, "labels": labels}, "spec": SPECS[kind](name, labels)}
+
+
+def create_resources(adapter, name, labels):
+    adapter.create_k8s_deployment(resource("Deployment", name, labels))
+    adapter.create_k8s_statefulset(resource("StatefulSet", name, labels))
+    adapter.create_k8s_pvc(resource("PersistentVolumeClaim", name, labels))
+    adapter.create_k8s_service(yaml.dump(resource("Service", name, labels)))
+
+
+@pytest.fixture()
+def server():
+    with FakeK8sApiServer() as s:
+        yield s
+
+
+class TestK8sTeardown(object):
+    @classmethod
+    def setup_class(cls):
+        drop_db()
+        setup_db()
+
+    @classmethod
+    def teardown_class(cls):
+        drop_db()
+
+    def setup_method(self):
+        Experiment.objects.delete()
+
+    def new_experiments(self, server, hackathon, count):
+        adapter = K8SServiceAdapter(server.url, "token", "default")
+        cluster = K8sCluster(api_url=server.url, token="token", namespace="default")
+        template = Template(name="k8s-%s" % time.time(), provider=VE_PROVIDER.K8S, k8s_cluster=cluster,
+                            virtual_environment_count=1)
+        template.save()
+
+        experiments = []
+        for i in range(count):
+            experiment = Experiment(template=template, hackathon=hackathon, status=EStatus.RUNNING)
+            experiment.save()
+            # experiments are deleted by the label, the name of virtual environment doesn't matter
+            experiment.virtual_environments = [VirtualEnvironment(provider=VE_PROVIDER.K8S, status=VEStatus.RUNNING,
+                                                                  name="env-%s" % experiment.id)]
+            experiment.save()
+            create_resources(adapter, "env-%s" % experiment.id, {K8S_LABEL.HACKATHON: str(hackathon.id),
+                                                                 K8S_LABEL.EXPERIMENT: str(experiment.id)})
+            experiments.append(experiment)
+        return experiments
+
+    def new_hackathon(self, name, end_time):
+        hackathon = Hackathon(name=name, display_name=name, event_end_time=end_time,
+                              config={"cloud_provider": CLOUD_PROVIDER.KUBERNETES})
+        hackathon.save()
+        return hackathon
+
+    def test_delete_by_labels(self, server):
+        adapter = K8SServiceAdapter(server.url, "token", "default")
+        create_resources(adapter, "a", {K8S_LABEL.EXPERIMENT: "a"})
+        create_resources(adapter, "b", {K8S_LABEL.EXPERIMENT: "b"})
+
+        adapter.delete_by_labels({K8S_LABEL.EXPERIMENT: "a"})
+
+        for plural in RESOURCES:
+            assert server.names(plural) == ["b"]
+            assert server.count("DELETE", plural, "collection") == 1
+            assert server.count("DELETE", plural, "item") == 0
+
+    def test_delete_services_one_by_one(self, server):
+        server.unsupported_collection_delete.add("services")
+        adapter = K8SServiceAdapter(server.url, "token", "default")
+        create_resources(adapter, "a", {K8S_LABEL.EXPERIMENT: "a"})
+        create_resources(adapter, "b", {K8S_LABEL.EXPERIMENT: "b"})
+
+        adapter.delete_by_labels({K8S_LABEL.EXPERIMENT: "a"})
+
+        assert server.names("services") == ["b"]
+        assert server.count("DELETE", "services", "item") == 1
+
+    def test_stop_experiment(self, server):
+        hackathon = self.new_hackathon("teardown-expr", self.now() + timedelta(days=1))
+        first, second = self.new_experiments(server, hackathon, 2)
+
+        k8s_service.schedule_stop_k8s_service(Context(experiment_id=first.id))
+
+        for plural in RESOURCES:
+            assert server.names(plural) == ["env-%s" % second.id]
+        assert Experiment.objects(id=first.id).count() == 0
+        assert Experiment.objects(id=second.id).count() == 1
+
+    def test_recycle_ended_hackathon(self, server):
+        ended = self.new_hackathon("teardown-ended", self.now() - timedelta(hours=1))
+        ongoing = self.new_hackathon("teardown-ongoing", self.now() + timedelta(days=1))
+        self.new_experiments(server, ended, 10)
+        alive = self.new_experiments(server, ongoing, 1)[0]
+        history = Experiment(template=alive.template, hackathon=ended, status=EStatus.STOPPED,
+                             virtual_environments=[VirtualEnvironment(provider=VE_PROVIDER.K8S,
+                                                                      status=VEStatus.STOPPED, name="env-stopped")])
+        history.save()
+
+        # the recycle job doesn't tear down ended hackathons, it's an explicit command
+        expr_manager.scheduler_recycle_expr()
+        assert Experiment.objects(hackathon=ended).count() == 11
+        with pytest.raises(PreconditionFailed):
+            expr_manager.recycle_ended_hackathon_exprs(ongoing)
+
+        assert expr_manager.recycle_ended_hackathon_exprs(ended) == 10
+
+        for plural in RESOURCES:
+            assert server.names(plural) == ["env-%s" % alive.id]
+            # one request per kind of resource no matter how many experiments
+            assert server.count("DELETE", plural, "collection") == 1
+            assert server.count("DELETE", plural, "item") == 0
+        # stopped experiments are kept as history
+        assert [e.id for e in Experiment.objects(hackathon=ended)] == [history.id]
+        assert Experiment.objects(hackathon=ongoing).count() == 1
+
+    def test_teardown_continues_on_cluster_failure(self, server):
+        ended = self.new_hackathon("teardown-partial", self.now() - timedelta(hours=1))
+        self.new_experiments(server, ended, 2)
+        broken = self.new_experiments(server, ended, 1)[0]
+        # a cluster that can't be reached
+        broken.template.k8s_cluster = K8sCluster(api_url="http://127.0.0.1:1", token="token", namespace="default")
+        broken.template.save()
+
+        assert expr_manager.recycle_ended_hackathon_exprs(ended) == 2
+        assert [e.id for e in Experiment.objects(hackathon=ended)] == [broken.id]
+
+    @staticmethod
+    def now():
+        return RequiredFeature("util").get_now()
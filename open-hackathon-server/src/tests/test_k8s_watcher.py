@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from hackathon.constants import K8S_LABEL
+from hackathon.hk8s.k8s_service_adapter import K8SServiceAdapter
+from hackathon.hk8s.k8s_watcher import DeploymentWatcher
+from tests.fake_k8s import FakeK8sApiServer
+
+
+def deployment(name, experiment="e1"):
+    labels = {K8S_LABEL.EXPERIMENT: experiment, "app": name}
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": name, "labels": labels},
+        "spec": {
+            "replicas": 1,
+            "selector": {"matchLabels": labels},
+            "template": {"metadata": {"labels": labels},
+                         "spec": {"containers": [{"name": name, "image": "ubuntu"}]}}
+        }
+    }
+
+
+@pytest.fixture()
+def server():
+    with FakeK8sApiServer() as s:
+        yield s
+
+
+@pytest.fixture()
+def adapter(server):
+    return K8SServiceAdapter(server.url, "token", "default")
+
+
+class TestDeploymentWatcher(object):
+    def test_ready_events_fan_out(self, server, adapter):
+        names = ["d%d" % i for i in range(20)]
+        for name in names:
+            adapter.create_k8s_deployment(deployment(name, experiment=name))
+
+        results = {}
+        done = threading.Event()
+
+        def callback_of(name):
+            def callback(ready):
+                results[name] = ready
+                if len(results) == len(names):
+                    done.set()
+            return callback
+
+        for name in names:
+            adapter.watch_deployments_ready([name], callback_of(name), 10)
+        for name in names:
+            server.set_deployment_available(name)
+
+        assert done.wait(10)
+        assert all(results.values())
+        # one list and one watch stream shared by all experiments, no polling
+        assert server.count("GET", "deployments", "collection") == 1
+        assert server.count("GET", "deployments", "watch") <= 1
+        assert server.count("GET", "deployments", "item") == 0
+
+    def test_wait_all_deployments(self, server, adapter):
+        adapter.create_k8s_deployment(deployment("a"))
+        adapter.create_k8s_deployment(deployment("b"))
+        server.set_deployment_available("a")
+
+        threading.Timer(0.5, server.set_deployment_available, ["b"]).start()
+        start = time.time()
+        assert adapter.wait_for_deployments_ready(["a", "b"], 10)
+        assert time.time() - start < 5
+
+    def test_timeout(self, server, adapter):
+        adapter.create_k8s_deployment(deployment("slow"))
+        start = time.time()
+        assert not adapter.wait_for_deployments_ready(["slow"], 1)
+        assert time.time() - start < 5
+
+    def test_api_server_error(self, server, adapter):
+        server.error_code = 500
+        results = []
+        done = threading.Event()
+
+        def callback(ready):
+            results.append(ready)
+            done.set()
+
+        start = time.time()
+        adapter.watch_deployments_ready(["broken"], callback, 1)
+        # the list keeps failing, the waiter still times out
+        assert done.wait(10)
+        assert results == [False]
+        assert time.time() - start < 5
+
+    def test_deleted(self, server, adapter):
+        adapter.create_k8s_deployment(deployment("gone"))
+        threading.Timer(0.5, adapter.delete_k8s_deployment, ["gone"]).start()
+        assert not adapter.wait_for_deployments_ready(["gone"], 10)
+
+    def test_already_available(self, server, adapter):
+        adapter.create_k8s_deployment(deployment("ready"))
+        server.set_deployment_available("ready")
+        assert adapter.wait_for_deployments_ready(["ready"], 10)
+
+    def test_one_watcher_per_namespace(self, server, adapter):
+        other = K8SServiceAdapter(server.url, "token", "other")
+        watcher = DeploymentWatcher.get_watcher(adapter.api_client, server.url, "default")
+        assert DeploymentWatcher.get_watcher(other.api_client, server.url, "default") is watcher
+        assert DeploymentWatcher.get_watcher(other.api_client, server.url, "other") is not watcher
@@ -0,0 +1,135 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from mongoengine.queryset.base import BaseQuerySet
+
+from hackathon import app, Context, RequiredFeature
+from hackathon.constants import HACK_USER_TYPE, HACK_USER_STATUS, HACK_STATUS, HACKATHON_STAT, EStatus, \
+    HTTP_HEADER, DockerHostServerStatus, VE_PROVIDER
+from hackathon.hmongo.database import drop_db, ensure_indexes
+from hackathon.hmongo.models import User, UserToken, UserEmail, Hackathon, UserHackathon, HackathonStat, Team, \
+    TeamMember, Experiment, Template, DockerHostServer
+from hackathon.util import get_now
+
+cache = RequiredFeature("cache")
+user_manager = RequiredFeature("user_manager")
+admin_manager = RequiredFeature("admin_manager")
+hackathon_manager = RequiredFeature("hackathon_manager")
+register_manager = RequiredFeature("register_manager")
+team_manager = RequiredFeature("team_manager")
+expr_manager = RequiredFeature("expr_manager")
+template_library = RequiredFeature("template_library")
+docker_host_manager = RequiredFeature("docker_host_manager")
+
+# entry points of the managers. Every query they issue is captured and explained, so the test follows the manager
+# code rather than a copy of its filters and sort orders
+MANAGER_CALLS = {
+    "user_manager.validate_token": lambda d: user_manager.validate_token(),
+    "user_manager.get_user_by_email": lambda d: user_manager.get_user_by_email("index@open-hackathon.io"),
+    "user_manager.login": lambda d: user_manager.login("db", Context(username="index-user", password="pwd")),
+    "hackathon_manager.get_hackathon_list": lambda d: hackathon_manager.get_hackathon_list({}),
+    "hackathon_manager.get_hackathon_list.status":
+        lambda d: hackathon_manager.get_hackathon_list({"status": HACK_STATUS.ONLINE}),
+    "hackathon_manager.get_hackathon_list.event_start_time":
+        lambda d: hackathon_manager.get_hackathon_list({"order_by": "event_start_time"}),
+    "hackathon_manager.get_hackathon_list.event_start_time.status":
+        lambda d: hackathon_manager.get_hackathon_list({"order_by": "event_start_time",
+                                                        "status": HACK_STATUS.ONLINE}),
+    "hackathon_manager.get_hackathon_list.registered_users_num":
+        lambda d: hackathon_manager.get_hackathon_list({"order_by": "registered_users_num"}),
+    "hackathon_manager.get_user_hackathon_list_with_detail":
+        lambda d: hackathon_manager.get_user_hackathon_list_with_detail(d.user.id),
+    "hackathon_manager.update_hackathon_stat":
+        lambda d: hackathon_manager.update_hackathon_stat(d.hackathon, HACKATHON_STAT.LIKE, 1),
+    "hackathon_manager.unlike_hackathon": lambda d: hackathon_manager.unlike_hackathon(d.user, d.hackathon),
+    "hackathon_manager.get_hackathon_notice_list": lambda d: hackathon_manager.get_hackathon_notice_list({}),
+    "hackathon_manager.get_hackathon_notice_list.user":
+        lambda d: hackathon_manager.get_hackathon_notice_list({"hackathon_name": d.hackathon.name,
+                                                               "filter_by_user": "unread"}),
+    "admin_manager.get_user_permissions": lambda d: admin_manager.get_user_permissions(d.user.id),
+    "admin_manager.get_admins_by_hackathon": lambda d: admin_manager.get_admins_by_hackathon(d.hackathon),
+    "register_manager.get_hackathon_registration_list":
+        lambda d: register_manager.get_hackathon_registration_list(d.hackathon.id),
+    "register_manager.get_registration_detail":
+        lambda d: register_manager.get_registration_detail(d.user, d.hackathon),
+    "team_manager.get_hackathon_team_list": lambda d: team_manager.get_hackathon_team_list(d.hackathon.id),
+    "team_manager.get_team_by_user_and_hackathon":
+        lambda d: team_manager.get_team_by_user_and_hackathon(d.user, d.hackathon),
+    "expr_manager.get_expr_list_by_hackathon_id":
+        lambda d: expr_manager.get_expr_list_by_hackathon_id(d.hackathon, Context(status=EStatus.RUNNING)),
+    "expr_manager.reconcile_expr_status": lambda d: expr_manager.reconcile_expr_status(),
+    "template_library.get_template_info_by_name":
+        lambda d: template_library.get_template_info_by_name(d.template.name),
+    "docker_host_manager.get_docker_hosts_list": lambda d: docker_host_manager.get_docker_hosts_list(d.hackathon),
+}
+
+
+def collect_stages(plan):
+    """Collect all stages of a query plan recursively"""
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += collect_stages(plan[key])
+    for sub_plan in plan.get("inputStages", []):
+        stages += collect_stages(sub_plan)
+    return stages
+
+
+def capture_querysets(func):
+    """Run func and return the querysets that are sent to MongoDB during the call"""
+    captured = []
+    cursor = BaseQuerySet._cursor
+
+    def record(queryset):
+        if queryset._cursor_obj is None:
+            captured.append(queryset.clone())
+        return cursor.fget(queryset)
+
+    BaseQuerySet._cursor = property(record)
+    try:
+        func()
+    finally:
+        BaseQuerySet._cursor = cursor
+    return captured
+
+
+@pytest.fixture(scope="module")
+def data():
+    drop_db()
+    ensure_indexes()
+
+    user = User(name="index-user", nickname="index user", emails=[UserEmail(email="index@open-hackathon.io")])
+    user.save()
+    now = get_now()
+    token = UserToken(token=str(uuid.uuid1()), user=user, issue_date=now, expire_date=now + timedelta(minutes=10))
+    token.save()
+
+    template = Template(name="index-template", provider=VE_PROVIDER.K8S, virtual_environment_count=1)
+    template.save()
+    hackathon = Hackathon(name="index-hackathon", display_name="index hackathon", status=HACK_STATUS.ONLINE,
+                          register_count=1, templates=[template])
+    hackathon.save()
+    HackathonStat(hackathon=hackathon, type=HACKATHON_STAT.REGISTER, count=1).save()
+    UserHackathon(user=user, hackathon=hackathon, role=HACK_USER_TYPE.COMPETITOR,
+                  status=HACK_USER_STATUS.AUTO_PASSED, like=True).save()
+    Team(name="index-team", hackathon=hackathon, leader=user, members=[TeamMember(user=user)]).save()
+    Experiment(status=EStatus.RUNNING, hackathon=hackathon, template=template, user=user).save()
+    DockerHostServer(vm_name="index-host", public_dns="127.0.0.1", public_docker_api_port=2375,
+                     container_max_count=10, state=DockerHostServerStatus.DOCKER_READY, hackathon=hackathon).save()
+
+    yield Context(user=user, token=token.token, hackathon=hackathon, template=template)
+    drop_db()
+
+
+@pytest.mark.parametrize("name", sorted(MANAGER_CALLS.keys()))
+def test_no_collection_scan(name, data):
+    # cached lookups would hide the queries behind them
+    cache.clear()
+    with app.test_request_context(headers={HTTP_HEADER.AUTHORIZATION: data.token}):
+        querysets = capture_querysets(lambda: MANAGER_CALLS[name](data))
+
+    assert querysets, "%s issued no query" % name
+    for queryset in querysets:
+        plan = queryset.explain()["queryPlanner"]["winningPlan"]
+        assert "COLLSCAN" not in collect_stages(plan), "%s: %s %s" % (name, queryset._query, plan)
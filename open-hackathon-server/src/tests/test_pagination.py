@@ -0,0 +1,59 @@
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from hackathon import app
+from hackathon.hmongo.models import Hackathon
+from hackathon.hmongo.database import drop_db, setup_db
+
+
+def walk(queryset, order_by, per_page):
+    """Fetch all pages by cursor"""
+    items, cursor = [], None
+    while True:
+        pagination = queryset.cursor_paginate(order_by, cursor, per_page)
+        items += pagination.items
+        cursor = pagination.cursor
+        if not pagination.has_next:
+            assert cursor is None
+            return items
+
+
+class TestCursorPagination(object):
+    @classmethod
+    def setup_class(cls):
+        drop_db()
+        setup_db()
+        # ties of register_count must be broken by id
+        for i in range(25):
+            Hackathon(name="h%d" % i, display_name="h%d" % i, register_count=i % 4, status=i % 2).save()
+
+    @classmethod
+    def teardown_class(cls):
+        drop_db()
+
+    @pytest.mark.parametrize("order_by", ["-register_count", "register_count", "-create_time", "id", "-id"])
+    def test_walk_all_pages(self, order_by):
+        descending = order_by.startswith("-")
+        expected = Hackathon.objects.order_by(order_by, "-id" if descending else "+id")
+
+        with app.app_context():
+            assert [h.id for h in walk(Hackathon.objects, order_by, 7)] == [h.id for h in expected]
+
+    def test_filter_and_total(self):
+        queryset = Hackathon.objects(status=1)
+        with app.app_context():
+            first = queryset.cursor_paginate("-register_count", per_page=5, with_total=True)
+            assert first.total == 12
+            assert len(first.items) == 5
+            assert all(h.status == 1 for h in walk(queryset, "-register_count", 5))
+
+            # the total of following pages is served from cache
+            Hackathon(name="new", display_name="new", status=1).save()
+            second = queryset.cursor_paginate("-register_count", first.cursor, 5, with_total=True)
+            assert second.total == 12
+            assert queryset.cursor_paginate("-register_count", per_page=5, with_total=True).total == 13
+
+    def test_invalid_cursor(self):
+        with app.test_request_context():
+            with pytest.raises(BadRequest):
+                Hackathon.objects.cursor_paginate("-register_count", "not-a-cursor", 5)
@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from hackathon import RequiredFeature
+from hackathon.constants import SCHEDULER_EXECUTOR, HEALTH, HEALTH_STATUS
+from hackathon.hackathon_factory import factory
+
+scheduler = RequiredFeature("scheduler")
+
+
+class Blocker(object):
+    def __init__(self):
+        self.release = threading.Event()
+
+    def block(self):
+        self.release.wait(10)
+
+
+@pytest.fixture()
+def blocker():
+    b = Blocker()
+    factory.provide("executor_test_blocker", b)
+    yield b
+    b.release.set()
+
+
+class TestSchedulerExecutors(object):
+    def test_pool_stats(self, blocker, wait_until):
+        for i in range(4):
+            scheduler.add_once("executor_test_blocker", "block", id="block_%d" % i, executor=SCHEDULER_EXECUTOR.IMAGE,
+                               seconds=0)
+
+        def stats():
+            return scheduler.get_executor_stats()[SCHEDULER_EXECUTOR.IMAGE]
+
+        # the image pool has 2 threads, the others wait
+        assert wait_until(lambda: stats()["running"] == 2 and stats()["queued"] == 2)
+        assert stats()["saturation"] == 1
+        # other pools are not affected
+        assert scheduler.get_executor_stats()[SCHEDULER_EXECUTOR.PROVISION]["running"] == 0
+
+        health = scheduler.report_health()
+        assert health[HEALTH.STATUS] == HEALTH_STATUS.WARNING
+        assert SCHEDULER_EXECUTOR.IMAGE in health[HEALTH.DESCRIPTION]
+
+        blocker.release.set()
+        assert wait_until(lambda: stats()["running"] == 0 and stats()["queued"] == 0)
+        assert stats()["peak_queued"] >= 2
+        assert scheduler.report_health()[HEALTH.STATUS] == HEALTH_STATUS.OK
+
+    def test_unknown_executor(self):
+        scheduler.add_once("executor_test_blocker", "block", id="block_unknown", executor="unknown", minutes=10)
+        job = scheduler.get_scheduler().get_job("block_unknown", scheduler.jobstore)
+        assert job.executor == SCHEDULER_EXECUTOR.DEFAULT
+        scheduler.remove_job("block_unknown")
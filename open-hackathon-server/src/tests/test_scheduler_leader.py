@@ -0,0 +1,134 @@
+import multiprocessing
+import socket
+import time
+from datetime import timedelta
+
+import pytest
+from mongoengine.connection import get_db
+
+from hackathon.hackathon_factory import factory
+from hackathon.hackathon_scheduler import LeaderElection, LeaderOnlyScheduler, HackathonScheduler, scheduler_executor
+from hackathon.util import safe_get_config, get_now
+
+
+class Ticker(object):
+    def __init__(self):
+        self.ticks = []
+
+    def tick(self):
+        self.ticks.append(time.time())
+
+
+@pytest.fixture()
+def leases():
+    collection = get_db()["test_scheduler_lease"]
+    collection.delete_many({})
+    yield collection
+    collection.delete_many({})
+
+
+def mongodb_reachable():
+    try:
+        socket.create_connection((safe_get_config("scheduler.host", "localhost"),
+                                  safe_get_config("scheduler.port", 27017)), timeout=1).close()
+        return True
+    except Exception:
+        return False
+
+
+def run_worker(seconds, queue):
+    # a new process importing the app, like a uWSGI worker
+    import hackathon
+    ticker = Ticker()
+    factory.provide("leader_ticker", ticker)
+    hackathon.scheduler.add_interval("leader_ticker", "tick", id="leader_tick", seconds=1)
+    time.sleep(seconds)
+    queue.put(ticker.ticks)
+
+
+class TestLeaderElection(object):
+    def test_one_leader(self, leases):
+        a = LeaderElection(leases)
+        b = LeaderElection(leases)
+
+        assert a.renew()
+        assert not b.renew()
+        # renewal of the leader keeps the lease
+        assert a.renew()
+        assert a.is_leader() and not b.is_leader()
+
+    def test_release(self, leases):
+        a = LeaderElection(leases)
+        b = LeaderElection(leases)
+        a.renew()
+        b.renew()
+
+        a.release()
+        assert not a.is_leader()
+        assert b.renew()
+
+    def test_failover_once_lease_expired(self, leases):
+        a = LeaderElection(leases, lease_seconds=1, renew_seconds=0)
+        b = LeaderElection(leases, lease_seconds=1, renew_seconds=0)
+        assert a.renew()
+        assert not b.renew()
+
+        # the leader dies and doesn't renew
+        time.sleep(1.1)
+        assert not a.is_leader()
+        assert b.renew()
+        assert not a.renew()
+
+    def test_elected_callback(self, leases):
+        elected = []
+        a = LeaderElection(leases, on_elected=lambda: elected.append(True))
+        a.renew()
+        a.renew()
+        assert elected == [True]
+
+    def test_skip_job_if_not_leader(self, monkeypatch):
+        ticker = Ticker()
+        factory.provide("leader_test_ticker", ticker)
+
+        monkeypatch.setattr(HackathonScheduler, "is_leader", lambda self: False)
+        scheduler_executor("leader_test_ticker", "tick", None, leader_only=True)
+        assert ticker.ticks == []
+        # jobs not limited to the leader still run
+        scheduler_executor("leader_test_ticker", "tick", None)
+        assert len(ticker.ticks) == 1
+
+    @pytest.mark.skipif(not mongodb_reachable(), reason="requires a local MongoDB")
+    def test_tick_once_per_cluster(self):
+        seconds = 8
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        workers = [context.Process(target=run_worker, args=(seconds, queue)) for i in range(3)]
+        for w in workers:
+            w.start()
+        ticks = sorted(sum([queue.get(timeout=seconds + 60) for w in workers], []))
+        for w in workers:
+            w.join()
+
+        # every tick runs in one of the workers only, rather than in all of them
+        assert 0 < len(ticks) <= seconds + 1
+        assert all(b - a > 0.5 for a, b in zip(ticks, ticks[1:]))
+
+    def test_leader_checks_shared_store(self):
+        class Elected(object):
+            renew_seconds = 5
+
+            def is_leader(self):
+                return True
+
+        scheduler = LeaderOnlyScheduler(Elected())
+        scheduler.add_jobstore("memory", alias="shared")
+        scheduler.start()
+        try:
+            # nothing scheduled, the store is still checked after one renewal
+            assert scheduler._process_jobs() == 5
+
+            # the next job is an hour later, but others may add jobs in the meantime
+            scheduler.add_job(Ticker().tick, "date", run_date=get_now() + timedelta(hours=1), jobstore="shared")
+            assert scheduler._process_jobs() == 5
+        finally:
+            scheduler.shutdown(wait=False)
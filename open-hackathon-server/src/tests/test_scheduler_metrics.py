@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from hackathon import RequiredFeature
+from hackathon.constants import HEALTH, HEALTH_STATUS
+from hackathon.hackathon_factory import factory
+from hackathon.hackathon_scheduler import Histogram
+
+scheduler = RequiredFeature("scheduler")
+
+
+class Worker(object):
+    def work(self):
+        time.sleep(0.2)
+
+    def fail(self):
+        raise ValueError("failed on purpose")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def worker():
+    factory.provide("metrics_test_worker", Worker())
+
+
+class TestSchedulerMetrics(object):
+    def test_histogram(self):
+        h = Histogram()
+        for v in [0.02] * 9 + [20]:
+            h.observe(v)
+
+        stats = h.to_dict()
+        assert stats["count"] == 10
+        assert stats["max"] == 20
+        assert stats["p50"] == 0.05
+        assert stats["p95"] == 30
+        assert stats["buckets"]["le_0.05"] == 9
+
+    def test_duration_and_lag(self, wait_until):
+        for i in range(2):
+            scheduler.add_once("metrics_test_worker", "work", id="metrics_work_%d" % i, seconds=0)
+
+        def stats():
+            return scheduler.get_job_metrics()["jobs"].get("metrics_test_worker.work")
+
+        assert wait_until(lambda: stats() and stats()["runs"] == 2)
+        assert stats()["errors"] == 0
+        assert stats()["duration"]["count"] == 2
+        assert stats()["duration"]["avg"] >= 0.2
+        assert stats()["lag"]["count"] == 2
+        assert stats()["queued"] == 0 and stats()["running"] == 0
+
+    def test_errors_and_pending(self, wait_until):
+        scheduler.add_once("metrics_test_worker", "fail", id="metrics_fail", seconds=0)
+        scheduler.add_once("metrics_test_worker", "work", id="metrics_later", minutes=10)
+
+        def stats():
+            return scheduler.get_job_metrics()["jobs"].get("metrics_test_worker.fail")
+
+        assert wait_until(lambda: stats() and stats()["errors"] == 1)
+        metrics = scheduler.report_job_metrics()
+        assert metrics[HEALTH.STATUS] == HEALTH_STATUS.WARNING
+        assert "metrics_test_worker.fail" in metrics[HEALTH.DESCRIPTION]
+        assert metrics["pending"]["metrics_test_worker.work"] >= 1
+        scheduler.remove_job("metrics_later")
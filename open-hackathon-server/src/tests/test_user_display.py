@@ -0,0 +1,27 @@
+from hackathon import RequiredFeature
+from hackathon.hmongo.database import drop_db, setup_db
+
+user_manager = RequiredFeature("user_manager")
+
+
+class TestUserDisplayInfo(object):
+    @classmethod
+    def setup_class(cls):
+        drop_db()
+        setup_db()
+
+    @classmethod
+    def teardown_class(cls):
+        drop_db()
+
+    def test_batch_same_as_single(self, user1, user2):
+        infos = user_manager.user_display_info_batch([user1.id, str(user2.id), None])
+
+        assert set(infos.keys()) == {str(user1.id), str(user2.id)}
+        for user in [user1, user2]:
+            info = infos[str(user.id)]
+            assert "password" not in info
+            assert info == user_manager.user_display_info(user)
+
+    def test_batch_empty(self):
+        assert user_manager.user_display_info_batch([]) == {}
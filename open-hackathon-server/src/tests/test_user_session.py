@@ -0,0 +1,110 @@
+import uuid
+from datetime import datetime, timedelta
+
+from flask import g
+
+from hackathon import app, RequiredFeature
+from hackathon.constants import HTTP_HEADER, HACK_USER_TYPE, HACK_USER_STATUS
+from hackathon.hmongo.models import User, UserToken, Hackathon, UserHackathon
+from hackathon.hmongo.database import drop_db, setup_db
+
+user_manager = RequiredFeature("user_manager")
+admin_manager = RequiredFeature("admin_manager")
+
+
+def new_token(user, minutes=10):
+    now = datetime.utcnow()
+    token = UserToken(token=str(uuid.uuid1()), user=user, issue_date=now, expire_date=now + timedelta(minutes=minutes))
+    token.save()
+    return token.token
+
+
+def validate(token):
+    with app.test_request_context(headers={HTTP_HEADER.AUTHORIZATION: token}):
+        return user_manager.validate_token()
+
+
+class TestUserSession(object):
+    @classmethod
+    def setup_class(cls):
+        drop_db()
+        setup_db()
+
+    @classmethod
+    def teardown_class(cls):
+        drop_db()
+
+    def test_token_cached(self, user1):
+        token = new_token(user1)
+        assert validate(token)
+
+        # the cached session is used until it's invalidated
+        UserToken.objects(token=token).delete()
+        assert validate(token)
+
+    def test_no_secret_in_session(self, user1):
+        User.objects(id=user1.id).update(access_token="oauth-token")
+        user_manager.invalidate_user_session(user1.id)
+        token = new_token(user1)
+
+        with app.test_request_context(headers={HTTP_HEADER.AUTHORIZATION: token}):
+            assert user_manager.validate_token()
+            assert g.user.id == user1.id
+            assert g.user.password is None
+            assert g.user.access_token is None
+
+        # the database copy is untouched
+        user = User.objects(id=user1.id).first()
+        assert user.check_password("test_password")
+        assert user.access_token == "oauth-token"
+
+    def test_expired_token(self, user1):
+        token = new_token(user1, minutes=-1)
+        assert not validate(token)
+        assert not validate("not-exist")
+
+    def test_logout(self, user1):
+        token = new_token(user1)
+        with app.test_request_context(headers={HTTP_HEADER.AUTHORIZATION: token}):
+            assert user_manager.validate_token()
+            assert g.user.id == user1.id
+            user_manager.logout(g.user.id)
+
+        assert UserToken.objects(token=token).count() == 0
+        assert not validate(token)
+
+    def test_admin_privilege(self, user2):
+        hackathon = Hackathon(name="session-hackathon", display_name="session hackathon")
+        hackathon.save()
+        token = new_token(user2)
+
+        with app.test_request_context(headers={HTTP_HEADER.AUTHORIZATION: token}):
+            user_manager.validate_token()
+            g.hackathon = hackathon
+            assert not admin_manager.validate_admin_privilege_http()
+
+        UserHackathon(user=user2, hackathon=hackathon, role=HACK_USER_TYPE.ADMIN,
+                      status=HACK_USER_STATUS.AUTO_PASSED).save()
+        admin_manager.invalidate_permissions(user2.id)
+
+        with app.test_request_context(headers={HTTP_HEADER.AUTHORIZATION: token}):
+            user_manager.validate_token()
+            g.hackathon = hackathon
+            assert admin_manager.validate_admin_privilege_http()
+
+    def test_permissions_memoized(self, user1, admin1):
+        hackathon = Hackathon(name="permission-hackathon", display_name="permission hackathon")
+        hackathon.save()
+        UserHackathon(user=user1, hackathon=hackathon, role=HACK_USER_TYPE.JUDGE,
+                      status=HACK_USER_STATUS.AUTO_PASSED).save()
+
+        with app.test_request_context():
+            assert admin_manager.get_user_permissions(user1.id)["roles"] == {str(hackathon.id): HACK_USER_TYPE.JUDGE}
+            assert not admin_manager.is_hackathon_admin(hackathon.id, user1.id)
+            assert admin_manager.is_hackathon_admin(hackathon.id, admin1.id)
+
+            UserHackathon.objects(user=user1.id, hackathon=hackathon.id).update(role=HACK_USER_TYPE.ADMIN)
+            assert not admin_manager.is_hackathon_admin(hackathon.id, user1.id)
+
+            admin_manager.invalidate_permissions(user1.id)
+            assert admin_manager.is_hackathon_admin(hackathon.id, user1.id)